@@ -0,0 +1,6 @@
+"""
+Offline benchmarks of the embedding service.
+
+Run with ``python -m benchmarks --output results.json`` and compare two runs with
+``python -m benchmarks --compare baseline.json results.json``.
+"""
@@ -0,0 +1,85 @@
+import argparse
+import json
+import sys
+
+from benchmarks import report
+
+SUITES = ("handler", "rest", "storage", "serialization")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the offline benchmarks.")
+    parser.add_argument("--suite", action="append", choices=SUITES, help="Suite to run, repeatable, all by default")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        help="Compare two result files instead of running, exit 1 on regressions",
+    )
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change reported as a regression")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--vectors", type=int, default=10000, help="Vectors stored per codec by the storage suite")
+    parser.add_argument("--repeats", type=int, default=20, help="Repeats of the serialization suite")
+    parser.add_argument(
+        "--provider",
+        choices=("fake", "local"),
+        default="fake",
+        help="fake sleeps for the configured latency, local computes real vectors on the CPU",
+    )
+    parser.add_argument("--local-model", default="hashing-768", help="Model of the local provider")
+    parser.add_argument("--latency", choices=("constant", "uniform", "exponential", "lognormal"), default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Mean latency of a provider call")
+    parser.add_argument("--per-text-latency-ms", type=float, default=0.1)
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as baseline, open(args.compare[1]) as current:
+            regressions = report.compare(json.load(baseline), json.load(current), args.threshold)
+        for regression in regressions:
+            print(regression)
+        sys.exit(1 if regressions else 0)
+
+    # Imported here so comparing results does not need the application environment
+    from benchmarks import suites
+    from llm_portal.adapters.llm_providers import FakeProvider, Latency, LocalProvider
+
+    if args.provider == "local":
+        provider, model = LocalProvider(), args.local_model
+    else:
+        provider, model = FakeProvider(
+            dimensions=args.dimensions,
+            latency=Latency(args.latency, args.latency_ms, args.per_text_latency_ms),
+            rate_limit_probability=args.rate_limit_probability,
+            seed=args.seed,
+        ), suites.MODEL
+    selected = args.suite or SUITES
+
+    benchmarks = {}
+    if "handler" in selected:
+        benchmarks.update(
+            suites.handler_benchmarks(provider, args.requests, args.concurrency, args.batch_size, model)
+        )
+    if "rest" in selected:
+        benchmarks.update(suites.rest_benchmarks(provider, args.requests, args.concurrency, model))
+    if "storage" in selected:
+        benchmarks.update(suites.storage_benchmarks(args.vectors, args.dimensions))
+    if "serialization" in selected:
+        benchmarks.update(suites.serialization_benchmarks(args.batch_size, args.dimensions, args.repeats))
+
+    results = {"metadata": report.metadata(vars(args)), "benchmarks": benchmarks}
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Sequence
+
+import numpy as np
+
+# Metrics where a lower value is better, every other numeric metric is a throughput
+LOWER_IS_BETTER = ("_ms", "_us", "_bytes", "_error")
+
+
+def summarize(latencies: Sequence[float], elapsed: float, operations: int, errors: int = 0) -> dict[str, Any]:
+    """Throughput and latency percentiles of a run, latencies and elapsed time in seconds."""
+    samples = np.asarray(latencies, dtype=np.float64) * 1000 if len(latencies) else np.zeros(1)
+    return {
+        "operations": operations,
+        "errors": errors,
+        "ops_per_sec": operations / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "max_ms": float(samples.max()),
+    }
+
+
+def metadata(options: dict[str, Any]) -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created_time": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "options": options,
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """
+    Return the metrics of ``current`` that regressed by more than ``threshold`` against ``baseline``.
+
+    Metrics ending in ``_ms``, ``_us``, ``_bytes`` or ``_error`` regress when they grow, the others when they
+    shrink.
+    """
+    regressions = []
+    for name, metrics in current["benchmarks"].items():
+        for metric, value in metrics.items():
+            base = baseline["benchmarks"].get(name, {}).get(metric)
+            if metric in ("operations", "errors") or not isinstance(value, (int, float)) or not base:
+                continue
+            change = (value - base) / base
+            worse = change > threshold if metric.endswith(LOWER_IS_BETTER) else change < -threshold
+            if worse:
+                regressions.append(f"{name}.{metric}: {base:.4g} -> {value:.4g} ({change:+.1%})")
+    return regressions
+
+
+class Timer:
+    """Context manager measuring wall-clock seconds."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+from unittest.mock import patch
+
+import httpx
+import numpy as np
+import sqlalchemy
+
+from benchmarks.report import Timer, summarize
+from llm_portal.adapters.llm_providers import LLMProvider
+
+MODEL = "fake-model-1"
+
+
+async def _run_concurrently(call: Callable[[int], Awaitable[Any]], count: int, concurrency: int) -> dict[str, Any]:
+    """Issue ``count`` calls with at most ``concurrency`` in flight, a call fails by raising."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def timed(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    with Timer() as timer:
+        await asyncio.gather(*(timed(i) for i in range(count)))
+    return summarize(latencies, timer.elapsed, count - errors, errors)
+
+
+def _patched_provider(provider: LLMProvider):
+    from llm_portal.service.handlers import command as command_handlers
+
+    return patch.object(command_handlers, "llm_provider_factory", lambda provider_name, **kwargs: provider)
+
+
+def handler_benchmarks(
+        provider: LLMProvider,
+        requests: int,
+        concurrency: int,
+        batch_size: int,
+        model: str = MODEL,
+) -> dict[str, Any]:
+    """Throughput of the async message bus, single texts, cached single texts and batches."""
+    from llm_portal import bootstrap
+    from llm_portal.domains import commands
+    from llm_portal.service import persistence
+
+    # Texts are unique to the run, so only the ``cached`` benchmark is served from the cache
+    run_id = uuid.uuid4().hex
+
+    def single(i: int) -> commands.InputTextCommand:
+        return commands.InputTextCommand(
+            text=f"{run_id} single {i}", provider_name=provider.provider_name, embedding_model=model
+        )
+
+    def batch(i: int) -> commands.BatchInputTextCommand:
+        return commands.BatchInputTextCommand(
+            texts=[f"{run_id} batch {i} {j}" for j in range(batch_size)],
+            provider_name=provider.provider_name,
+            embedding_model=model,
+        )
+
+    async def main() -> dict[str, Any]:
+        bus = bootstrap.bootstrap_async()
+        results = {
+            "handler.single": await _run_concurrently(lambda i: bus.handle(single(i)), requests, concurrency),
+            "handler.single_cached": await _run_concurrently(lambda i: bus.handle(single(i)), requests, concurrency),
+        }
+        batches = max(1, requests // batch_size)
+        results["handler.batch"] = await _run_concurrently(lambda i: bus.handle(batch(i)), batches, concurrency)
+        results["handler.batch"]["texts_per_sec"] = results["handler.batch"]["ops_per_sec"] * batch_size
+        await persistence.flush()
+        return results
+
+    with _patched_provider(provider):
+        return asyncio.run(main())
+
+
+def rest_benchmarks(provider: LLMProvider, requests: int, concurrency: int, model: str = MODEL) -> dict[str, Any]:
+    """Requests per second and latency of ``POST /embeddings`` through the ASGI app."""
+    from llm_portal.entrypoints.rest import app as rest_app
+    from llm_portal.service import persistence
+
+    run_id = uuid.uuid4().hex
+
+    async def main() -> dict[str, Any]:
+        transport = httpx.ASGITransport(app=rest_app.create_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+
+            async def post(i: int):
+                response = await client.post(
+                    "/embeddings",
+                    json={
+                        "text": f"{run_id} rest {i}",
+                        "provider_name": provider.provider_name,
+                        "embedding_model": model,
+                    },
+                )
+                response.raise_for_status()
+
+            result = await _run_concurrently(post, requests, concurrency)
+        await persistence.flush()
+        return {"rest.embeddings": result}
+
+    with _patched_provider(provider):
+        return asyncio.run(main())
+
+
+def storage_benchmarks(count: int, dimensions: int) -> dict[str, Any]:
+    """Insert and read cost per vector for each vector codec, on an in-memory SQLite database."""
+    from llm_portal.adapters import orm
+    from llm_portal.domains import vectors
+
+    engine = sqlalchemy.create_engine("sqlite://")
+    orm.metadata.create_all(engine)
+    table = orm.embedded_results
+    matrix = np.random.default_rng(0).standard_normal((count, dimensions), dtype=np.float32)
+    now = datetime.now()
+
+    results = {}
+    for name in vectors.CODECS:
+        with engine.begin() as connection:
+            connection.execute(table.delete())
+
+        with Timer() as insert_timer:
+            rows = [
+                {
+                    "id": str(i),
+                    "text": str(i),
+                    "text_hash": str(i),
+                    "provider": "benchmark",
+                    "model": name,
+                    "dimensions": dimensions,
+                    "vector": vectors.encode(vector, name),
+                    "created_time": now,
+                    "updated_time": now,
+                }
+                for i, vector in enumerate(matrix)
+            ]
+            with engine.begin() as connection:
+                connection.execute(sqlalchemy.insert(table), rows)
+
+        with Timer() as read_timer:
+            with engine.connect() as connection:
+                stored = connection.execute(sqlalchemy.select(table.c.vector).order_by(table.c.id)).scalars().all()
+            decoded = np.stack([vectors.decode(data) for data in stored])
+
+        expected = matrix[np.argsort([str(i) for i in range(count)], kind="stable")]
+        results[f"storage.{name}"] = {
+            "operations": count,
+            "insert_us": insert_timer.elapsed / count * 1e6,
+            "read_us": read_timer.elapsed / count * 1e6,
+            "vector_bytes": len(stored[0]),
+            "max_abs_error": float(np.abs(decoded - expected).max()),
+        }
+    engine.dispose()
+    return results
+
+
+def serialization_benchmarks(batch_size: int, dimensions: int, repeats: int) -> dict[str, Any]:
+    """Cost of building a batch response body for each encoding format."""
+    from llm_portal.domains import models
+    from llm_portal.entrypoints import schemas
+    from llm_portal.entrypoints.rest import responses
+
+    matrix = np.random.default_rng(0).standard_normal((batch_size, dimensions), dtype=np.float32)
+    results = [
+        models.EmbeddedResult(
+            id=f"benchmark-{i}",
+            text=f"text {i}",
+            provider="benchmark",
+            model=MODEL,
+            dimensions=dimensions,
+            vector=vector,
+        )
+        for i, vector in enumerate(matrix)
+    ]
+
+    formats: dict[str, Callable[[], bytes]] = {
+        "float": lambda: schemas.BatchEmbeddedResponse(
+            results=[schemas.EmbeddedResult.model_validate(result) for result in results]
+        ).model_dump_json().encode(),
+        "base64": lambda: json.dumps({"results": [responses.base64_result(result) for result in results]}).encode(),
+        "binary": lambda: responses.binary_response([result.vector for result in results], "benchmark-").body,
+    }
+
+    report = {}
+    for name, serialize in formats.items():
+        timings = []
+        for _ in range(repeats):
+            with Timer() as timer:
+                body = serialize()
+            timings.append(timer.elapsed)
+        report[f"serialization.{name}"] = {
+            "operations": repeats,
+            "batch_ms": float(np.median(timings)) * 1000,
+            "vector_us": float(np.median(timings)) / batch_size * 1e6,
+            "body_bytes": len(body),
+        }
+    return report
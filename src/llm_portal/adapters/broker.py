@@ -0,0 +1,257 @@
+import asyncio
+import itertools
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+import utils
+
+from llm_portal import settings
+
+logger = utils.get_logger()
+
+
+@dataclass(frozen=True)
+class Message:
+    """A message read from a topic, acknowledged by ``id`` once handled."""
+
+    id: str
+    body: dict[str, Any]
+    deliveries: int = 1
+
+
+class Broker(ABC):
+    """
+    Durable work queue between the API and the embedding workers.
+
+    Messages of a topic are shared by the consumers of a group, each message goes to one consumer. A
+    message that is not acknowledged within the visibility timeout is delivered again, so a crashed
+    worker loses no work and handlers must be idempotent.
+    """
+
+    @abstractmethod
+    async def publish(self, topic: str, body: dict[str, Any]) -> str:
+        """Append a message to a topic and return its id."""
+
+    @abstractmethod
+    async def consume(self, topic: str, group: str, consumer: str, count: int, block_ms: int) -> list[Message]:
+        """Read up to ``count`` messages for a consumer of a group, waiting up to ``block_ms`` for the first."""
+
+    @abstractmethod
+    async def ack(self, topic: str, group: str, message_id: str):
+        """Acknowledge a handled message, it is not delivered again."""
+
+    async def close(self):  # noqa: B027
+        """Release the connections of the broker, brokers without any keep this no-op."""
+
+
+class InMemoryBroker(Broker):
+    """
+    Broker of a single process, for tests and deployments without Redis.
+
+    Messages are lost with the process, workers have to run in the API process to see them. A topic
+    no group reads yet keeps its last ``max_backlog`` messages, the older ones are dropped.
+
+    Args:
+        visibility_timeout_ms (int): Time after which an unacknowledged message is delivered again
+        max_backlog (int): Messages kept per topic until its first group reads it
+    """
+
+    def __init__(self, visibility_timeout_ms: int = 300_000, max_backlog: int = 10_000):
+        self.visibility_timeout_ms = visibility_timeout_ms
+        self.max_backlog = max_backlog
+        self._ids = itertools.count(1)
+        # Messages of each (topic, group), and the unacknowledged ones with their redelivery deadline
+        self._queues: dict[tuple[str, str], deque[Message]] = {}
+        self._pending: dict[tuple[str, str], dict[str, tuple[Message, float]]] = {}
+        self._topics: dict[str, set[str]] = {}
+        # Messages published before the first group of their topic, handed to that group
+        self._backlog: dict[str, deque[Message]] = {}
+        self._dropping: set[str] = set()
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+
+    async def publish(self, topic: str, body: dict[str, Any]) -> str:
+        message = Message(str(next(self._ids)), json.loads(json.dumps(body)))
+        groups = self._topics.setdefault(topic, set())
+        if not groups:
+            backlog = self._backlog.setdefault(topic, deque(maxlen=self.max_backlog))
+            if len(backlog) == self.max_backlog and topic not in self._dropping:
+                # Events of the outbox are published whether or not anything in the process reads them
+                logger.warning(f"No consumer reads {topic}, its oldest messages are dropped")
+                self._dropping.add(topic)
+            backlog.append(message)
+        for group in groups:
+            self._queues[topic, group].append(message)
+        self._wake()
+        return message.id
+
+    async def consume(self, topic: str, group: str, consumer: str, count: int, block_ms: int) -> list[Message]:
+        if group not in self._topics.setdefault(topic, set()):
+            self._topics[topic].add(group)
+            self._queues[topic, group] = deque(self._backlog.pop(topic, ()))
+            self._pending[topic, group] = {}
+
+        deadline = time.monotonic() + block_ms / 1000
+        while True:
+            messages = self._take(topic, group, count)
+            remaining = deadline - time.monotonic()
+            if messages or remaining <= 0:
+                return messages
+            await self._wait(min(remaining, self.visibility_timeout_ms / 1000))
+
+    async def ack(self, topic: str, group: str, message_id: str):
+        self._pending.get((topic, group), {}).pop(message_id, None)
+
+    def _take(self, topic: str, group: str, count: int) -> list[Message]:
+        now = time.monotonic()
+        pending = self._pending[topic, group]
+        messages = []
+        for message, redeliver_at in list(pending.values()):
+            if len(messages) >= count:
+                break
+            if redeliver_at <= now:
+                messages.append(Message(message.id, message.body, message.deliveries + 1))
+
+        queue = self._queues[topic, group]
+        while queue and len(messages) < count:
+            messages.append(queue.popleft())
+
+        redeliver_at = now + self.visibility_timeout_ms / 1000
+        for message in messages:
+            pending[message.id] = (message, redeliver_at)
+        return messages
+
+    async def _wait(self, timeout: float):
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters.discard(waiter)
+
+    def _wake(self):
+        for loop, future in list(self._waiters):
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+
+class RedisBroker(Broker):
+    """
+    Broker on Redis streams, shared by the API and any number of worker processes.
+
+    Each topic is a stream and each group a consumer group. Messages left unacknowledged by a dead
+    consumer for longer than the visibility timeout are claimed by the next consumer that reads.
+
+    Args:
+        host (str): Redis host
+        port (int): Redis port
+        visibility_timeout_ms (int): Idle time after which an unacknowledged message is claimed again
+        max_length (int): Approximate number of messages kept per stream
+    """
+
+    def __init__(self, host: str, port: int = 6379, visibility_timeout_ms: int = 300_000, max_length: int = 100_000):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("The redis message broker needs the redis package") from e
+
+        self.client = redis_asyncio.Redis(host=host, port=port)
+        self.visibility_timeout_ms = visibility_timeout_ms
+        self.max_length = max_length
+        self._groups: set[tuple[str, str]] = set()
+
+    async def publish(self, topic: str, body: dict[str, Any]) -> str:
+        message_id = await self.client.xadd(
+            topic, {"body": json.dumps(body)}, maxlen=self.max_length, approximate=True
+        )
+        return message_id.decode()
+
+    async def consume(self, topic: str, group: str, consumer: str, count: int, block_ms: int) -> list[Message]:
+        await self._ensure_group(topic, group)
+
+        claimed = await self.client.xautoclaim(
+            topic, group, consumer, min_idle_time=self.visibility_timeout_ms, start_id="0-0", count=count
+        )
+        entries = [(message_id, fields, 2) for message_id, fields in claimed[1] if fields]
+        if not entries:
+            response = await self.client.xreadgroup(group, consumer, {topic: ">"}, count=count, block=block_ms)
+            entries = [(message_id, fields, 1) for _, messages in response or () for message_id, fields in messages]
+        return [
+            Message(message_id.decode(), json.loads(fields[b"body"]), deliveries)
+            for message_id, fields, deliveries in entries
+        ]
+
+    async def ack(self, topic: str, group: str, message_id: str):
+        await self.client.xack(topic, group, message_id)
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def _ensure_group(self, topic: str, group: str):
+        if (topic, group) in self._groups:
+            return
+        try:
+            await self.client.xgroup_create(topic, group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add((topic, group))
+
+
+def create_broker(config: dict[str, Any], visibility_timeout_ms: int = 300_000) -> Broker:
+    """
+    Create the broker of a ``message_broker`` config section.
+
+    Args:
+        config (dict[str, Any]): ``framework`` is ``redis`` or ``memory``, ``connection`` holds the
+            ``host`` and ``port`` of Redis.
+        visibility_timeout_ms (int): Time after which an unacknowledged message is delivered again
+    """
+    framework = config.get("framework", "memory")
+    if framework == "memory":
+        return InMemoryBroker(visibility_timeout_ms)
+    if framework == "redis":
+        connection = config.get("connection", {})
+        return RedisBroker(
+            connection.get("host", "localhost"), int(connection.get("port", 6379)), visibility_timeout_ms
+        )
+    raise ValueError(f"Unsupported message broker: {framework}")
+
+
+_broker: Broker | None = None
+
+
+def get_broker() -> Broker:
+    """Return the broker configured by ``message_broker``, created on first use."""
+    global _broker
+    if _broker is None:
+        _broker = create_broker(
+            utils.get_config().get("message_broker", {}), settings.job_settings().visibility_timeout_ms
+        )
+    return _broker
+
+
+class LazyBroker(Broker):
+    """
+    Broker of ``get_broker``, created on first use rather than when the application is bootstrapped.
+
+    The application starts without Redis, publishing fails until the configured broker can be created.
+    """
+
+    async def publish(self, topic: str, body: dict[str, Any]) -> str:
+        return await get_broker().publish(topic, body)
+
+    async def consume(self, topic: str, group: str, consumer: str, count: int, block_ms: int) -> list[Message]:
+        return await get_broker().consume(topic, group, consumer, count, block_ms)
+
+    async def ack(self, topic: str, group: str, message_id: str):
+        await get_broker().ack(topic, group, message_id)
+
+    async def close(self):
+        if _broker is not None:
+            await _broker.close()
@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+
+import utils
+
+from llm_portal import executors, metrics, settings
+from llm_portal.adapters import queries
+from llm_portal.domains.vectors import VectorLike
+
+logger = utils.get_logger()
+
+Vector = VectorLike
+StoreLookup = Callable[[str], Optional[Vector]]
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a text before hashing so trivially different inputs share a cache entry."""
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def text_hash(
+        provider: str, model: str, text: str, dimensions: int | None = None, pooling: str | None = None
+) -> str:
+    """
+    Content address of an embedding: sha256 of (provider, model, normalized text).
+
+    Reduced ``dimensions`` and the ``pooling`` of a chunked text are part of the address, full-size
+    vectors of whole texts keep the address they always had.
+    """
+    digest = hashlib.sha256()
+    parts = [provider, model, normalize_text(text)]
+    if dimensions is not None:
+        parts.append(str(dimensions))
+    if pooling is not None:
+        parts.append(f"pooling={pooling}")
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+
+    Vectors are looked up in a bounded in-process LRU first, then through ``store_lookup``
+    (stored results by text hash). Concurrent ``get_or_compute`` calls for the same key share a
+    single computation.
+
+    Args:
+        max_entries (int): Capacity of the LRU tier, 0 disables it
+        store_lookup (StoreLookup, optional): Fallback lookup by text hash
+    """
+
+    def __init__(self, max_entries: int = 10000, store_lookup: StoreLookup | None = None):
+        self.max_entries = max_entries
+        self._store_lookup = store_lookup
+        self._entries: OrderedDict[str, Vector] = OrderedDict()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Vector | None:
+        """Return the cached vector for ``key`` or None, counting the lookup as a hit or a miss."""
+        with self._lock:
+            vector = self._get_memory(key)
+        if vector is not None:
+            return vector
+
+        vector = self._get_store(key)
+        if vector is None:
+            with self._lock:
+                self.misses += 1
+        return vector
+
+    def put(self, key: str, vector: Vector):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: str, compute: Callable[[], Vector]) -> Vector:
+        """
+        Return the vector for ``key``, calling ``compute`` only on a miss.
+
+        While a computation for ``key`` is in flight, other callers wait for its result instead of
+        starting their own.
+        """
+        vector, future, owner = self._claim(key)
+        if vector is not None:
+            return vector
+
+        if not owner:
+            return future.result()
+
+        try:
+            vector = self._get_store(key)
+            if vector is None:
+                with self._lock:
+                    self.misses += 1
+                vector = compute()
+                self.put(key, vector)
+            future.set_result(vector)
+            return vector
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[Vector]]) -> Vector:
+        """
+        Async variant of ``get_or_compute``, in-flight computations are shared with sync callers.
+
+        The store lookup runs on the database thread.
+        """
+        vector, future, owner = self._claim(key)
+        if vector is not None:
+            return vector
+
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            vector = None
+            if self._store_lookup is not None:
+                vector = await executors.run_in_executor(executors.db_executor(), self._get_store, key)
+            if vector is None:
+                with self._lock:
+                    self.misses += 1
+                vector = await compute()
+                self.put(key, vector)
+            future.set_result(vector)
+            return vector
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.store_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "evictions": self.evictions,
+                "hit_ratio": (self.memory_hits + self.store_hits) / lookups if lookups else 0.0,
+            }
+
+    def _claim(self, key: str) -> tuple[Vector | None, Future | None, bool]:
+        """Return a memory hit, or the in-flight future for ``key`` and whether the caller owns it."""
+        with self._lock:
+            vector = self._get_memory(key)
+            if vector is not None:
+                return vector, None, False
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = Future()
+                return None, future, True
+            self.shared += 1
+            return None, future, False
+
+    def _get_memory(self, key: str) -> Vector | None:
+        """LRU lookup, the caller holds the lock."""
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+        return vector
+
+    def _get_store(self, key: str) -> Vector | None:
+        if self._store_lookup is None:
+            return None
+        try:
+            with metrics.track("store_lookup"):
+                vector = self._store_lookup(key)
+        except Exception as e:
+            logger.warning(f"Embedding cache store lookup failed: {e}")
+            return None
+        if vector is not None:
+            with self._lock:
+                self.store_hits += 1
+            self.put(key, vector)
+        return vector
+
+
+_cache: EmbeddingCache | None = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, built from the ``embedding.cache`` settings."""
+    global _cache
+    if _cache is None:
+        cache_settings = settings.cache_settings()
+        _cache = EmbeddingCache(
+            max_entries=cache_settings.max_entries,
+            store_lookup=queries.find_vector_by_text_hash if cache_settings.use_store else None,
+        )
+    return _cache
@@ -0,0 +1,280 @@
+"""
+Columnar export of stored embeddings, streamed in constant memory.
+
+    python -m llm_portal.adapters.export --provider vertexai --model text-embedding-005 --format npy --output vectors
+"""
+import argparse
+import io
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Literal
+
+import numpy as np
+import utils
+
+from llm_portal.adapters import orm, queries
+
+logger = utils.get_logger()
+
+ExportFormat = Literal["npy", "ids", "arrow", "parquet"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "npy": "application/octet-stream",
+    "ids": "text/plain; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXTENSIONS: dict[str, str] = {"npy": ".npy", "ids": ".ids.txt", "arrow": ".arrow", "parquet": ".parquet"}
+
+
+def npy_header(count: int, dimensions: int) -> bytes:
+    """Header of a ``.npy`` file holding a C-ordered ``(count, dimensions)`` little-endian float32 matrix."""
+    buffer = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        buffer, {"descr": "<f4", "fortran_order": False, "shape": (count, dimensions)}
+    )
+    return buffer.getvalue()
+
+
+def _check_count(expected: int, written: int):
+    if written != expected:
+        raise RuntimeError(f"Export expected {expected} rows, read {written}")
+
+
+def iter_npy(count: int, batches: Iterator[queries.ResultBatch]) -> Iterator[bytes]:
+    """The ``.npy`` bytes of the vectors, the rows are in the order of the ids sidecar."""
+    written = 0
+    for batch in batches:
+        if written == 0:
+            yield npy_header(count, batch.vectors.shape[1])
+        written += len(batch.ids)
+        yield batch.vectors.astype("<f4", copy=False).tobytes()
+    if written == 0:
+        yield npy_header(0, 0)
+    _check_count(count, written)
+
+
+def iter_ids(count: int, batches: Iterator[queries.ResultBatch]) -> Iterator[bytes]:
+    """The ids sidecar of a ``.npy`` export, one id per line."""
+    written = 0
+    for batch in batches:
+        written += len(batch.ids)
+        yield "".join(f"{result_id}\n" for result_id in batch.ids).encode()
+    _check_count(count, written)
+
+
+class _Sink(io.RawIOBase):
+    """Write-only stream keeping what was written until it is taken, lets pyarrow write to a generator."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Arrow and Parquet exports need the pyarrow package, install llm-portal[export]") from e
+    return pyarrow
+
+
+def check_format(export_format: ExportFormat):
+    """Raise ``RuntimeError`` when the package a format is written with is not installed."""
+    if export_format in ("arrow", "parquet"):
+        _pyarrow()
+
+
+def _arrow_schema(pa, dimensions: int, include_text: bool, metadata: dict[str, str]):
+    fields = [pa.field("id", pa.string(), nullable=False)]
+    if include_text:
+        fields.append(pa.field("text", pa.string()))
+    fields += [
+        pa.field("created_time", pa.timestamp("us")),
+        pa.field("vector", pa.list_(pa.float32(), dimensions), nullable=False),
+    ]
+    return pa.schema(fields, metadata={**metadata, "dimensions": str(dimensions)})
+
+
+def _arrow_batch(pa, schema, batch: queries.ResultBatch):
+    dimensions = batch.vectors.shape[1]
+    columns = [pa.array(batch.ids, pa.string())]
+    if batch.texts is not None:
+        columns.append(pa.array(batch.texts, pa.string()))
+    columns += [
+        pa.array(batch.created_times, pa.timestamp("us")),
+        pa.FixedSizeListArray.from_arrays(pa.array(batch.vectors.reshape(-1), pa.float32()), dimensions),
+    ]
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def iter_arrow(
+        count: int,
+        batches: Iterator[queries.ResultBatch],
+        file_format: Literal["arrow", "parquet"],
+        include_text: bool = False,
+        metadata: dict[str, str] | None = None,
+) -> Iterator[bytes]:
+    """
+    Arrow IPC stream or Parquet bytes, one record batch or row group per batch.
+
+    Columns are ``id``, ``text`` when included, ``created_time`` and ``vector``, a fixed-size list of float32.
+    """
+    pa = _pyarrow()
+    sink = _Sink()
+    writer, written = None, 0
+    for batch in batches:
+        if writer is None:
+            schema = _arrow_schema(pa, batch.vectors.shape[1], include_text, metadata or {})
+            writer = (
+                pa.ipc.new_stream(sink, schema) if file_format == "arrow" else pa.parquet.ParquetWriter(sink, schema)
+            )
+        record_batch = _arrow_batch(pa, schema, batch)
+        if file_format == "arrow":
+            writer.write_batch(record_batch)
+        else:
+            writer.write_table(pa.Table.from_batches([record_batch]))
+        written += len(batch.ids)
+        yield sink.take()
+
+    if writer is None:
+        schema = _arrow_schema(pa, 0, include_text, metadata or {})
+        writer = pa.ipc.new_stream(sink, schema) if file_format == "arrow" else pa.parquet.ParquetWriter(sink, schema)
+    writer.close()
+    yield sink.take()
+    _check_count(count, written)
+
+
+def iter_export(
+        export_format: ExportFormat,
+        provider: str,
+        model: str,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        include_text: bool = False,
+        batch_size: int = 10000,
+        dimensions: int | None = None,
+) -> Iterator[bytes]:
+    """
+    Stream the results of one (provider, model) created in ``[since, until)`` in a columnar format.
+
+    Rows are in id order. ``npy`` is the float32 matrix, ``ids`` its sidecar, ``arrow`` an Arrow IPC
+    stream and ``parquet`` a Parquet file. Memory is bounded by ``batch_size`` rows. Models stored at
+    several sizes are exported one ``dimensions`` at a time.
+    """
+    with queries.export_cursor(
+            provider, model, since, until, include_text, batch_size, dimensions
+    ) as (count, batches):
+        if export_format == "npy":
+            yield from iter_npy(count, batches)
+        elif export_format == "ids":
+            yield from iter_ids(count, batches)
+        else:
+            metadata = {"provider": provider, "model": model}
+            yield from iter_arrow(count, batches, export_format, include_text, metadata)
+
+
+def export_files(
+        output: str | Path,
+        export_format: Literal["npy", "arrow", "parquet"],
+        provider: str,
+        model: str,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        include_text: bool = False,
+        batch_size: int = 10000,
+        dimensions: int | None = None,
+) -> tuple[int, list[Path]]:
+    """
+    Export to files next to ``output``, ``npy`` writes the matrix and its ids sidecar in one pass.
+
+    Returns:
+        tuple[int, list[Path]]: The number of results exported and the files written.
+    """
+    check_format(export_format)
+    output = Path(output)
+    paths = [output.with_name(output.name + EXTENSIONS[export_format])]
+    with queries.export_cursor(
+            provider, model, since, until, include_text, batch_size, dimensions
+    ) as (count, batches):
+        if export_format == "npy":
+            paths.append(output.with_name(output.name + EXTENSIONS["ids"]))
+            with paths[0].open("wb") as matrix_file, paths[1].open("wb") as ids_file:
+                # The ids are written while the matrix rows go by, the cursor is read once
+                def with_ids():
+                    for batch in batches:
+                        ids_file.write("".join(f"{result_id}\n" for result_id in batch.ids).encode())
+                        yield batch
+
+                for chunk in iter_npy(count, with_ids()):
+                    matrix_file.write(chunk)
+        else:
+            metadata = {"provider": provider, "model": model}
+            with paths[0].open("wb") as file:
+                for chunk in iter_arrow(count, batches, export_format, include_text, metadata):
+                    file.write(chunk)
+    return count, paths
+
+
+def load_npy(output: str | Path) -> tuple[np.ndarray, list[str]]:
+    """Memory-map an ``npy`` export and read its ids."""
+    output = Path(output)
+    matrix = np.load(output.with_name(output.name + EXTENSIONS["npy"]), mmap_mode="r")
+    ids = output.with_name(output.name + EXTENSIONS["ids"]).read_text().splitlines()
+    return matrix, ids
+
+
+def _datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Export the stored embeddings of a provider and model")
+    parser.add_argument("--provider", required=True)
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--format", choices=["npy", "arrow", "parquet"], default="npy")
+    parser.add_argument("--output", required=True, help="path without extension, e.g. exports/vectors")
+    parser.add_argument("--since", type=_datetime, default=None, help="ISO created time, inclusive")
+    parser.add_argument("--until", type=_datetime, default=None, help="ISO created time, exclusive")
+    parser.add_argument("--include-text", action="store_true", help="add the texts to Arrow and Parquet exports")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument(
+        "--dimensions", type=int, default=None,
+        help="only the results of this size, required for models stored at several sizes",
+    )
+    args = parser.parse_args(argv)
+
+    orm.start_mapper()
+    count, paths = export_files(
+        args.output,
+        args.format,
+        args.provider,
+        args.model,
+        since=args.since,
+        until=args.until,
+        include_text=args.include_text,
+        batch_size=args.batch_size,
+        dimensions=args.dimensions,
+    )
+    logger.info(f"Exported {count} embeddings to {', '.join(str(path) for path in paths)}")
+
+
+if __name__ == "__main__":
+    main()
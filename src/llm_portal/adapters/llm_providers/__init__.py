@@ -1,2 +1,43 @@
 from .base import LLMProvider
-from .vertexai import VertexAIProvider
\ No newline at end of file
+from .errors import (
+    OverloadedError,
+    ProviderError,
+    RateLimitError,
+    TenantLimitError,
+    TransientProviderError,
+    classify_error,
+)
+from .fake import FakeProvider, Latency
+from .local import LocalProvider
+from .routed import BackendSelector, RoutedProvider
+from .scheduling import RequestContext, Scheduler, check_lane, current_context, request_context
+
+__all__ = [
+    "BackendSelector",
+    "FakeProvider",
+    "LLMProvider",
+    "Latency",
+    "LocalProvider",
+    "OverloadedError",
+    "ProviderError",
+    "RateLimitError",
+    "RequestContext",
+    "RoutedProvider",
+    "Scheduler",
+    "TenantLimitError",
+    "TransientProviderError",
+    "VertexAIProvider",
+    "check_lane",
+    "classify_error",
+    "current_context",
+    "request_context",
+]
+
+
+def __getattr__(name: str):
+    # The Vertex AI SDK is slow to import, it is only imported once the provider is used
+    if name == "VertexAIProvider":
+        from .vertexai import VertexAIProvider
+
+        return VertexAIProvider
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,18 +1,252 @@
+import asyncio
+import functools
+import inspect
+import threading
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Callable, Iterable, Iterator, List
+
+from llm_portal import executors, metrics
+from llm_portal.domains import vectors
+
+from .resilience import CallPolicy
+from .scheduling import Scheduler
+
+DEFAULT_MAX_BATCH_SIZE = 1
+DEFAULT_MAX_BATCH_TOKENS = 20000
+DEFAULT_MAX_INPUT_TOKENS = 2048
+CHARS_PER_TOKEN = 4
+
+
+def _instrumented(method: Callable) -> Callable:
+    """
+    Send provider embedding calls through the call policy of their model, async calls wait for a slot
+    of the scheduler of their model first.
+
+    Latency, call, text and batch-size metrics are recorded for every attempt.
+    """
+
+    def record(self, list_texts, model):
+        metrics.PROVIDER_CALLS.inc(provider=self.provider_name, model=model)
+        metrics.TEXTS_EMBEDDED.inc(len(list_texts), provider=self.provider_name, model=model)
+        metrics.BATCH_SIZE.observe(len(list_texts), provider=self.provider_name, model=model)
+        return metrics.track("provider", self.provider_name, model)
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, list_texts, model=None, **kwargs):
+            async def attempt():
+                with record(self, list_texts, model):
+                    return await method(self, list_texts, model, **kwargs)
+
+            if model not in self._embedding_models:
+                return await attempt()
+            tokens = self.estimate_batch_tokens(list_texts)
+            scheduler = self.scheduler(model)
+            if scheduler is None:
+                return await self.call_policy(model).acall(attempt, tokens)
+            async with scheduler.slot(tokens):
+                return await self.call_policy(model).acall(attempt, tokens)
+    else:
+        @functools.wraps(method)
+        def wrapper(self, list_texts, model=None, **kwargs):
+            def attempt():
+                with record(self, list_texts, model):
+                    return method(self, list_texts, model, **kwargs)
+
+            if model not in self._embedding_models:
+                return attempt()
+            return self.call_policy(model).call(attempt, self.estimate_batch_tokens(list_texts))
+    return wrapper
 
 
 class LLMProvider(ABC):
+    """
+    Base class of the embedding providers.
+
+    The ``generate_embeddings`` and ``agenerate_embeddings`` of every subclass are instrumented
+    automatically: each call is rate limited, retried and hedged by the ``CallPolicy`` of its model
+    and shows up in ``/metrics``. Async calls, native or run in the thread pool, are queued by priority lane
+    by the ``Scheduler`` of their model. Instances are long-lived and shared across threads, model handles
+    are loaded once and reused by every call.
+
+    A model may declare the reduced ``supported_dimensions`` it serves. Models with ``native_dimensions``
+    get a ``dimensions`` keyword on ``generate_embeddings``, the vectors of the others are truncated and
+    renormalized after the call, which suits Matryoshka-trained models.
+    """
+
+    def __init_subclass__(cls, instrumented: bool = True, **kwargs):
+        """Providers that delegate to other providers pass ``instrumented=False`` to not count calls twice."""
+        super().__init_subclass__(**kwargs)
+        if not instrumented:
+            return
+        for name in ("generate_embeddings", "agenerate_embeddings"):
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "__isabstractmethod__", False):
+                setattr(cls, name, _instrumented(method))
 
     def __init__(self, provider_name:str):
         self._provider_name = provider_name
         self._embedding_models = {}
+        self._model_handles: dict[str, Any] = {}
+        self._model_handles_lock = threading.Lock()
+        self._call_policies: dict[str, CallPolicy] = {}
+        self._schedulers: dict[str, Scheduler | None] = {}
 
     @abstractmethod
-    def generate_embeddings(self, list_texts: list[str], model: str = None) -> List[float]:
-        """Generate embeddings for the given list of texts using the specified model"""
+    def generate_embeddings(self, list_texts: list[str], model: str = None) -> List[List[float]]:
+        """Generate one embedding per text, in the order of ``list_texts``, using the specified model"""
         pass
 
+    def generate_embeddings_batched(
+            self, list_texts: list[str], model: str = None, dimensions: int | None = None
+    ) -> List[List[float]]:
+        """
+        Generate embeddings for any number of texts by splitting them into provider-sized batches.
+
+        Args:
+            list_texts (list[str]): The input texts, in the order the vectors should be returned.
+            model (str, optional): The embedding model to use.
+            dimensions (int, optional): Reduced dimensions of the vectors, the model's full size by default.
+
+        Returns:
+            List[List[float]]: One embedding vector per input text, in input order.
+        """
+        reduced = self.reduced_dimensions(model, dimensions)
+
+        embedded = []
+        for batch in self.split_batches(list_texts, model):
+            embedded.extend(self.generate_embeddings(batch, model, **self._dimensions_kwargs(model, reduced)))
+        return self._reduce(embedded, reduced)
+
+    async def agenerate_embeddings(self, list_texts: list[str], model: str = None, **kwargs) -> List[List[float]]:
+        """
+        Async variant of ``generate_embeddings``.
+
+        Providers with a native async client override this, the default waits for a slot of the model's
+        scheduler, then runs the synchronous call in the bounded provider thread pool so it never blocks
+        the event loop.
+        """
+        scheduler = self.scheduler(model) if model in self._embedding_models else None
+        if scheduler is None:
+            return await executors.run_in_executor(
+                executors.provider_executor(), self.generate_embeddings, list_texts, model, **kwargs
+            )
+        async with scheduler.slot(self.estimate_batch_tokens(list_texts)):
+            return await executors.run_in_executor(
+                executors.provider_executor(), self.generate_embeddings, list_texts, model, **kwargs
+            )
+
+    async def agenerate_embeddings_batched(
+            self, list_texts: list[str], model: str = None, dimensions: int | None = None
+    ) -> List[List[float]]:
+        """Async variant of ``generate_embeddings_batched``, provider-sized batches are sent concurrently."""
+        reduced = self.reduced_dimensions(model, dimensions)
+        kwargs = self._dimensions_kwargs(model, reduced)
+
+        batches = await asyncio.gather(
+            *(self.agenerate_embeddings(batch, model, **kwargs) for batch in self.split_batches(list_texts, model))
+        )
+        return self._reduce([vector for batch in batches for vector in batch], reduced)
+
+    def reduced_dimensions(self, model: str, dimensions: int | None) -> int | None:
+        """
+        Validate requested dimensions against the model.
+
+        Returns:
+            int | None: The reduced dimensions, None when the full size is requested.
+        """
+        self._validate_embedding_model(model)
+        if dimensions is None or dimensions == self.model_dimensions(model):
+            return None
+        supported = self.supported_dimensions(model)
+        if dimensions not in supported:
+            raise ValueError(
+                f"Model {model} does not support {dimensions} dimensions. Supported dimensions are: {supported}"
+            )
+        return dimensions
+
+    def _dimensions_kwargs(self, model: str, reduced: int | None) -> dict:
+        return {"dimensions": reduced} if reduced is not None and self.native_dimensions(model) else {}
+
+    @staticmethod
+    def _reduce(embedded: List[List[float]], reduced: int | None) -> List[List[float]]:
+        # Native output is renormalized too, providers do not all return unit vectors at reduced sizes
+        return embedded if reduced is None or not embedded else vectors.truncate(embedded, reduced).tolist()
+
+    def model_handle(self, model: str) -> Any:
+        """Return the loaded handle of a model, loading it on first use. Thread-safe."""
+        handle = self._model_handles.get(model)
+        if handle is None:
+            with self._model_handles_lock:
+                handle = self._model_handles.get(model)
+                if handle is None:
+                    handle = self._model_handles[model] = self._load_model(model)
+        return handle
+
+    async def amodel_handle(self, model: str) -> Any:
+        """Async variant of ``model_handle``, a model that is not loaded yet is loaded in the provider thread pool."""
+        handle = self._model_handles.get(model)
+        if handle is None:
+            handle = await executors.run_in_executor(executors.provider_executor(), self.model_handle, model)
+        return handle
+
+    def call_policy(self, model: str) -> CallPolicy:
+        """Return the rate limiting, retry and hedging policy of a model, configured on first use."""
+        policy = self._call_policies.get(model)
+        if policy is None:
+            with self._model_handles_lock:
+                policy = self._call_policies.get(model)
+                if policy is None:
+                    policy = self._call_policies[model] = CallPolicy.from_settings(self.provider_name, model)
+        return policy
+
+    def scheduler(self, model: str) -> Scheduler | None:
+        """Return the lane scheduler of the async calls to a model, None when scheduling is disabled."""
+        if model not in self._schedulers:
+            with self._model_handles_lock:
+                if model not in self._schedulers:
+                    self._schedulers[model] = Scheduler.from_settings(self.provider_name, model)
+        return self._schedulers[model]
+
+    def _load_model(self, model: str) -> Any:
+        """Load the client-side handle of a model, providers without one use the model name."""
+        return model
+
+    def warm_up(self, models: Iterable[str]):
+        """Load the handles of ``models`` ahead of the first request. Blocking."""
+        for model in models:
+            self._validate_embedding_model(model)
+            self.model_handle(model)
+
+    def split_batches(self, list_texts: list[str], model: str) -> Iterator[list[str]]:
+        """
+        Split texts into consecutive batches that respect the model's per-call text-count and token limits.
+
+        A single text larger than the token limit still gets a batch of its own, the provider decides
+        whether to truncate or reject it.
+        """
+        max_size = self.max_batch_size(model)
+        max_tokens = self.max_batch_tokens(model)
+
+        batch, batch_tokens = [], 0
+        for text in list_texts:
+            tokens = self.estimate_tokens(text)
+            if batch and (len(batch) >= max_size or batch_tokens + tokens > max_tokens):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Cheap upper-bound-ish token estimate used for batching, providers may override with a real tokenizer."""
+        return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+    def estimate_batch_tokens(self, list_texts: list[str]) -> int:
+        return sum(self.estimate_tokens(text) for text in list_texts)
+
     def _validate_embedding_model(self, model: str) -> None:
         """Validate the model name."""
         if model not in self._embedding_models:
@@ -36,3 +270,22 @@ class LLMProvider(ABC):
 
     def model_dimensions(self, model_name) -> int:
         return self._embedding_models[model_name]["dimensions"]
+
+    def supported_dimensions(self, model_name) -> List[int]:
+        """Dimensions a model can return, its full size included, in ascending order."""
+        model = self._embedding_models[model_name]
+        return sorted({*model.get("supported_dimensions", ()), model["dimensions"]})
+
+    def native_dimensions(self, model_name) -> bool:
+        """Whether the model reduces dimensions itself, through a ``dimensions`` keyword of ``generate_embeddings``."""
+        return self._embedding_models[model_name].get("native_dimensions", False)
+
+    def max_batch_size(self, model_name) -> int:
+        return self._embedding_models[model_name].get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)
+
+    def max_batch_tokens(self, model_name) -> int:
+        return self._embedding_models[model_name].get("max_batch_tokens", DEFAULT_MAX_BATCH_TOKENS)
+
+    def max_input_tokens(self, model_name) -> int:
+        """Longest text the model embeds, in ``estimate_tokens`` tokens, longer texts are chunked."""
+        return self._embedding_models[model_name].get("max_input_tokens", DEFAULT_MAX_INPUT_TOKENS)
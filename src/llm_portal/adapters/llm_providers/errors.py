@@ -0,0 +1,79 @@
+from typing import Literal
+
+ErrorKind = Literal["rate_limit", "transient", "permanent"]
+
+# Exception class names, anywhere in the MRO, of the provider SDKs and the standard library
+RATE_LIMIT_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+TRANSIENT_ERRORS = {
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "GatewayTimeout",
+    "BadGateway",
+    "Aborted",
+    "TimeoutError",
+    "ConnectionError",
+}
+
+
+class ProviderError(Exception):
+    """Raised by providers when an embedding call fails."""
+
+
+class TransientProviderError(ProviderError):
+    """Raised by providers when a call failed in a way that a retry may fix."""
+
+
+class RateLimitError(TransientProviderError):
+    """
+    Raised by providers when a call is rejected by a quota or rate limit.
+
+    Args:
+        message (str): Error message
+        retry_after (float, optional): Seconds the provider asked to wait before retrying
+    """
+
+    def __init__(self, message: str = "", retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def classify_error(error: BaseException) -> ErrorKind:
+    """Classify a provider call failure into rate-limited, transient (worth a retry) or permanent."""
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if isinstance(error, RateLimitError) or names & RATE_LIMIT_ERRORS:
+        return "rate_limit"
+    if isinstance(error, TransientProviderError) or names & TRANSIENT_ERRORS:
+        return "transient"
+    return "permanent"
+
+
+def to_provider_error(error: Exception, message: str) -> ProviderError:
+    """Wrap an SDK error into the ``ProviderError`` of its kind, keeping it as the cause."""
+    kind = classify_error(error)
+    if kind == "rate_limit":
+        wrapped = RateLimitError(f"{message}: {error}", retry_after=getattr(error, "retry_after", None))
+    elif kind == "transient":
+        wrapped = TransientProviderError(f"{message}: {error}")
+    else:
+        wrapped = ProviderError(f"{message}: {error}")
+    wrapped.__cause__ = error
+    return wrapped
+
+
+class OverloadedError(TransientProviderError):
+    """
+    Raised when a call is not admitted because it could not be sent before its deadline.
+
+    Args:
+        message (str): Error message
+        retry_after (float, optional): Seconds after which the queue is expected to have room again
+    """
+
+    def __init__(self, message: str = "", retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TenantLimitError(RateLimitError):
+    """Raised when a tenant already has as many calls waiting as it is allowed."""
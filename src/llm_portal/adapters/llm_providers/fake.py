@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Literal, Sequence
+
+import numpy as np
+
+from .base import LLMProvider
+from .errors import RateLimitError
+
+
+@dataclass(frozen=True)
+class Latency:
+    """
+    Latency of a fake provider call.
+
+    Args:
+        distribution (str): ``constant``, ``uniform`` (between 0 and twice the mean), ``exponential``
+            or ``lognormal``
+        mean_ms (float): Mean latency of a call
+        per_text_ms (float): Latency added per text of the call
+        sigma (float): Shape of the lognormal distribution, larger means a longer tail
+    """
+
+    distribution: Literal["constant", "uniform", "exponential", "lognormal"] = "constant"
+    mean_ms: float = 0.0
+    per_text_ms: float = 0.0
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random, count: int) -> float:
+        """Draw the latency in seconds of a call embedding ``count`` texts."""
+        mean = self.mean_ms
+        if mean <= 0:
+            latency = 0.0
+        elif self.distribution == "uniform":
+            latency = rng.uniform(0, 2 * mean)
+        elif self.distribution == "exponential":
+            latency = rng.expovariate(1 / mean)
+        elif self.distribution == "lognormal":
+            latency = rng.lognormvariate(math.log(mean) - self.sigma**2 / 2, self.sigma)
+        else:
+            latency = mean
+        return (latency + self.per_text_ms * count) / 1000
+
+
+class FakeProvider(LLMProvider):
+    """
+    Offline provider for tests and benchmarks.
+
+    Vectors are unit-length and derived from the text only, so the same text always gets the same
+    vector. Latency and rate-limit errors are drawn from a seeded generator, so a run is reproducible.
+
+    Args:
+        provider_name (str): Name the provider reports
+        dimensions (int): Dimensions of every model
+        supported_dimensions (Sequence[int]): Reduced dimensions of every model
+        native_dimensions (bool): Whether the models reduce dimensions themselves, or are truncated after the call
+        latency (Latency, optional): Latency of each call, no latency by default
+        rate_limit_probability (float): Chance that a call raises ``RateLimitError``
+        max_batch_size (int): Texts per call accepted by every model
+        max_input_tokens (int): Longest text of every model, in estimated tokens
+        seed (int): Seed of the latency and error draws
+    """
+
+    MODELS = ("fake-model-1", "fake-model-2")
+
+    def __init__(
+            self,
+            provider_name: str = "fake-provider",
+            dimensions: int = 768,
+            supported_dimensions: Sequence[int] = (),
+            native_dimensions: bool = False,
+            latency: Latency | None = None,
+            rate_limit_probability: float = 0.0,
+            max_batch_size: int = 250,
+            max_input_tokens: int = 2048,
+            seed: int = 0,
+    ):
+        super().__init__(provider_name)
+        self.latency = latency or Latency()
+        self.rate_limit_probability = rate_limit_probability
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._embedding_models = {
+            model: {
+                "dimensions": dimensions,
+                "supported_dimensions": tuple(supported_dimensions),
+                "native_dimensions": native_dimensions,
+                "max_batch_size": max_batch_size,
+                "max_batch_tokens": 20000,
+                "max_input_tokens": max_input_tokens,
+            }
+            for model in self.MODELS
+        }
+
+    def generate_embeddings(
+            self, list_texts: list[str], model: str = None, dimensions: int | None = None
+    ) -> List[List[float]]:
+        self._validate_embedding_model(model)
+        delay = self._draw(len(list_texts))
+        if delay:
+            time.sleep(delay)
+        return self._vectors(list_texts, model, dimensions)
+
+    async def agenerate_embeddings(
+            self, list_texts: list[str], model: str = None, dimensions: int | None = None
+    ) -> List[List[float]]:
+        self._validate_embedding_model(model)
+        delay = self._draw(len(list_texts))
+        if delay:
+            await asyncio.sleep(delay)
+        return self._vectors(list_texts, model, dimensions)
+
+    def _draw(self, count: int) -> float:
+        """Draw the latency of a call, or raise ``RateLimitError`` for a rejected call."""
+        with self._rng_lock:
+            if self.rate_limit_probability and self._rng.random() < self.rate_limit_probability:
+                raise RateLimitError(f"{self.provider_name} rate limit exceeded")
+            return self.latency.sample(self._rng, count)
+
+    def _vectors(self, list_texts: list[str], model: str, dimensions: int | None = None) -> List[List[float]]:
+        full = self.model_dimensions(model)
+        vectors = []
+        for text in list_texts:
+            seed = int.from_bytes(hashlib.blake2b(f"{model}\x00{text}".encode(), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(full, dtype=np.float32)[:dimensions]
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+    @property
+    def available_models(self) -> List[str]:
+        return list(self._embedding_models.keys())
@@ -0,0 +1,164 @@
+import re
+import unicodedata
+import zlib
+from typing import Any, List
+
+import numpy as np
+
+from llm_portal import settings
+
+from .base import LLMProvider
+from .errors import ProviderError
+
+WORD_PATTERN = re.compile(r"\w+")
+WORD_WEIGHT = 1.0
+NGRAM_WEIGHT = 0.5
+
+
+def _features(text: str, ngram_size: int) -> list[str]:
+    """Words and the character n-grams of each word, padded with spaces, of a normalized text."""
+    words = WORD_PATTERN.findall(unicodedata.normalize("NFKC", text).lower())
+    features = [f"w:{word}" for word in words]
+    if ngram_size:
+        for word in words:
+            padded = f" {word} "
+            features.extend(padded[i:i + ngram_size] for i in range(max(1, len(padded) - ngram_size + 1)))
+    return features
+
+
+def hash_features(list_texts: list[str], buckets: int, ngram_size: int = 3, seed: int = 0) -> np.ndarray:
+    """
+    Signed feature hashing of texts into a ``(len(list_texts), buckets)`` float32 matrix.
+
+    Hashes are CRC32, stable across processes, the lowest bits pick the bucket and the highest the sign.
+    """
+    rows, hashes, weights = [], [], []
+    for row, text in enumerate(list_texts):
+        for feature in _features(text, ngram_size):
+            rows.append(row)
+            hashes.append(zlib.crc32(feature.encode(), seed))
+            weights.append(WORD_WEIGHT if feature.startswith("w:") else NGRAM_WEIGHT)
+
+    hashes = np.asarray(hashes, dtype=np.uint32)
+    signs = np.where(hashes >> 31, -1.0, 1.0)
+    cells = np.asarray(rows, dtype=np.int64) * buckets + (hashes % buckets)
+    counts = np.bincount(cells, weights=signs * np.asarray(weights), minlength=len(list_texts) * buckets)
+    return counts.reshape(len(list_texts), buckets).astype(np.float32)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class LocalProvider(LLMProvider):
+    """
+    Offline provider computing embeddings on the CPU, without network calls.
+
+    Hashing models are cheap lexical embeddings, good enough for dedup keys, routing and tests. Random
+    projections spread the hashed features over every dimension. ONNX models run a local
+    sentence-embedding model with onnxruntime, mean pooled over the attention mask. Every model embeds
+    a whole batch with vectorized NumPy or one ONNX run. Async calls run in the provider thread pool.
+
+    Args:
+        provider_name (str): Name the provider reports
+        models (dict[str, settings.LocalModelSettings], optional): Models by name, read from
+            ``embedding.local.models`` by default
+    """
+
+    def __init__(self, provider_name: str = "local", models: dict[str, settings.LocalModelSettings] | None = None):
+        super().__init__(provider_name)
+        self._model_settings = models if models is not None else settings.local_provider_settings().models
+        self._embedding_models = {
+            name: {
+                "dimensions": model.dimensions,
+                "supported_dimensions": model.supported_dimensions,
+                "max_batch_size": model.max_batch_size,
+                # Limits are per text count only, local models have no request size quota
+                "max_batch_tokens": model.max_batch_size * model.max_length,
+                "max_input_tokens": model.max_length,
+            }
+            for name, model in self._model_settings.items()
+        }
+
+    def generate_embeddings(self, list_texts: list[str], model: str = None) -> List[List[float]]:
+        """
+        Generates text embeddings with a local model.
+
+        Args:
+            list_texts (list[str]): The list of input texts for which embeddings are to be generated.
+            model (str, optional): The name of a configured local model.
+
+        Returns:
+            List[List[float]]: One unit-length embedding vector per input text, in input order.
+        """
+        self._validate_embedding_model(model)
+        model_settings = self._model_settings[model]
+        handle = self.model_handle(model)
+
+        if model_settings.method == "onnx":
+            matrix = self._run_onnx(handle, list_texts, model_settings)
+        elif model_settings.method == "random_projection":
+            features = hash_features(
+                list_texts, model_settings.hashed_features, model_settings.ngram_size, model_settings.seed
+            )
+            matrix = features @ handle
+        else:
+            matrix = hash_features(
+                list_texts, model_settings.dimensions, model_settings.ngram_size, model_settings.seed
+            )
+        return _normalize(matrix).tolist()
+
+    def _load_model(self, model: str) -> Any:
+        model_settings = self._model_settings[model]
+        if model_settings.method == "random_projection":
+            rng = np.random.default_rng(model_settings.seed)
+            projection = rng.standard_normal((model_settings.hashed_features, model_settings.dimensions), np.float32)
+            return projection / np.sqrt(model_settings.dimensions)
+        if model_settings.method == "onnx":
+            return self._load_onnx(model_settings)
+        return model
+
+    @staticmethod
+    def _load_onnx(model_settings: settings.LocalModelSettings) -> tuple[Any, Any]:
+        try:
+            import onnxruntime
+            import tokenizers
+        except ImportError as e:
+            raise ProviderError("ONNX models need the onnxruntime and tokenizers packages") from e
+        if not model_settings.path or not model_settings.tokenizer_path:
+            raise ProviderError("ONNX models need a path and a tokenizer_path")
+
+        session = onnxruntime.InferenceSession(model_settings.path, providers=["CPUExecutionProvider"])
+        tokenizer = tokenizers.Tokenizer.from_file(model_settings.tokenizer_path)
+        tokenizer.enable_truncation(model_settings.max_length)
+        tokenizer.enable_padding()
+        return session, tokenizer
+
+    @staticmethod
+    def _run_onnx(handle: tuple[Any, Any], list_texts: list[str], model_settings: settings.LocalModelSettings):
+        session, tokenizer = handle
+        encodings = tokenizer.encode_batch(list_texts)
+        input_ids = np.asarray([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        available = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids),
+        }
+        inputs = {node.name: available[node.name] for node in session.get_inputs() if node.name in available}
+
+        output = session.run(None, inputs)[0]
+        if output.ndim == 3:
+            # Mean pooling over the real tokens
+            mask = attention_mask[:, :, None].astype(output.dtype)
+            output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1)
+        if output.shape[-1] != model_settings.dimensions:
+            raise ProviderError(
+                f"ONNX model returned {output.shape[-1]} dimensions, expected {model_settings.dimensions}"
+            )
+        return output.astype(np.float32)
+
+    @property
+    def available_models(self) -> List[str]:
+        return list(self._embedding_models.keys())
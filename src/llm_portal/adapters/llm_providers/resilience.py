@@ -0,0 +1,243 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from llm_portal import metrics, settings
+
+from .errors import classify_error
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of blocking.
+
+    A reservation always succeeds and returns how long the caller must wait before spending it, so
+    callers are served in order and the bucket works the same for threads and coroutines. A cost larger
+    than the capacity is allowed and pushes later reservations back.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Largest number of tokens the bucket holds
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float) -> float:
+        """Take ``cost`` tokens and return the seconds to wait until they are available."""
+        with self._lock:
+            self._refill()
+            self._tokens -= cost
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def try_reserve(self, cost: float) -> bool:
+        """Take ``cost`` tokens only if they are available now."""
+        with self._lock:
+            self._refill()
+            if self._tokens < cost:
+                return False
+            self._tokens -= cost
+            return True
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """
+    Request and token quota of one (provider, model).
+
+    Args:
+        requests_per_minute (float, optional): Calls per minute, unlimited when not set
+        tokens_per_minute (float, optional): Input tokens per minute, unlimited when not set
+        burst_seconds (float): Seconds of quota that can be spent at once
+    """
+
+    def __init__(
+            self,
+            requests_per_minute: float | None = None,
+            tokens_per_minute: float | None = None,
+            burst_seconds: float = 1.0,
+    ):
+        self._buckets: list[tuple[TokenBucket, bool]] = []
+        if requests_per_minute:
+            rate = requests_per_minute / 60
+            self._buckets.append((TokenBucket(rate, max(1.0, rate * burst_seconds)), False))
+        if tokens_per_minute:
+            rate = tokens_per_minute / 60
+            self._buckets.append((TokenBucket(rate, rate * burst_seconds), True))
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve one call of ``tokens`` tokens and return the seconds to wait before sending it."""
+        return max((bucket.reserve(tokens if by_tokens else 1) for bucket, by_tokens in self._buckets), default=0.0)
+
+    def try_reserve(self, tokens: int) -> bool:
+        """Reserve one call only if the quota allows it now, used for optional calls like hedges."""
+        taken = []
+        for bucket, by_tokens in self._buckets:
+            cost = tokens if by_tokens else 1
+            if not bucket.try_reserve(cost):
+                # Give back what was taken from the other buckets
+                for taken_bucket, taken_cost in taken:
+                    taken_bucket.reserve(-taken_cost)
+                return False
+            taken.append((bucket, cost))
+        return True
+
+
+class LatencyTracker:
+    """Latencies of the recent successful calls, in seconds."""
+
+    def __init__(self, size: int = 256):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> float | None:
+        """The ``q`` quantile of the recent latencies, ``None`` with fewer than ``min_samples`` samples."""
+        samples = sorted(self._samples)
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class CallPolicy:
+    """
+    Rate limiting, retries and hedging of the calls to one (provider, model).
+
+    Each attempt first reserves its quota and waits for it. Rate-limited and transient errors are
+    retried with full-jitter exponential backoff, honoring the provider's ``retry_after`` when given.
+    When hedging is enabled, an async attempt slower than the configured latency quantile gets a
+    duplicate, if the quota allows one right away, and the first successful answer wins.
+
+    Args:
+        provider_name (str): Provider name, used as metric label
+        model (str): Model name, used as metric label
+        limiter (RateLimiter, optional): Quota of the calls, unlimited when not given
+        retry (settings.RetrySettings): Retry settings
+        hedging (settings.HedgingSettings): Hedging settings
+    """
+
+    def __init__(
+            self,
+            provider_name: str,
+            model: str,
+            limiter: RateLimiter | None = None,
+            retry: settings.RetrySettings | None = None,
+            hedging: settings.HedgingSettings | None = None,
+    ):
+        self.provider_name = provider_name
+        self.model = model
+        self.limiter = limiter
+        self.retry = retry or settings.RetrySettings()
+        self.hedging = hedging or settings.HedgingSettings()
+        self.latencies = LatencyTracker()
+
+    @classmethod
+    def from_settings(cls, provider_name: str, model: str) -> "CallPolicy":
+        limits = settings.rate_limit_settings(provider_name, model)
+        limiter = None
+        if limits.requests_per_minute or limits.tokens_per_minute:
+            limiter = RateLimiter(limits.requests_per_minute, limits.tokens_per_minute, limits.burst_seconds)
+        return cls(provider_name, model, limiter, settings.retry_settings(), settings.hedging_settings())
+
+    def call(self, attempt: Callable[[], T], tokens: int) -> T:
+        """Run a blocking call, ``attempt`` sends it once."""
+        for number in range(1, self.retry.max_attempts + 1):
+            wait = self._reserve(tokens)
+            if wait:
+                time.sleep(wait)
+            try:
+                start = time.perf_counter()
+                result = attempt()
+                self.latencies.observe(time.perf_counter() - start)
+                return result
+            except Exception as e:
+                delay = self._retry_delay(e, number)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    async def acall(self, attempt: Callable[[], Awaitable[T]], tokens: int) -> T:
+        """Run an async call, ``attempt`` sends it once."""
+        for number in range(1, self.retry.max_attempts + 1):
+            wait = self._reserve(tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                return await self._hedged(attempt, tokens)
+            except Exception as e:
+                delay = self._retry_delay(e, number)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _hedged(self, attempt: Callable[[], Awaitable[T]], tokens: int) -> T:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._timed(attempt)
+
+        first = asyncio.ensure_future(self._timed(attempt))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or (self.limiter is not None and not self.limiter.try_reserve(tokens)):
+            return await first
+
+        metrics.HEDGES.inc(provider=self.provider_name, model=self.model)
+        pending = {first, asyncio.ensure_future(self._timed(attempt))}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            raise first.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _timed(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        result = await attempt()
+        self.latencies.observe(time.perf_counter() - start)
+        return result
+
+    def _reserve(self, tokens: int) -> float:
+        if self.limiter is None:
+            return 0.0
+        wait = self.limiter.reserve(tokens)
+        if wait:
+            metrics.STAGE_DURATION.observe(
+                wait, stage="rate_limit_wait", provider=self.provider_name, model=self.model
+            )
+        return wait
+
+    def _hedge_delay(self) -> float | None:
+        if not self.hedging.enabled:
+            return None
+        delay = self.latencies.quantile(self.hedging.quantile, self.hedging.min_samples)
+        if delay is None:
+            return None
+        return max(delay, self.hedging.min_delay_ms / 1000)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float | None:
+        """Backoff before the next attempt, ``None`` when the error must be raised."""
+        kind = classify_error(error)
+        if kind == "permanent" or attempt >= self.retry.max_attempts:
+            return None
+        metrics.RETRIES.inc(provider=self.provider_name, model=self.model, reason=kind)
+        ceiling = min(self.retry.max_delay_ms, self.retry.base_delay_ms * 2 ** (attempt - 1)) / 1000
+        delay = random.uniform(0, ceiling)
+        retry_after = getattr(error, "retry_after", None)
+        return max(delay, retry_after) if retry_after else delay
@@ -0,0 +1,267 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List
+
+import utils
+
+from llm_portal import metrics, settings
+
+from .base import LLMProvider
+from .errors import OverloadedError, TenantLimitError, classify_error
+
+logger = utils.get_logger()
+
+
+@dataclass
+class BackendStats:
+    """Moving averages and ejection state of one backend for one model."""
+
+    latency: float | None = None
+    error_rate: float = 0.0
+    samples: int = 0
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+
+    def score(self) -> float:
+        """Expected cost of a call, lower is better, a backend without samples is tried first."""
+        return (self.latency or 0.0) / max(0.01, 1.0 - self.error_rate)
+
+
+class BackendSelector:
+    """
+    Orders the backends of one route and model for each call.
+
+    Latency and error rate are tracked as exponentially weighted moving averages. A backend is ejected
+    after ``failure_threshold`` consecutive failures, when its error rate passes ``error_rate_threshold``
+    or when it is ``latency_outlier_factor`` times slower than the fastest other backend. Ejections
+    last ``base_ejection_ms``, doubled on each consecutive ejection. When an ejection ends, the backend's
+    averages are reset so it gets probed again. A single failure while on probation ejects it again.
+
+    The first backend is the better of two random healthy ones (power of two choices), the others
+    follow by score so a failed call can fail over. Ejected backends come last, so a call is still
+    attempted when every backend is ejected.
+
+    Args:
+        route (str): Route name, used as metric label
+        model (str): Model name, used as metric label
+        names (Iterable[str]): Backend names
+        routing (settings.RoutingSettings): Routing settings
+        clock (Callable[[], float]): Monotonic clock in seconds
+    """
+
+    def __init__(
+            self,
+            route: str,
+            model: str,
+            names: Iterable[str],
+            routing: settings.RoutingSettings,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        self.route = route
+        self.model = model
+        self.routing = routing
+        self.stats = {name: BackendStats() for name in names}
+        self._clock = clock
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+
+    def order(self) -> list[str]:
+        with self._lock:
+            now = self._clock()
+            healthy, ejected = [], []
+            for name, stats in self.stats.items():
+                if stats.ejected_until > now:
+                    ejected.append(name)
+                    continue
+                if stats.ejected_until:
+                    # Ejection ended, probe the backend with fresh averages
+                    stats.ejected_until = 0.0
+                    stats.latency, stats.error_rate, stats.samples = None, 0.0, 0
+                healthy.append(name)
+
+            healthy.sort(key=lambda name: self.stats[name].score())
+            if len(healthy) > 1:
+                first, second = self._rng.sample(healthy, 2)
+                chosen = min(first, second, key=lambda name: self.stats[name].score())
+                healthy.remove(chosen)
+                healthy.insert(0, chosen)
+            ejected.sort(key=lambda name: self.stats[name].ejected_until)
+            return healthy + ejected
+
+    def record_success(self, name: str, latency: float):
+        with self._lock:
+            stats = self.stats[name]
+            alpha = self.routing.ewma_alpha
+            stats.latency = latency if stats.latency is None else alpha * latency + (1 - alpha) * stats.latency
+            stats.error_rate *= 1 - alpha
+            stats.samples += 1
+            stats.consecutive_failures = 0
+            metrics.BACKEND_LATENCY.set(stats.latency, route=self.route, backend=name, model=self.model)
+
+            fastest_other = min(
+                (
+                    other.latency
+                    for other_name, other in self.stats.items()
+                    if other_name != name and other.latency is not None and not other.ejected_until
+                ),
+                default=None,
+            )
+            if (
+                    fastest_other is not None
+                    and stats.samples >= self.routing.min_samples
+                    and stats.latency > self.routing.latency_outlier_factor * fastest_other
+            ):
+                self._eject(name, stats, "latency outlier")
+            else:
+                stats.ejections = 0
+
+    def record_failure(self, name: str):
+        with self._lock:
+            stats = self.stats[name]
+            alpha = self.routing.ewma_alpha
+            stats.error_rate = alpha + (1 - alpha) * stats.error_rate
+            stats.samples += 1
+            stats.consecutive_failures += 1
+            erroring = (
+                stats.samples >= self.routing.min_samples and stats.error_rate > self.routing.error_rate_threshold
+            )
+            if stats.ejections or stats.consecutive_failures >= self.routing.failure_threshold or erroring:
+                self._eject(name, stats, "failures")
+
+    def _eject(self, name: str, stats: BackendStats, reason: str):
+        duration = min(self.routing.max_ejection_ms, self.routing.base_ejection_ms * 2**stats.ejections) / 1000
+        stats.ejections += 1
+        stats.ejected_until = self._clock() + duration
+        stats.consecutive_failures = 0
+        metrics.BACKEND_EJECTIONS.inc(route=self.route, backend=name, model=self.model)
+        logger.warning(f"Ejected backend {name} of {self.route}/{self.model} for {duration:.0f}s: {reason}")
+
+
+def _fails_over(error: Exception) -> bool:
+    """Errors of the backend rather than of the request, worth trying another backend."""
+    return classify_error(error) != "permanent"
+
+
+def _rejected_locally(error: Exception) -> bool:
+    """Admission rejections of the backend's own scheduler, which say nothing about the backend's health."""
+    return isinstance(error, (OverloadedError, TenantLimitError))
+
+
+class RoutedProvider(LLMProvider, instrumented=False):
+    """
+    Logical provider spreading its models over several backends, such as Vertex AI regions.
+
+    Each call goes to the backend picked by the ``BackendSelector`` of its model and fails over to the
+    next one when the backend fails. Backends keep their own rate limits, retries and metrics, under
+    their own names. Batch limits are the strictest of the backends serving a model, reduced dimensions
+    are those every backend supports, and native only when every backend reduces them itself.
+
+    Args:
+        provider_name (str): Name of the logical provider, stored with the results
+        backends (list[LLMProvider]): Backends of the route, with distinct provider names
+        routing (settings.RoutingSettings, optional): Routing settings, read from the config by default
+    """
+
+    def __init__(
+            self,
+            provider_name: str,
+            backends: list[LLMProvider],
+            routing: settings.RoutingSettings | None = None,
+    ):
+        super().__init__(provider_name)
+        self.backends = {backend.provider_name: backend for backend in backends}
+        self.routing = routing or settings.routing_settings()
+        self._selectors: dict[str, BackendSelector] = {}
+
+        for backend in backends:
+            for model in backend.available_models:
+                limits = {
+                    "dimensions": backend.model_dimensions(model),
+                    "supported_dimensions": backend.supported_dimensions(model),
+                    "native_dimensions": backend.native_dimensions(model),
+                    "max_batch_size": backend.max_batch_size(model),
+                    "max_batch_tokens": backend.max_batch_tokens(model),
+                    "max_input_tokens": backend.max_input_tokens(model),
+                }
+                merged = self._embedding_models.setdefault(model, limits)
+                merged["supported_dimensions"] = [
+                    size for size in merged["supported_dimensions"] if size in limits["supported_dimensions"]
+                ]
+                merged["native_dimensions"] = merged["native_dimensions"] and limits["native_dimensions"]
+                merged["max_batch_size"] = min(merged["max_batch_size"], limits["max_batch_size"])
+                merged["max_batch_tokens"] = min(merged["max_batch_tokens"], limits["max_batch_tokens"])
+                merged["max_input_tokens"] = min(merged["max_input_tokens"], limits["max_input_tokens"])
+
+    def selector(self, model: str) -> BackendSelector:
+        selector = self._selectors.get(model)
+        if selector is None:
+            with self._model_handles_lock:
+                selector = self._selectors.get(model)
+                if selector is None:
+                    names = [name for name, backend in self.backends.items() if model in backend.available_models]
+                    selector = self._selectors[model] = BackendSelector(
+                        self.provider_name, model, names, self.routing
+                    )
+        return selector
+
+    def generate_embeddings(self, list_texts: list[str], model: str = None, **kwargs) -> List[List[float]]:
+        self._validate_embedding_model(model)
+        selector = self.selector(model)
+        error = None
+        for name in selector.order():
+            start = time.perf_counter()
+            try:
+                vectors = self.backends[name].generate_embeddings(list_texts, model, **kwargs)
+            except Exception as e:
+                error = self._failed(selector, name, e)
+                continue
+            selector.record_success(name, time.perf_counter() - start)
+            return vectors
+        raise error
+
+    async def agenerate_embeddings(self, list_texts: list[str], model: str = None, **kwargs) -> List[List[float]]:
+        self._validate_embedding_model(model)
+        selector = self.selector(model)
+        error = None
+        for name in selector.order():
+            start = time.perf_counter()
+            try:
+                vectors = await self.backends[name].agenerate_embeddings(list_texts, model, **kwargs)
+            except Exception as e:
+                error = self._failed(selector, name, e)
+                continue
+            selector.record_success(name, time.perf_counter() - start)
+            return vectors
+        raise error
+
+    def _failed(self, selector: BackendSelector, name: str, error: Exception) -> Exception:
+        """Record a backend failure, raise errors that another backend would not fix."""
+        if not _fails_over(error):
+            raise error
+        if not _rejected_locally(error):
+            selector.record_failure(name)
+        metrics.BACKEND_FAILOVERS.inc(route=self.provider_name, backend=name, model=selector.model)
+        logger.warning(f"Backend {name} of {self.provider_name} failed, failing over: {error}")
+        return error
+
+    def warm_up(self, models: Iterable[str]):
+        """Warm up every backend serving ``models``, fails only when no backend of a model could be warmed up."""
+        for model in models:
+            self._validate_embedding_model(model)
+            errors = []
+            names = self.selector(model).stats
+            for name in names:
+                try:
+                    self.backends[name].warm_up([model])
+                except Exception as e:
+                    logger.error(f"Failed to warm up backend {name} of {self.provider_name}/{model}: {e}")
+                    errors.append(e)
+            if len(errors) == len(names):
+                raise errors[-1]
+
+    @property
+    def available_models(self) -> List[str]:
+        return list(self._embedding_models.keys())
@@ -0,0 +1,265 @@
+import asyncio
+import contextlib
+import contextvars
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator, Iterator
+
+from llm_portal import metrics, settings
+
+from .errors import OverloadedError, TenantLimitError
+
+DEFAULT_TENANT = "anonymous"
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """
+    Lane, tenant and deadline of the request a provider call is made for.
+
+    Args:
+        lane (str): Priority lane of the calls
+        tenant (str): Tenant the concurrency caps apply to
+        started (float): ``time.monotonic()`` of the start of the request
+        timeout_ms (float, optional): Deadline of the calls after the start, the ``timeout_ms`` of the lane by default
+    """
+
+    lane: str
+    tenant: str = DEFAULT_TENANT
+    started: float = field(default_factory=time.monotonic)
+    timeout_ms: float | None = None
+
+    def deadline(self, scheduling: settings.SchedulingSettings) -> float | None:
+        """``time.monotonic()`` after which the calls are not worth sending, None without timeout."""
+        timeout_ms = self.timeout_ms or scheduling.lanes[self.lane].timeout_ms
+        return None if timeout_ms is None else self.started + timeout_ms / 1000
+
+
+_request_context: contextvars.ContextVar[RequestContext | None] = contextvars.ContextVar(
+    "llm_portal_request_context", default=None
+)
+
+
+def current_context() -> RequestContext:
+    """Context of the running request, the default lane outside of one."""
+    context = _request_context.get()
+    if context is None:
+        return RequestContext(settings.scheduling_settings().default_lane)
+    return context
+
+
+def check_lane(lane: str):
+    """
+    Raises:
+        ValueError: When the lane is not configured
+    """
+    lanes = settings.scheduling_settings().lanes
+    if lane not in lanes:
+        raise ValueError(f"Lane {lane} is not supported. Supported lanes are: {list(lanes)}")
+
+
+@contextlib.contextmanager
+def request_context(
+        lane: str | None = None,
+        tenant: str | None = None,
+        timeout_ms: float | None = None,
+) -> Iterator[RequestContext]:
+    """
+    Run the provider calls of a block in a lane, for a tenant and with a deadline.
+
+    Arguments left to None keep the value of the enclosing context, the start of the request is kept.
+
+    Raises:
+        ValueError: When the lane is not configured
+    """
+    if lane is not None:
+        check_lane(lane)
+    scheduling_settings = settings.scheduling_settings()
+
+    outer = _request_context.get()
+    if outer is None:
+        context = RequestContext(
+            lane or scheduling_settings.default_lane, tenant or DEFAULT_TENANT, timeout_ms=timeout_ms
+        )
+    else:
+        context = RequestContext(
+            lane or outer.lane, tenant or outer.tenant, outer.started, timeout_ms or outer.timeout_ms
+        )
+
+    token = _request_context.set(context)
+    try:
+        yield context
+    finally:
+        _request_context.reset(token)
+
+
+@dataclass(eq=False)
+class _Waiter:
+    finish: float
+    tenant: str
+    future: asyncio.Future = field(repr=False)
+
+
+class Scheduler:
+    """
+    Admission and weighted fair queuing of the async calls to one (provider, model).
+
+    At most ``max_concurrency`` calls are in flight. Calls beyond it wait in the lane of their request
+    and are sent in the order of their virtual finish time, the cost of a call divided by the weight of
+    its lane, so every waiting lane gets its share of the calls and a bulk backlog only delays
+    interactive calls by its share. A tenant has at most ``tenant_max_concurrency`` calls in flight,
+    its other calls wait while other tenants are served.
+
+    Calls are rejected before waiting when they would miss their deadline, estimated from the recent
+    call durations and the calls ahead of them, or when their lane or tenant has too many calls waiting,
+    and when their deadline passes while they wait. Calls are not thread-safe, they run on the event loop.
+
+    Args:
+        provider_name (str): Provider name, used as metric label
+        model (str): Model name, used as metric label
+        scheduling (settings.SchedulingSettings): Lanes, concurrency and caps
+    """
+
+    def __init__(self, provider_name: str, model: str, scheduling: settings.SchedulingSettings | None = None):
+        self.provider_name = provider_name
+        self.model = model
+        self.scheduling = scheduling or settings.scheduling_settings()
+        self._waiting: dict[str, deque[_Waiter]] = {lane: deque() for lane in self.scheduling.lanes}
+        self._lane_finish: dict[str, float] = dict.fromkeys(self.scheduling.lanes, 0.0)
+        self._virtual_time = 0.0
+        self._running = 0
+        self._tenant_running: Counter[str] = Counter()
+        self._tenant_waiting: Counter[str] = Counter()
+        self._call_seconds: float | None = None
+
+    @classmethod
+    def from_settings(cls, provider_name: str, model: str) -> "Scheduler | None":
+        scheduling_settings = settings.scheduling_settings()
+        return cls(provider_name, model, scheduling_settings) if scheduling_settings.enabled else None
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def waiting(self, lane: str | None = None) -> int:
+        """Calls waiting in ``lane``, or in every lane."""
+        return len(self._waiting[lane]) if lane else sum(len(waiters) for waiters in self._waiting.values())
+
+    @contextlib.asynccontextmanager
+    async def slot(self, cost: float = 1.0) -> AsyncIterator[None]:
+        """Hold one of the ``max_concurrency`` call slots, in the lane of the current request."""
+        context = current_context()
+        await self._acquire(context, cost)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._observe(time.monotonic() - start)
+            self._release(context.tenant)
+
+    def estimated_wait(self, finish: float) -> float:
+        """Seconds before a call of virtual finish time ``finish`` is sent, 0 while there is no duration yet."""
+        if self._call_seconds is None or self._running < self.scheduling.max_concurrency:
+            return 0.0
+        ahead = sum(1 for waiters in self._waiting.values() for waiter in waiters if waiter.finish <= finish)
+        return (ahead + 1) * self._call_seconds / self.scheduling.max_concurrency
+
+    async def _acquire(self, context: RequestContext, cost: float):
+        if context.lane not in self.scheduling.lanes:
+            context = replace(context, lane=self.scheduling.default_lane)
+        lane, tenant = context.lane, context.tenant
+        finish = max(self._virtual_time, self._lane_finish[lane]) + cost / self.scheduling.lanes[lane].weight
+        if not self.waiting() and self._has_room(tenant):
+            self._lane_finish[lane] = finish
+            self._start(finish, tenant)
+            return
+
+        wait = self.estimated_wait(finish)
+        tenant_max_queue = self.scheduling.tenant_max_queue
+        if tenant_max_queue is not None and self._tenant_waiting[tenant] >= tenant_max_queue:
+            self._reject(lane, "tenant_queue")
+            raise TenantLimitError(f"Tenant {tenant} has too many calls waiting", retry_after=wait or None)
+        if len(self._waiting[lane]) >= self.scheduling.lanes[lane].max_queue:
+            self._reject(lane, "queue_full")
+            raise OverloadedError(f"The {lane} lane of {self.model} is full", retry_after=wait or None)
+        now = time.monotonic()
+        deadline = context.deadline(self.scheduling)
+        if deadline is not None and now + wait + (self._call_seconds or 0.0) > deadline:
+            self._reject(lane, "deadline")
+            raise OverloadedError(
+                f"The {lane} lane of {self.model} cannot serve the call before its deadline", retry_after=wait
+            )
+
+        waiter = _Waiter(finish, tenant, asyncio.get_running_loop().create_future())
+        self._waiting[lane].append(waiter)
+        self._lane_finish[lane] = finish
+        self._tenant_waiting[tenant] += 1
+        metrics.SCHEDULER_QUEUED.inc(provider=self.provider_name, model=self.model, lane=lane)
+        # The calls ahead may all be of tenants at their cap
+        self._dispatch()
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - now)
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted while being cancelled, the slot goes to the next call
+                self._release(tenant)
+            else:
+                waiter.future.cancel()
+                self._dequeue(lane, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(lane, "deadline")
+                raise OverloadedError(f"The {lane} lane of {self.model} did not serve the call in time") from e
+            raise
+        metrics.SCHEDULER_WAIT.observe(
+            time.monotonic() - now, provider=self.provider_name, model=self.model, lane=lane
+        )
+
+    def _has_room(self, tenant: str) -> bool:
+        tenant_max_concurrency = self.scheduling.tenant_max_concurrency
+        return self._running < self.scheduling.max_concurrency and (
+            tenant_max_concurrency is None or self._tenant_running[tenant] < tenant_max_concurrency
+        )
+
+    def _start(self, finish: float, tenant: str):
+        self._running += 1
+        self._tenant_running[tenant] += 1
+        self._virtual_time = max(self._virtual_time, finish)
+
+    def _release(self, tenant: str):
+        self._running -= 1
+        self._tenant_running[tenant] -= 1
+        if not self._tenant_running[tenant]:
+            del self._tenant_running[tenant]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant the free slots to the waiting calls with the smallest virtual finish time."""
+        while self._running < self.scheduling.max_concurrency:
+            best = None
+            for lane, waiters in self._waiting.items():
+                # Calls of a lane are in finish order, the first one whose tenant has room is the lane's next call
+                waiter = next((waiter for waiter in waiters if self._has_room(waiter.tenant)), None)
+                if waiter is not None and (best is None or waiter.finish < best[1].finish):
+                    best = (lane, waiter)
+            if best is None:
+                return
+            lane, waiter = best
+            self._dequeue(lane, waiter)
+            self._start(waiter.finish, waiter.tenant)
+            waiter.future.set_result(None)
+
+    def _dequeue(self, lane: str, waiter: _Waiter):
+        with contextlib.suppress(ValueError):
+            self._waiting[lane].remove(waiter)
+            self._tenant_waiting[waiter.tenant] -= 1
+            if not self._tenant_waiting[waiter.tenant]:
+                del self._tenant_waiting[waiter.tenant]
+            metrics.SCHEDULER_QUEUED.dec(provider=self.provider_name, model=self.model, lane=lane)
+
+    def _observe(self, seconds: float):
+        self._call_seconds = seconds if self._call_seconds is None else 0.8 * self._call_seconds + 0.2 * seconds
+
+    def _reject(self, lane: str, reason: str):
+        metrics.SCHEDULER_REJECTIONS.inc(provider=self.provider_name, model=self.model, lane=lane, reason=reason)
@@ -1,39 +1,76 @@
+import threading
 from typing import List
 
 import utils
+import vertexai
 from vertexai.language_models import TextEmbeddingModel
 
+from llm_portal import metrics
+
 from .base import LLMProvider
+from .errors import ProviderError, to_provider_error
 
 config = utils.get_config()
 
+# ``vertexai.init`` sets process-wide defaults, held while a model handle is bound to them
+_init_lock = threading.Lock()
+
+REDUCED_DIMENSIONS = (128, 256, 512)
+
 class VertexAIProvider(LLMProvider):
-    """Vertex AI embedding provider."""
+    """
+    Vertex AI embedding provider.
+
+    Args:
+        provider_name (str): Name the provider reports, set per backend when several regions are routed
+        project_id (str, optional): Project of the calls, defaults to ``vertexai.project_id``
+        location (str, optional): Region of the calls, defaults to ``vertexai.project_location``
+    """
 
-    def __init__(self):
-        super().__init__("vertexai")
+    def __init__(self, provider_name: str = "vertexai", project_id: str | None = None, location: str | None = None):
+        super().__init__(provider_name)
         assert config.get("vertexai") is not None, "Vertex AI config is missing"
         assert config["vertexai"].get("project_id") is not None, "Project ID is missing"
         assert config["vertexai"].get("project_location") is not None, "Project location is missing"
         assert config["vertexai"].get("credentials_path") is not None, "Credentials path is missing"
 
 
-        self.project_id = config["vertexai"]["project_id"]
-        self.location = config["vertexai"]["project_location"]
+        self.project_id = project_id or config["vertexai"]["project_id"]
+        self.location = location or config["vertexai"]["project_location"]
         self.credentials_path = config["vertexai"]["credentials_path"]
         # I think this model is configurable
+        # Per-call limits follow the Vertex AI quotas: at most 250 texts and 20k tokens per request,
+        # the experimental large model only accepts a single text per request. Texts are limited to 2048 tokens.
+        # The models return fewer dimensions themselves through ``output_dimensionality``.
         self._embedding_models = {
             "text-embedding-005": {
-                "dimensions": 768
+                "dimensions": 768,
+                "supported_dimensions": REDUCED_DIMENSIONS,
+                "native_dimensions": True,
+                "max_batch_size": 250,
+                "max_batch_tokens": 20000,
+                "max_input_tokens": 2048,
             },
             "text-multilingual-embedding-002": {
-                "dimensions": 768
+                "dimensions": 768,
+                "supported_dimensions": REDUCED_DIMENSIONS,
+                "native_dimensions": True,
+                "max_batch_size": 250,
+                "max_batch_tokens": 20000,
+                "max_input_tokens": 2048,
             },
             "text-embedding-large-exp-03-07": {
-                "dimensions": 768
+                "dimensions": 768,
+                "supported_dimensions": REDUCED_DIMENSIONS,
+                "native_dimensions": True,
+                "max_batch_size": 1,
+                "max_batch_tokens": 20000,
+                "max_input_tokens": 2048,
             }}
 
-    def generate_embeddings(self, list_texts: list[str], model: str = None) -> List[float]:
+    def generate_embeddings(
+            self, list_texts: list[str], model: str = None, dimensions: int | None = None
+    ) -> List[List[float]]:
         """
         Generates text embeddings using a specified pre-trained text embedding model.
 
@@ -41,30 +78,60 @@ class VertexAIProvider(LLMProvider):
             list_texts (list[str]): The list of input texts for which embeddings are to be generated.
             model (str, optional): The name or identifier of the pre-trained model to use.
                 If not provided, a default embedding model will be used.
+            dimensions (int, optional): Reduced dimensions, sent as ``output_dimensionality``.
 
         Returns:
-            List[float]: A list of floats representing the embedding vector for the given
-            input text.
+            List[List[float]]: One embedding vector per input text, in input order.
 
         Raises:
-            Exception: If the embedding process fails or no embeddings are returned by the
-            model, an exception is raised with details about the failure.
+            RateLimitError: If the call was rejected by a Vertex AI quota.
+            TransientProviderError: If the call failed in a way that a retry may fix.
+            ProviderError: If the embedding process fails or no embeddings are returned by the model.
+        """
+
+        self._validate_embedding_model(model)
+
+        try:
+            embedding_model = self.model_handle(model)
+
+            embeddings = embedding_model.get_embeddings(list_texts, output_dimensionality=dimensions)
+
+            return self._to_vectors(embeddings, list_texts)
+        except Exception as e:
+            raise to_provider_error(e, "Vertex AI embedding failed") from e
+
+    async def agenerate_embeddings(
+            self, list_texts: list[str], model: str = None, dimensions: int | None = None
+    ) -> List[List[float]]:
+        """
+        Generates text embeddings with the SDK's async embedding call.
+
+        Same contract as ``generate_embeddings``, a model that is not loaded yet is loaded in the provider thread pool.
         """
 
         self._validate_embedding_model(model)
 
         try:
-            embedding_model = TextEmbeddingModel.from_pretrained(model)
+            embedding_model = await self.amodel_handle(model)
 
-            embeddings = embedding_model.get_embeddings(list_texts)
+            embeddings = await embedding_model.get_embeddings_async(list_texts, output_dimensionality=dimensions)
 
-            if embeddings and len(embeddings) > 0:
-                return embeddings[0].values
-            else:
-                raise Exception("No embedding returned from Vertex AI")
+            return self._to_vectors(embeddings, list_texts)
         except Exception as e:
-            # logging.error(f"Vertex AI embedding error: {str(e)}")
-            raise Exception(f"Vertex AI embedding failed: {str(e)}")
+            raise to_provider_error(e, "Vertex AI embedding failed") from e
+
+    def _load_model(self, model: str) -> TextEmbeddingModel:
+        # A handle keeps the project and location it was loaded with, so each instance can target its own region
+        with metrics.track("model_load", self.provider_name, model), _init_lock:
+            vertexai.init(project=self.project_id, location=self.location)
+            return TextEmbeddingModel.from_pretrained(model)
+
+    @staticmethod
+    def _to_vectors(embeddings, list_texts: list[str]) -> List[List[float]]:
+        if embeddings and len(embeddings) == len(list_texts):
+            return [embedding.values for embedding in embeddings]
+        else:
+            raise ProviderError("No embedding returned from Vertex AI")
 
 
     @property
@@ -0,0 +1,85 @@
+import argparse
+
+import sqlalchemy
+import utils
+
+from llm_portal.adapters import orm
+from llm_portal.domains import vectors
+
+logger = utils.get_logger()
+
+_BINARY_COLUMN_DDL = {
+    "postgresql": "ALTER TABLE {table} ALTER COLUMN vector TYPE BYTEA USING convert_to(vector::text, 'UTF8')",
+    "mysql": "ALTER TABLE {table} MODIFY vector LONGBLOB NOT NULL",
+}
+
+
+def migrate_embedded_results(engine: sqlalchemy.Engine):
+    """Bring an existing ``embedded_results`` table to the current schema, safe to run on every start."""
+    table = orm.embedded_results
+    inspector = sqlalchemy.inspect(engine)
+    columns = {column["name"]: column for column in inspector.get_columns(table.name)}
+    with engine.begin() as connection:
+        if "text_hash" not in columns:
+            connection.execute(sqlalchemy.text(f"ALTER TABLE {table.name} ADD COLUMN text_hash VARCHAR(64)"))
+        if "parent_id" not in columns:
+            connection.execute(sqlalchemy.text(f"ALTER TABLE {table.name} ADD COLUMN parent_id VARCHAR(64)"))
+        # SQLite stores blobs in the old JSON column as is, other backends need a binary column first.
+        # Existing JSON text is kept byte for byte and still decodes until it is rewritten.
+        if isinstance(columns["vector"]["type"], sqlalchemy.JSON) and engine.dialect.name in _BINARY_COLUMN_DDL:
+            connection.execute(sqlalchemy.text(_BINARY_COLUMN_DDL[engine.dialect.name].format(table=table.name)))
+    for index in table.indexes:
+        index.create(engine, checkfirst=True)
+
+
+def rewrite_json_vectors(engine: sqlalchemy.Engine, codec: str | None = None, batch_size: int = 1000) -> int:
+    """
+    Re-encode legacy JSON vectors with a binary codec.
+
+    Rows are walked in primary key order one batch at a time, each batch is updated in its own
+    transaction so the table is never locked for long.
+
+    Returns:
+        int: The number of rewritten rows.
+    """
+    table = orm.embedded_results
+    rewritten, last_id = 0, ""
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                sqlalchemy.select(table.c.id, table.c.vector)
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return rewritten
+            last_id = rows[-1].id
+
+            updates = [
+                {"row_id": row.id, "data": vectors.encode(vectors.decode(row.vector), codec)}
+                for row in rows
+                if vectors.is_legacy(row.vector)
+            ]
+            if updates:
+                connection.execute(
+                    table.update().where(table.c.id == sqlalchemy.bindparam("row_id")),
+                    [{"row_id": update["row_id"], "vector": update["data"]} for update in updates],
+                )
+                rewritten += len(updates)
+                logger.info(f"Rewrote {rewritten} legacy JSON vectors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite legacy JSON vectors in embedded_results with a binary codec")
+    parser.add_argument("--codec", choices=list(vectors.CODECS), default=None, help="defaults to the configured codec")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    orm.start_mapper()
+    count = rewrite_json_vectors(orm.get_engine(), codec=args.codec, batch_size=args.batch_size)
+    logger.info(f"Migration finished, {count} rows rewritten")
+
+
+if __name__ == "__main__":
+    main()
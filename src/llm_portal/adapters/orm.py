@@ -2,7 +2,6 @@ import core
 import sqlalchemy
 import utils
 from core import orm
-from core.adapters import sqlalchemy_adapter
 
 from sqlalchemy import (
     JSON,
@@ -10,6 +9,7 @@ from sqlalchemy import (
     Column,
     Enum,
     Float,
+    Index,
     Integer,
     String,
     Table,
@@ -18,7 +18,8 @@ from sqlalchemy import (
     types,
 )
 
-from llm_portal.domains import models
+from llm_portal import settings
+from llm_portal.domains import models, vectors
 
 
 def setup_model_on_callbacks():
@@ -28,34 +29,222 @@ def setup_model_on_callbacks():
 
     for model in [
         models.EmbeddedResult,
+        models.OutboxMessage,
     ]:
         event.listen(model, "load", set_in_memory_attributes)
 
+class VectorType(types.TypeDecorator):
+    """
+    Binary vector column.
+
+    Arrays and lists are encoded with the default vector codec on write. Reads return the raw bytes,
+    decoding is left to ``EmbeddedResult.vector`` so rows that are never inspected are never decoded.
+    """
+
+    impl = types.LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        if isinstance(value, (bytearray, memoryview)):
+            return bytes(value)
+        return vectors.encode(value)
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, str):
+            # Legacy JSON rows on backends that keep the original text
+            return value.encode("utf-8")
+        if isinstance(value, (bytearray, memoryview)):
+            return bytes(value)
+        return value
+
+
+metadata = sqlalchemy.MetaData()
+
+embedded_results = Table(
+    "embedded_results",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("text", Text, nullable=False),
+    Column("text_hash", String(64), nullable=True, index=True),
+    Column("parent_id", String(64), nullable=True, index=True),
+    Column("provider", String(32), nullable=False),
+    Column("model", String(64), nullable=False),
+    Column("dimensions", Integer, nullable=False),
+    Column("vector", VectorType, nullable=False),
+
+    Column("created_time", sqlalchemy.DateTime),
+    Column("updated_time", sqlalchemy.DateTime),
+    # Search, export and analysis read one (provider, model), expiry reads it by age
+    Index("ix_embedded_results_provider_model_created", "provider", "model", "created_time"),
+)
+
+embedding_jobs = Table(
+    "embedding_jobs",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("provider", String(32), nullable=False),
+    Column("model", String(64), nullable=False),
+    Column("status", String(16), nullable=False),
+    Column("total", Integer, nullable=False),
+    Column("completed", Integer, nullable=False, default=0),
+    Column("failed", Integer, nullable=False, default=0),
+    Column("error", Text, nullable=True),
+
+    Column("created_time", sqlalchemy.DateTime),
+    Column("updated_time", sqlalchemy.DateTime),
+)
+
+analysis_jobs = Table(
+    "analysis_jobs",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("kind", String(16), nullable=False),
+    Column("provider", String(32), nullable=False),
+    Column("model", String(64), nullable=False),
+    Column("dimensions", Integer, nullable=False),
+    Column("parameters", JSON, nullable=False),
+    Column("status", String(16), nullable=False),
+    Column("total", sqlalchemy.BigInteger, nullable=False, default=0),
+    Column("processed", sqlalchemy.BigInteger, nullable=False, default=0),
+    Column("result", JSON, nullable=True),
+    Column("error", Text, nullable=True),
+
+    Column("created_time", sqlalchemy.DateTime),
+    Column("updated_time", sqlalchemy.DateTime),
+)
+
+event_outbox = Table(
+    "event_outbox",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("name", String(64), nullable=False),
+    Column("body", JSON, nullable=False),
+    # Relay publishing the event, and until when, so concurrent relays publish different events
+    Column("claimed_by", String(64), nullable=True),
+    Column("claimed_until", sqlalchemy.DateTime, nullable=True),
+
+    Column("created_time", sqlalchemy.DateTime, index=True),
+    Column("updated_time", sqlalchemy.DateTime),
+)
+
+# Bumped whenever results of a (provider, model, dimensions) are deleted, search indexes of every process reload
+index_versions = Table(
+    "index_versions",
+    metadata,
+    Column("provider", String(32), primary_key=True),
+    Column("model", String(64), primary_key=True),
+    Column("dimensions", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+
+    Column("created_time", sqlalchemy.DateTime),
+    Column("updated_time", sqlalchemy.DateTime),
+)
+
+_engine: sqlalchemy.Engine | None = None
+_async_engine = None
+
+
+def _is_memory_sqlite(url: sqlalchemy.URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def database_threads() -> int:
+    """
+    Threads that use the database at once, one per connection of the pool. A memory SQLite database lives
+    in a single connection, it gets one thread.
+    """
+    url = _engine.url if _engine is not None else utils.get_config()["database"]["connection"]["url"]
+    if _is_memory_sqlite(sqlalchemy.make_url(url)):
+        return 1
+    return settings.database_settings().pool_size
+
+
+def _pool_options(database_settings: settings.DatabaseSettings) -> dict:
+    return {
+        "pool_size": database_settings.pool_size,
+        "max_overflow": database_settings.max_overflow,
+        "pool_timeout": database_settings.pool_timeout_s,
+        "pool_recycle": database_settings.pool_recycle_s,
+        "pool_pre_ping": database_settings.pool_pre_ping,
+    }
+
+
+def create_engine(database_config: dict) -> sqlalchemy.Engine:
+    """
+    Create the engine of the ``database`` config, pooled and tuned by ``embedding.database``.
+
+    SQLite connections get the configured journal mode, ``synchronous`` and busy timeout, so concurrent
+    writers from several threads or processes wait for each other instead of failing.
+    """
+    database_settings = settings.database_settings()
+    url = sqlalchemy.make_url(database_config["connection"]["url"])
+    if _is_memory_sqlite(url):
+        # A memory database lives in its connection, the default pool keeps one per thread
+        return sqlalchemy.create_engine(url)
+
+    options = _pool_options(database_settings)
+    if url.get_backend_name() != "sqlite":
+        return sqlalchemy.create_engine(url, **options)
+
+    busy_timeout_ms = database_settings.sqlite_busy_timeout_ms
+    engine = sqlalchemy.create_engine(url, connect_args={"check_same_thread": False}, **options)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        # Lets compaction return freed pages to the file, only takes effect on a new database
+        cursor.execute("PRAGMA auto_vacuum=incremental")
+        cursor.execute(f"PRAGMA journal_mode={database_settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={database_settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        cursor.close()
+
+    return engine
+
+
+def get_engine() -> sqlalchemy.Engine:
+    """Return the engine the mapper was started with."""
+    if _engine is None:
+        raise RuntimeError("ORM mapper is not started")
+    return _engine
+
+
+def get_async_engine():
+    """
+    Return the asyncpg engine of a PostgreSQL database when ``embedding.database.async_engine`` is set,
+    created on first use, otherwise None.
+    """
+    global _async_engine
+    if _async_engine is None and settings.database_settings().async_engine:
+        url = get_engine().url
+        if url.get_backend_name() != "postgresql":
+            raise RuntimeError(f"The async engine needs PostgreSQL, the database is {url.get_backend_name()}")
+        from sqlalchemy.ext import asyncio as sqlalchemy_asyncio
+
+        _async_engine = sqlalchemy_asyncio.create_async_engine(
+            url.set(drivername="postgresql+asyncpg"), **_pool_options(settings.database_settings())
+        )
+    return _async_engine
+
+
 @orm.map_once
 def start_mapper():
-    config_path = utils.get_config_path()
-    config = utils.load_config(config_path=config_path)
-    factory = sqlalchemy_adapter.ComponentFactory(config["database"])
-    metadata = sqlalchemy.MetaData()
+    global _engine
+    from llm_portal.adapters import migrations
+
     orm_registry = sqlalchemy.orm.registry(metadata=metadata)
 
-    product_table = Table(
-        "embedded_results",
-        metadata,
-        Column("id", String(64), primary_key=True),
-        Column("text", Text, nullable=False),
-        Column("provider", String(32), nullable=False),
-        Column("model", String(64), nullable=False),
-        Column("dimensions", Integer, nullable=False),
-        Column("vector", JSON, nullable=False),
-
-        Column("created_time", sqlalchemy.DateTime),
-        Column("updated_time", sqlalchemy.DateTime),
-    )
     embedded_mapper = orm_registry.map_imperatively(
         class_=models.EmbeddedResult,
-        local_table=product_table,
+        local_table=embedded_results,
+        properties={"vector_data": embedded_results.c.vector},
     )
-    engine = factory.engine
+    orm_registry.map_imperatively(class_=models.OutboxMessage, local_table=event_outbox)
+    engine = create_engine(utils.get_config()["database"])
     setup_model_on_callbacks()
-    metadata.create_all(engine)
\ No newline at end of file
+    vectors.set_default_codec(settings.storage_settings().vector_codec)
+    metadata.create_all(engine)
+    migrations.migrate_embedded_results(engine)
+    _engine = engine
@@ -1,12 +1,70 @@
-from llm_portal.adapters.llm_providers import VertexAIProvider, LLMProvider
+import threading
+from importlib import metadata
+from typing import Callable, Iterable
 
+import utils
 
-def llm_provider_factory(
+from llm_portal import settings
+from llm_portal.adapters.llm_providers import LLMProvider, RoutedProvider
+
+logger = utils.get_logger()
+
+ENTRY_POINT_GROUP = "llm_portal.providers"
+
+# Provider classes by name, as ``module:Class`` until first used so their SDKs are imported lazily.
+# Other packages add providers through ``llm_portal.providers`` entry points.
+PROVIDERS: dict[str, str | type[LLMProvider]] = {
+    "vertexai": "llm_portal.adapters.llm_providers.vertexai:VertexAIProvider",
+    "local": "llm_portal.adapters.llm_providers.local:LocalProvider",
+}
+_providers_lock = threading.Lock()
+_entry_points_loaded = False
+
+
+def register_provider(provider_name: str, provider: str | type[LLMProvider]):
+    """Register a provider class, or the ``module:Class`` path it is imported from on first use."""
+    with _providers_lock:
+        PROVIDERS[provider_name] = provider
+
+
+def _load_entry_points():
+    """Add the providers of the installed plugins, without importing them. Entry points are read once."""
+    global _entry_points_loaded
+    for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+        PROVIDERS.setdefault(entry_point.name, entry_point.value)
+    _entry_points_loaded = True
+
+
+def provider_class(provider_name: str) -> type[LLMProvider]:
+    """
+    Return the class of a provider name, importing its module on first use. Thread-safe.
+
+    Raises:
+        ValueError: If no built-in provider or plugin has this name.
+    """
+    provider = PROVIDERS.get(provider_name)
+    if isinstance(provider, type):
+        return provider
+    with _providers_lock:
+        if provider_name not in PROVIDERS and not _entry_points_loaded:
+            _load_entry_points()
+        provider = PROVIDERS.get(provider_name)
+        if provider is None:
+            raise ValueError(f"Unsupported provider: {provider_name}")
+        if isinstance(provider, str):
+            entry_point = metadata.EntryPoint(provider_name, provider, ENTRY_POINT_GROUP)
+            provider = PROVIDERS[provider_name] = entry_point.load()
+    return provider
+
+
+def create_llm_provider(
     provider_name: str,
     **kwargs
 ) -> "LLMProvider":
     """
-    Factory function to create an instance of a specific LLM provider.
+    Create a new instance of a specific LLM provider.
+
+    A name listed in ``embedding.routing.routes`` creates a ``RoutedProvider`` over the backends of the route.
 
     Args:
         provider_name (str): The name of the LLM provider.
@@ -15,13 +73,114 @@ def llm_provider_factory(
     Returns:
         LLMProvider: An instance of the specified LLM provider.
     """
+    routing_settings = settings.routing_settings()
+    route = routing_settings.routes.get(provider_name)
+    if route is not None and not kwargs:
+        backends = [
+            _create_backend(backend.provider, provider_name=backend.name or backend.provider, **backend.options)
+            for backend in route.backends
+        ]
+        return RoutedProvider(provider_name, backends, routing_settings)
+
+    return _create_backend(provider_name, **kwargs)
+
+
+def _create_backend(provider_name: str, **kwargs) -> LLMProvider:
+    return provider_class(provider_name)(**kwargs)
+
+
+class ProviderRegistry:
+    """
+    Long-lived provider instances, created once per name and shared by every request.
+
+    The registry also records the warm-up of the configured models, which is what the readiness
+    endpoint reports.
+
+    Args:
+        factory (Callable[[str], LLMProvider]): Creates the instance of a provider name
+    """
+
+    def __init__(self, factory: Callable[[str], LLMProvider] = create_llm_provider):
+        self._factory = factory
+        self._providers: dict[str, LLMProvider] = {}
+        self._lock = threading.Lock()
+        self._models: dict[str, dict[str, str]] = {}
+        self.warmed_up = False
+
+    def get(self, provider_name: str) -> LLMProvider:
+        """Return the shared instance of a provider, creating it on first use. Thread-safe."""
+        provider = self._providers.get(provider_name)
+        if provider is None:
+            with self._lock:
+                provider = self._providers.get(provider_name)
+                if provider is None:
+                    provider = self._providers[provider_name] = self._factory(provider_name)
+        return provider
+
+    def warm_up(self, models: dict[str, Iterable[str]]) -> bool:
+        """
+        Create the providers and load the handles of ``models``, a list of model names per provider. Blocking.
+
+        Failures are logged and recorded rather than raised.
+
+        Returns:
+            bool: Whether every model is ready.
+        """
+        for provider_name, model_names in models.items():
+            statuses = self._models.setdefault(provider_name, {})
+            for model in model_names:
+                try:
+                    self.get(provider_name).warm_up([model])
+                    statuses[model] = "ready"
+                except Exception as e:
+                    logger.error(f"Failed to warm up {provider_name}/{model}: {e}")
+                    statuses[model] = f"error: {e}"
+        self.warmed_up = True
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed_up and all(
+            status == "ready" for statuses in self._models.values() for status in statuses.values()
+        )
+
+    def failed_models(self) -> dict[str, list[str]]:
+        failed = {}
+        for provider_name, statuses in self._models.items():
+            models = [model for model, status in statuses.items() if status != "ready"]
+            if models:
+                failed[provider_name] = models
+        return failed
+
+    def status(self) -> dict:
+        return {"ready": self.ready, "providers": {name: dict(statuses) for name, statuses in self._models.items()}}
+
+
+_registry: ProviderRegistry | None = None
 
 
-    providers = {
-        "vertexai": VertexAIProvider,
-    }
+def get_provider_registry() -> ProviderRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ProviderRegistry()
+    return _registry
 
-    if provider_name not in providers:
-        raise ValueError(f"Unsupported provider: {provider_name}")
 
-    return providers[provider_name](**kwargs)
\ No newline at end of file
+def llm_provider_factory(
+    provider_name: str,
+    **kwargs
+) -> "LLMProvider":
+    """
+    Return the shared instance of a specific LLM provider.
+
+    Args:
+        provider_name (str): The name of the LLM provider.
+        **kwargs: Additional keyword arguments for provider initialization, a new unshared instance
+            is created when any are given.
+
+    Returns:
+        LLMProvider: An instance of the specified LLM provider.
+    """
+    if kwargs:
+        return create_llm_provider(provider_name, **kwargs)
+    return get_provider_registry().get(provider_name)
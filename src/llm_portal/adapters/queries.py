@@ -0,0 +1,661 @@
+import contextlib
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, NamedTuple, Sequence
+
+import numpy as np
+import sqlalchemy
+
+from llm_portal import executors
+from llm_portal.adapters import orm
+from llm_portal.domains import models, vectors
+
+
+def find_vector_by_text_hash(text_hash: str) -> np.ndarray | None:
+    """Return the vector of any stored result with the given text hash, or None."""
+    table = orm.embedded_results
+    statement = sqlalchemy.select(table.c.vector).where(table.c.text_hash == text_hash).limit(1)
+    with orm.get_engine().connect() as connection:
+        data = connection.execute(statement).scalar_one_or_none()
+    return None if data is None else vectors.decode(data)
+
+
+def _vector_conditions(provider: str, model: str, dimensions: int | None) -> list:
+    # Whole texts only, the chunk results of a text are not documents of their own
+    table = orm.embedded_results
+    conditions = [table.c.provider == provider, table.c.model == model, table.c.parent_id.is_(None)]
+    if dimensions is not None:
+        conditions.append(table.c.dimensions == dimensions)
+    return conditions
+
+
+def _stored_dimensions(connection: sqlalchemy.Connection, provider: str, model: str, conditions: list) -> int | None:
+    # Vectors of different sizes do not fit one matrix, a model stored at several sizes is read one at a time
+    table = orm.embedded_results
+    statement = sqlalchemy.select(table.c.dimensions).where(*conditions).distinct().order_by(table.c.dimensions)
+    sizes = list(connection.execute(statement).scalars())
+    if len(sizes) > 1:
+        raise ValueError(f"Results of {provider}/{model} are stored at dimensions {sizes}, choose one of them")
+    return sizes[0] if sizes else None
+
+
+def iter_vectors(
+        provider: str,
+        model: str,
+        batch_size: int = 10000,
+        dimensions: int | None = None,
+        after: str | None = None,
+        since: datetime | None = None,
+) -> Iterator[tuple[list[str], list[str], np.ndarray]]:
+    """
+    Stream the stored whole-text results of one (provider, model), of the given dimensions or of the only
+    size they are stored at, in id order and with a server-side cursor.
+
+    Args:
+        after (str, optional): Only results with a greater id, to resume a stream or read the rest of it
+        since (datetime, optional): Only results created at or after this time
+
+    Yields:
+        tuple[list[str], list[str], np.ndarray]: Ids, texts and the float32 vector matrix of each batch.
+    """
+    table = orm.embedded_results
+    conditions = _vector_conditions(provider, model, dimensions)
+    with orm.get_engine().connect() as connection:
+        if dimensions is None:
+            conditions.append(table.c.dimensions == _stored_dimensions(connection, provider, model, conditions))
+        if after is not None:
+            conditions.append(table.c.id > after)
+        if since is not None:
+            conditions.append(table.c.created_time >= since)
+        statement = (
+            sqlalchemy.select(table.c.id, table.c.text, table.c.vector)
+            .where(*conditions)
+            .order_by(table.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for partition in connection.execute(statement).partitions():
+            ids = [row.id for row in partition]
+            texts = [row.text for row in partition]
+            yield ids, texts, np.stack([vectors.decode(row.vector) for row in partition])
+
+
+def count_vectors(provider: str, model: str, dimensions: int | None = None) -> int:
+    """Number of stored whole-text results of one (provider, model), of any or of the given dimensions."""
+    statement = sqlalchemy.select(sqlalchemy.func.count()).where(*_vector_conditions(provider, model, dimensions))
+    with orm.get_engine().connect() as connection:
+        return connection.execute(statement).scalar_one()
+
+
+class ResultBatch(NamedTuple):
+    ids: list[str]
+    texts: list[str] | None
+    created_times: list[datetime | None]
+    vectors: np.ndarray
+
+
+def _export_conditions(
+        provider: str, model: str, since: datetime | None, until: datetime | None, dimensions: int | None = None
+) -> list:
+    table = orm.embedded_results
+    conditions = _vector_conditions(provider, model, dimensions)
+    if since is not None:
+        conditions.append(table.c.created_time >= since)
+    if until is not None:
+        conditions.append(table.c.created_time < until)
+    return conditions
+
+
+def stored_dimensions(
+        provider: str, model: str, since: datetime | None = None, until: datetime | None = None
+) -> int | None:
+    """
+    The size the results of one (provider, model) created in ``[since, until)`` are stored at, None
+    without results.
+
+    Raises:
+        ValueError: The results are stored at several sizes.
+    """
+    with orm.get_engine().connect() as connection:
+        return _stored_dimensions(connection, provider, model, _export_conditions(provider, model, since, until))
+
+
+@contextlib.contextmanager
+def export_cursor(
+        provider: str,
+        model: str,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        include_text: bool = False,
+        batch_size: int = 10000,
+        dimensions: int | None = None,
+) -> Iterator[tuple[int, Iterator[ResultBatch]]]:
+    """
+    Count, then stream in id order, the whole-text results of one (provider, model) created in
+    ``[since, until)``, of the given ``dimensions`` or of the only size they are stored at.
+
+    Both run in one read transaction, repeatable on PostgreSQL, so the count matches the rows streamed.
+    Rows are read with a server-side cursor, ``batch_size`` at a time, and never enter the ORM.
+
+    Yields:
+        tuple[int, Iterator[ResultBatch]]: The number of results and their batches.
+
+    Raises:
+        ValueError: No ``dimensions`` is given and the results are stored at several sizes.
+    """
+    table = orm.embedded_results
+    conditions = _export_conditions(provider, model, since, until, dimensions)
+    columns = [table.c.id, table.c.created_time, table.c.vector] + ([table.c.text] if include_text else [])
+
+    engine = orm.get_engine()
+    options = {"isolation_level": "REPEATABLE READ"} if engine.dialect.name == "postgresql" else {}
+    with engine.connect().execution_options(**options) as connection, connection.begin():
+        if dimensions is None:
+            conditions.append(table.c.dimensions == _stored_dimensions(connection, provider, model, conditions))
+        statement = (
+            sqlalchemy.select(*columns)
+            .where(*conditions)
+            .order_by(table.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+        count = connection.execute(sqlalchemy.select(sqlalchemy.func.count()).where(*conditions)).scalar_one()
+
+        def batches() -> Iterator[ResultBatch]:
+            for partition in connection.execute(statement).partitions():
+                yield ResultBatch(
+                    ids=[row.id for row in partition],
+                    texts=[row.text for row in partition] if include_text else None,
+                    created_times=[row.created_time for row in partition],
+                    vectors=np.stack([vectors.decode(row.vector) for row in partition]),
+                )
+
+        yield count, batches()
+
+
+def insert_results(results: Sequence[models.EmbeddedResult], job_id: str | None = None):
+    """
+    Bulk insert results and the events they raised in one transaction, bypassing the ORM unit of work.
+
+    With ``job_id``, the whole texts among ``results`` are added to the completed texts of the job in
+    the same transaction, so a job never misses or counts twice results that are stored.
+    """
+    if not results:
+        return
+    now = datetime.now()
+    rows = [
+        {
+            "id": result.id,
+            "text": result.text,
+            "text_hash": result.text_hash,
+            "parent_id": result.parent_id,
+            "provider": result.provider,
+            "model": result.model,
+            "dimensions": result.dimensions,
+            "vector": result.vector_data,
+            "created_time": getattr(result, "created_time", None) or now,
+            "updated_time": getattr(result, "updated_time", None) or now,
+        }
+        for result in results
+    ]
+    outbox = [
+        {"id": message.id, "name": message.name, "body": message.body, "created_time": now, "updated_time": now}
+        for result in results
+        for message in map(models.OutboxMessage.of, getattr(result, "events", ()))
+    ]
+    with orm.get_engine().begin() as connection:
+        connection.execute(orm.embedded_results.insert(), rows)
+        if outbox:
+            connection.execute(orm.event_outbox.insert(), outbox)
+        if job_id is not None:
+            completed = sum(result.parent_id is None for result in results)
+            connection.execute(_job_progress(job_id, completed))
+
+
+def existing_result_ids(ids: Sequence[str]) -> set[str]:
+    """Return the ids among ``ids`` that are already stored."""
+    if not ids:
+        return set()
+    table = orm.embedded_results
+    with orm.get_engine().connect() as connection:
+        return set(connection.execute(sqlalchemy.select(table.c.id).where(table.c.id.in_(ids))).scalars())
+
+
+def _results_statement(ids: Sequence[str]) -> sqlalchemy.Select:
+    table = orm.embedded_results
+    return sqlalchemy.select(table).where(table.c.id.in_(ids))
+
+
+def _results_in_order(rows: Iterable, ids: Sequence[str]) -> list[models.EmbeddedResult]:
+    rows = {row.id: row for row in rows}
+    return [
+        models.EmbeddedResult(
+            id=row.id,
+            text=row.text,
+            text_hash=row.text_hash,
+            parent_id=row.parent_id,
+            provider=row.provider,
+            model=row.model,
+            dimensions=row.dimensions,
+            vector=vectors.decode(row.vector),
+        )
+        for row in (rows.get(result_id) for result_id in ids)
+        if row is not None
+    ]
+
+
+def get_results(ids: Sequence[str]) -> list[models.EmbeddedResult]:
+    """Return the stored results of ``ids``, in the order of ``ids``, skipping the missing ones."""
+    if not ids:
+        return []
+    with orm.get_engine().connect() as connection:
+        return _results_in_order(connection.execute(_results_statement(ids)).all(), ids)
+
+
+async def aget_results(ids: Sequence[str]) -> list[models.EmbeddedResult]:
+    """Async variant of ``get_results``, on the async engine when configured, else on the database thread."""
+    engine = orm.get_async_engine()
+    if engine is None:
+        return await executors.run_in_executor(executors.db_executor(), get_results, ids)
+    if not ids:
+        return []
+    async with engine.connect() as connection:
+        return _results_in_order((await connection.execute(_results_statement(ids))).all(), ids)
+
+
+def insert_job(job: models.EmbeddingJob):
+    now = datetime.now()
+    with orm.get_engine().begin() as connection:
+        connection.execute(
+            orm.embedding_jobs.insert(),
+            {
+                "id": job.id,
+                "provider": job.provider,
+                "model": job.model,
+                "status": job.status.value,
+                "total": job.total,
+                "completed": job.completed,
+                "failed": job.failed,
+                "error": job.error,
+                "created_time": now,
+                "updated_time": now,
+            },
+        )
+
+
+def _job_statement(job_id: str) -> sqlalchemy.Select:
+    table = orm.embedding_jobs
+    return sqlalchemy.select(table).where(table.c.id == job_id)
+
+
+def _job(row) -> models.EmbeddingJob | None:
+    if row is None:
+        return None
+    job = models.EmbeddingJob(
+        id=row.id,
+        provider=row.provider,
+        model=row.model,
+        total=row.total,
+        status=row.status,
+        completed=row.completed,
+        failed=row.failed,
+        error=row.error,
+    )
+    job.created_time, job.updated_time = row.created_time, row.updated_time
+    return job
+
+
+def get_job(job_id: str) -> models.EmbeddingJob | None:
+    with orm.get_engine().connect() as connection:
+        return _job(connection.execute(_job_statement(job_id)).one_or_none())
+
+
+async def aget_job(job_id: str) -> models.EmbeddingJob | None:
+    """Async variant of ``get_job``, on the async engine when configured, else on the database thread."""
+    engine = orm.get_async_engine()
+    if engine is None:
+        return await executors.run_in_executor(executors.db_executor(), get_job, job_id)
+    async with engine.connect() as connection:
+        return _job((await connection.execute(_job_statement(job_id))).one_or_none())
+
+
+def _job_progress(job_id: str, completed: int, failed: int = 0, error: str | None = None) -> sqlalchemy.Update:
+    table = orm.embedding_jobs
+    processed = table.c.completed + table.c.failed + completed + failed
+    status = sqlalchemy.case(
+        (processed < table.c.total, models.JobStatus.RUNNING.value),
+        (table.c.failed + failed > 0, models.JobStatus.FAILED.value),
+        else_=models.JobStatus.SUCCEEDED.value,
+    )
+    values = {
+        "completed": table.c.completed + completed,
+        "failed": table.c.failed + failed,
+        "status": status,
+        "updated_time": datetime.now(),
+    }
+    if error is not None:
+        values["error"] = error
+    return table.update().where(table.c.id == job_id).values(**values)
+
+
+def record_job_progress(job_id: str, completed: int, failed: int = 0, error: str | None = None):
+    """
+    Add processed texts to a job in one atomic update, safe with concurrent workers.
+
+    The job is ``running`` until every text is processed, then ``succeeded``, or ``failed`` when
+    some texts could not be embedded.
+    """
+    with orm.get_engine().begin() as connection:
+        connection.execute(_job_progress(job_id, completed, failed, error))
+
+
+def insert_analysis(job: models.AnalysisJob):
+    now = datetime.now()
+    with orm.get_engine().begin() as connection:
+        connection.execute(
+            orm.analysis_jobs.insert(),
+            {
+                "id": job.id,
+                "kind": job.kind.value,
+                "provider": job.provider,
+                "model": job.model,
+                "dimensions": job.dimensions,
+                "parameters": job.parameters,
+                "status": job.status.value,
+                "total": job.total,
+                "processed": job.processed,
+                "result": job.result,
+                "error": job.error,
+                "created_time": now,
+                "updated_time": now,
+            },
+        )
+
+
+def _analysis_statement(job_id: str) -> sqlalchemy.Select:
+    table = orm.analysis_jobs
+    return sqlalchemy.select(table).where(table.c.id == job_id)
+
+
+def _analysis(row) -> models.AnalysisJob | None:
+    if row is None:
+        return None
+    job = models.AnalysisJob(
+        id=row.id,
+        kind=row.kind,
+        provider=row.provider,
+        model=row.model,
+        dimensions=row.dimensions,
+        parameters=row.parameters,
+        status=row.status,
+        total=row.total,
+        processed=row.processed,
+        result=row.result,
+        error=row.error,
+    )
+    job.created_time, job.updated_time = row.created_time, row.updated_time
+    return job
+
+
+def get_analysis(job_id: str) -> models.AnalysisJob | None:
+    with orm.get_engine().connect() as connection:
+        return _analysis(connection.execute(_analysis_statement(job_id)).one_or_none())
+
+
+async def aget_analysis(job_id: str) -> models.AnalysisJob | None:
+    """Async variant of ``get_analysis``, on the async engine when configured, else on the database thread."""
+    engine = orm.get_async_engine()
+    if engine is None:
+        return await executors.run_in_executor(executors.db_executor(), get_analysis, job_id)
+    async with engine.connect() as connection:
+        return _analysis((await connection.execute(_analysis_statement(job_id))).one_or_none())
+
+
+def claim_analysis(job_id: str, lease: timedelta) -> bool:
+    """
+    Mark an analysis ``running`` for the caller, in one atomic update safe with concurrent workers.
+
+    A queued analysis is claimed, as is a running one whose progress was last recorded more than ``lease``
+    ago, its worker is presumed dead.
+
+    Returns:
+        bool: Whether the caller runs the analysis.
+    """
+    table = orm.analysis_jobs
+    now = datetime.now()
+    claimable = sqlalchemy.or_(
+        table.c.status == models.JobStatus.QUEUED.value,
+        sqlalchemy.and_(table.c.status == models.JobStatus.RUNNING.value, table.c.updated_time < now - lease),
+    )
+    statement = (
+        table.update()
+        .where(table.c.id == job_id, claimable)
+        .values(status=models.JobStatus.RUNNING.value, processed=0, updated_time=now)
+    )
+    with orm.get_engine().begin() as connection:
+        return connection.execute(statement).rowcount == 1
+
+
+def record_analysis_progress(job_id: str, processed: int, total: int | None = None):
+    """Record the work done by a running analysis, which also renews its claim."""
+    values = {"processed": processed, "updated_time": datetime.now()}
+    if total is not None:
+        values["total"] = total
+    with orm.get_engine().begin() as connection:
+        connection.execute(orm.analysis_jobs.update().where(orm.analysis_jobs.c.id == job_id).values(**values))
+
+
+def finish_analysis(job_id: str, result: dict | None = None, error: str | None = None):
+    """Record the result of an analysis, ``succeeded``, or its error, ``failed``."""
+    status = models.JobStatus.FAILED if error is not None else models.JobStatus.SUCCEEDED
+    values = {"status": status.value, "result": result, "error": error, "updated_time": datetime.now()}
+    if error is None:
+        values["processed"] = orm.analysis_jobs.c.total
+    with orm.get_engine().begin() as connection:
+        connection.execute(orm.analysis_jobs.update().where(orm.analysis_jobs.c.id == job_id).values(**values))
+
+
+def claim_outbox(relay: str, limit: int, lease: timedelta) -> list[models.OutboxMessage]:
+    """
+    Claim the oldest events of the outbox for a relay, in one atomic update safe with concurrent relays.
+
+    Events claimed by another relay are skipped until their claim is older than ``lease``.
+
+    Returns:
+        list[models.OutboxMessage]: The claimed events, oldest first.
+    """
+    table = orm.event_outbox
+    now = datetime.now()
+    claimable = sqlalchemy.or_(table.c.claimed_until.is_(None), table.c.claimed_until < now)
+    with orm.get_engine().begin() as connection:
+        ids = connection.execute(
+            sqlalchemy.select(table.c.id).where(claimable).order_by(table.c.created_time, table.c.id).limit(limit)
+        ).scalars().all()
+        if not ids:
+            return []
+        connection.execute(
+            table.update()
+            .where(table.c.id.in_(ids), claimable)
+            .values(claimed_by=relay, claimed_until=now + lease, updated_time=now)
+        )
+        rows = connection.execute(
+            sqlalchemy.select(table.c.id, table.c.name, table.c.body)
+            .where(table.c.id.in_(ids), table.c.claimed_by == relay)
+            .order_by(table.c.created_time, table.c.id)
+        ).all()
+    return [models.OutboxMessage(row.name, row.body, row.id) for row in rows]
+
+
+def delete_outbox(ids: Sequence[str]):
+    """Delete published events from the outbox."""
+    if not ids:
+        return
+    with orm.get_engine().begin() as connection:
+        connection.execute(orm.event_outbox.delete().where(orm.event_outbox.c.id.in_(ids)))
+
+
+def result_models() -> list[tuple[str, str]]:
+    """Distinct (provider, model) of the stored results."""
+    table = orm.embedded_results
+    statement = sqlalchemy.select(table.c.provider, table.c.model).distinct()
+    with orm.get_engine().connect() as connection:
+        return [tuple(row) for row in connection.execute(statement)]
+
+
+def expired_result_ids(provider: str, model: str, before: datetime, limit: int) -> list[str]:
+    """Ids of the oldest results of (provider, model) created before ``before``, chunk results excluded."""
+    table = orm.embedded_results
+    statement = (
+        sqlalchemy.select(table.c.id)
+        .where(*_vector_conditions(provider, model, None), table.c.created_time < before)
+        .order_by(table.c.created_time)
+        .limit(limit)
+    )
+    with orm.get_engine().connect() as connection:
+        return list(connection.execute(statement).scalars())
+
+
+def delete_results(ids: Sequence[str]) -> set[tuple[str, str, int]]:
+    """
+    Delete results and their chunk results in one transaction, and bump the index version of their
+    (provider, model, dimensions).
+
+    Returns:
+        set[tuple[str, str, int]]: The (provider, model, dimensions) of the deleted results.
+    """
+    if not ids:
+        return set()
+    table = orm.embedded_results
+    deleted = sqlalchemy.or_(table.c.id.in_(ids), table.c.parent_id.in_(ids))
+    with orm.get_engine().begin() as connection:
+        keys = connection.execute(
+            sqlalchemy.select(table.c.provider, table.c.model, table.c.dimensions).where(deleted).distinct()
+        ).all()
+        connection.execute(table.delete().where(table.c.parent_id.in_(ids)))
+        connection.execute(table.delete().where(table.c.id.in_(ids)))
+        _bump_index_versions(connection, keys)
+    return {tuple(key) for key in keys}
+
+
+def _bump_index_versions(connection: sqlalchemy.Connection, keys: Sequence[tuple[str, str, int]]):
+    table = orm.index_versions
+    now = datetime.now()
+    for provider, model, dimensions in keys:
+        key = (table.c.provider == provider, table.c.model == model, table.c.dimensions == dimensions)
+        updated = connection.execute(
+            table.update().where(*key).values(version=table.c.version + 1, updated_time=now)
+        )
+        if not updated.rowcount:
+            connection.execute(
+                table.insert().values(
+                    provider=provider,
+                    model=model,
+                    dimensions=dimensions,
+                    version=1,
+                    created_time=now,
+                    updated_time=now,
+                )
+            )
+
+
+def index_version(provider: str, model: str, dimensions: int) -> int:
+    """Version of the stored results of (provider, model, dimensions), bumped whenever some of them are deleted."""
+    table = orm.index_versions
+    statement = sqlalchemy.select(table.c.version).where(
+        table.c.provider == provider, table.c.model == model, table.c.dimensions == dimensions
+    )
+    with orm.get_engine().connect() as connection:
+        return connection.execute(statement).scalar() or 0
+
+
+def results_without_text_hash(after: str | None, limit: int) -> list[sqlalchemy.Row]:
+    """(id, provider, model, text) of whole-text results stored before text hashes existed, in id order."""
+    table = orm.embedded_results
+    conditions = [table.c.text_hash.is_(None), table.c.parent_id.is_(None)]
+    if after is not None:
+        conditions.append(table.c.id > after)
+    statement = (
+        sqlalchemy.select(table.c.id, table.c.provider, table.c.model, table.c.text)
+        .where(*conditions)
+        .order_by(table.c.id)
+        .limit(limit)
+    )
+    with orm.get_engine().connect() as connection:
+        return connection.execute(statement).all()
+
+
+def set_text_hashes(hashes: dict[str, str]):
+    """Set the text hash of results, by id."""
+    if not hashes:
+        return
+    table = orm.embedded_results
+    with orm.get_engine().begin() as connection:
+        connection.execute(
+            table.update().where(table.c.id == sqlalchemy.bindparam("row_id")),
+            [{"row_id": result_id, "text_hash": key} for result_id, key in hashes.items()],
+        )
+
+
+def duplicate_text_hashes(after: str | None, limit: int) -> list[str]:
+    """Text hashes of more than one whole-text result, in order, from the text hash index."""
+    table = orm.embedded_results
+    conditions = [table.c.text_hash.is_not(None), table.c.parent_id.is_(None)]
+    if after is not None:
+        conditions.append(table.c.text_hash > after)
+    statement = (
+        sqlalchemy.select(table.c.text_hash)
+        .where(*conditions)
+        .group_by(table.c.text_hash)
+        .having(sqlalchemy.func.count() > 1)
+        .order_by(table.c.text_hash)
+        .limit(limit)
+    )
+    with orm.get_engine().connect() as connection:
+        return list(connection.execute(statement).scalars())
+
+
+def duplicate_result_ids(hashes: Sequence[str], before: datetime) -> list[str]:
+    """
+    Ids of the whole-text results of ``hashes`` created before ``before``, other than the oldest result of
+    each hash. Results without a created time count as the oldest.
+    """
+    if not hashes:
+        return []
+    table = orm.embedded_results
+    statement = (
+        sqlalchemy.select(table.c.id, table.c.text_hash, table.c.created_time)
+        .where(table.c.text_hash.in_(hashes), table.c.parent_id.is_(None))
+    )
+    with orm.get_engine().connect() as connection:
+        rows = connection.execute(statement).all()
+    rows.sort(key=lambda row: (row.text_hash, row.created_time or datetime.min, row.id))
+    duplicates, kept = [], None
+    for row in rows:
+        if row.text_hash != kept:
+            kept = row.text_hash
+        elif row.created_time is None or row.created_time < before:
+            duplicates.append(row.id)
+    return duplicates
+
+
+def reclaim_space(pages: int) -> bool:
+    """
+    Return the space of deleted results to the database, one step at a time.
+
+    PostgreSQL runs a plain ``VACUUM``, which unlike ``VACUUM FULL`` lets reads and writes go on. SQLite frees
+    up to ``pages`` pages of a database created with incremental auto-vacuum. Other databases reuse the space
+    for new rows.
+
+    Returns:
+        bool: Whether there is space left to reclaim.
+    """
+    engine = orm.get_engine()
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(sqlalchemy.text(f"VACUUM (ANALYZE) {orm.embedded_results.name}"))
+        return False
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as connection:
+        if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            return False
+        # Run as a script, a plain statement only frees one page with this driver
+        connection.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({pages})")
+        return connection.exec_driver_sql("PRAGMA freelist_count").scalar() > 0
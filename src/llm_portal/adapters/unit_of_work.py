@@ -0,0 +1,64 @@
+import threading
+from typing import Any, Iterator
+
+import core
+from sqlalchemy.orm import Session
+
+from llm_portal.adapters import orm
+
+
+class SessionRepository:
+    """Objects added in a unit of work, written by its session on commit."""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.seen: list[Any] = []
+
+    def add(self, obj: Any):
+        self.session.add(obj)
+        self.seen.append(obj)
+
+
+class SqlAlchemyUnitOfWork(core.UnitOfWork):
+    """
+    Unit of work on the engine of ``orm.get_engine()``, so writes go through the pool, pragmas and
+    timeouts of ``embedding.database``.
+
+    Nothing is opened before the first ``with uow``, and every thread gets its own session, so one
+    instance is shared by the threads of the database executor.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    @property
+    def session(self) -> Session:
+        return self._local.session
+
+    @property
+    def repo(self) -> SessionRepository:
+        return self._local.repo
+
+    def __enter__(self) -> "SqlAlchemyUnitOfWork":
+        # Results are read after the commit, they are not reloaded from the database
+        session = Session(orm.get_engine(), expire_on_commit=False)
+        self._local.session, self._local.repo = session, SessionRepository(session)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.rollback()
+        finally:
+            self.session.close()
+
+    def commit(self):
+        self.session.commit()
+
+    def rollback(self):
+        self.session.rollback()
+
+    def collect_new_events(self) -> Iterator[core.Event]:
+        for obj in self.repo.seen:
+            while getattr(obj, "events", None):
+                yield obj.events.pop(0)
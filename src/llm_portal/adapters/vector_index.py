@@ -0,0 +1,196 @@
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from llm_portal.domains.vectors import VectorLike
+
+__all__ = [
+    "SearchHit",
+    "VectorIndex",
+]
+
+_INITIAL_CAPACITY = 1024
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLES_PER_LIST = 64
+_ASSIGN_BLOCK_SIZE = 65536
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    id: str
+    text: str
+    score: float
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class VectorIndex:
+    """
+    In-memory cosine similarity index for the vectors of one (provider, model).
+
+    Vectors are kept L2-normalized in a growing float32 matrix. Exact search is a single vectorized
+    matrix-vector product. Approximate search uses an inverted file (IVF): vectors are assigned to
+    the nearest of ``nlist`` k-means centroids and only the ``nprobe`` lists closest to the query
+    are scored. The IVF is trained on first approximate search once the index holds
+    ``min_train_size`` vectors, and retrained when the index has doubled since.
+
+    Args:
+        dimensions (int): Vector dimensions
+        nlist (int, optional): Number of IVF lists, defaults to sqrt of the index size
+        nprobe (int): Number of IVF lists scored per query
+        min_train_size (int): Below this size approximate search falls back to exact search
+    """
+
+    def __init__(self, dimensions: int, nlist: int | None = None, nprobe: int = 8, min_train_size: int = 10000):
+        self.dimensions = dimensions
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+
+        self._matrix = np.empty((_INITIAL_CAPACITY, dimensions), dtype=np.float32)
+        self._ids: list[str] = []
+        self._texts: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._lock = threading.RLock()
+
+        self._centroids: np.ndarray | None = None
+        self._assignments = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], vectors: Iterable[VectorLike] | np.ndarray):
+        """Add vectors, ids already in the index are skipped."""
+        matrix = np.asarray(vectors if isinstance(vectors, np.ndarray) else list(vectors), dtype=np.float32)
+        if matrix.size == 0:
+            return
+        matrix = matrix.reshape(-1, self.dimensions)
+
+        with self._lock:
+            keep = [position for position, item_id in enumerate(ids) if item_id not in self._rows]
+            if not keep:
+                return
+            if len(keep) < len(ids):
+                matrix = matrix[keep]
+            start = len(self._ids)
+            end = start + len(keep)
+            self._reserve(end)
+
+            self._matrix[start:end] = _normalize(matrix)
+            for row, position in enumerate(keep, start):
+                self._rows[ids[position]] = row
+                self._ids.append(ids[position])
+                self._texts.append(texts[position])
+            if self._centroids is not None:
+                self._assignments[start:end] = self._assign(self._matrix[start:end])
+
+    def search(
+            self,
+            query: VectorLike,
+            top_k: int = 10,
+            approximate: bool = False,
+            ids: Sequence[str] | None = None,
+            text_contains: str | None = None,
+    ) -> list[SearchHit]:
+        """
+        Return the ``top_k`` most similar vectors, best first.
+
+        Args:
+            query (VectorLike): Query vector, it does not need to be normalized
+            top_k (int): Number of hits
+            approximate (bool): Score only the closest IVF lists
+            ids (Sequence[str], optional): Restrict the search to these ids
+            text_contains (str, optional): Restrict the search to texts containing this substring
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dimensions:
+            raise ValueError(f"Query has {query.shape[0]} dimensions, the index has {self.dimensions}")
+        query = _normalize(query)
+
+        with self._lock:
+            size = len(self._ids)
+            if approximate and size >= self.min_train_size and (
+                    self._centroids is None or size >= 2 * self._trained_size
+            ):
+                self._train()
+            # The matrix is only ever appended to or replaced, so rows below ``size`` stay valid
+            # for this query while other threads keep adding vectors.
+            matrix, assignments, centroids = self._matrix, self._assignments, self._centroids
+
+        candidates = None
+        if approximate and centroids is not None:
+            nprobe = min(self.nprobe, centroids.shape[0])
+            lists = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+            candidates = np.flatnonzero(np.isin(assignments[:size], lists))
+        if ids is not None:
+            rows = (self._rows.get(item_id) for item_id in ids)
+            selected = np.unique(np.fromiter((row for row in rows if row is not None and row < size), dtype=np.int64))
+            candidates = selected if candidates is None else np.intersect1d(candidates, selected)
+        if text_contains is not None:
+            rows = range(size) if candidates is None else candidates
+            candidates = np.fromiter((row for row in rows if text_contains in self._texts[row]), dtype=np.int64)
+
+        if candidates is None:
+            rows = np.arange(size)
+            scores = matrix[:size] @ query
+        else:
+            rows = candidates
+            scores = matrix[candidates] @ query
+
+        if scores.size == 0:
+            return []
+        top_k = min(top_k, scores.size)
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [SearchHit(id=self._ids[rows[i]], text=self._texts[rows[i]], score=float(scores[i])) for i in best]
+
+    def _reserve(self, size: int):
+        capacity = self._matrix.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        matrix = np.empty((capacity, self.dimensions), dtype=np.float32)
+        matrix[: len(self._ids)] = self._matrix[: len(self._ids)]
+        self._matrix = matrix
+        assignments = np.empty(capacity, dtype=np.int32)
+        assignments[: len(self._ids)] = self._assignments[: len(self._ids)]
+        self._assignments = assignments
+
+    def _train(self):
+        """Spherical k-means on a sample of the index, then assign every vector to its list."""
+        size = len(self._ids)
+        nlist = min(self.nlist or max(1, int(np.sqrt(size))), size)
+        rng = np.random.default_rng(0)
+        sample_size = min(size, nlist * _KMEANS_SAMPLES_PER_LIST)
+        sample = self._matrix[rng.choice(size, sample_size, replace=False)]
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)]
+        for _ in range(_KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = ~np.any(sums, axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+
+        self._centroids = centroids
+        self._assignments[:size] = self._assign(self._matrix[:size])
+        self._trained_size = size
+
+    def _assign(self, matrix: np.ndarray) -> np.ndarray:
+        labels = np.empty(matrix.shape[0], dtype=np.int32)
+        for start in range(0, matrix.shape[0], _ASSIGN_BLOCK_SIZE):
+            block = matrix[start : start + _ASSIGN_BLOCK_SIZE]
+            labels[start : start + block.shape[0]] = np.argmax(block @ self._centroids.T, axis=1)
+        return labels
@@ -0,0 +1,131 @@
+import asyncio
+from typing import Callable, Generic, Sequence, TypeVar
+
+import utils
+
+from llm_portal import executors
+
+logger = utils.get_logger()
+
+T = TypeVar("T")
+
+
+class BufferedWriter(Generic[T]):
+    """
+    Write-behind buffer that persists rows in bulk.
+
+    Rows are flushed every ``flush_interval_ms`` or as soon as ``flush_rows`` are buffered. ``flush``
+    runs in the database thread pool, one flush at a time: rows buffered meanwhile wait for the flush in
+    flight and go in the next one. Callers either wait until their rows are
+    flushed (group commit) or return immediately (write-behind). When more than ``max_pending_rows``
+    are buffered or being flushed, write-behind callers wait for the buffer to drain.
+
+    Args:
+        flush (Callable[[list[T]], None]): Persists a batch of rows
+        flush_interval_ms (float): Longest time a row stays buffered
+        flush_rows (int): Number of buffered rows that triggers a flush
+        max_pending_rows (int): Buffered plus in-flight rows above which writers are pushed back
+    """
+
+    def __init__(
+            self,
+            flush: Callable[[list[T]], None],
+            flush_interval_ms: float = 50.0,
+            flush_rows: int = 500,
+            max_pending_rows: int = 10000,
+    ):
+        self._flush_rows_fn = flush
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_rows = flush_rows
+        self.max_pending_rows = max_pending_rows
+
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._buffer: list[T] = []
+        self._waiters: list[asyncio.Future] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._in_flight_rows = 0
+        # The database executor has several threads, flushes of the writer still run one at a time
+        self._flushing = asyncio.Lock()
+
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+
+    @property
+    def pending_rows(self) -> int:
+        return len(self._buffer) + self._in_flight_rows
+
+    async def write(self, rows: Sequence[T], wait: bool = True):
+        """Buffer rows, with ``wait`` return only once they are persisted and raise if that failed."""
+        loop = self.loop = asyncio.get_running_loop()
+        self._buffer.extend(rows)
+        future = None
+        if wait:
+            future = loop.create_future()
+            self._waiters.append(future)
+
+        if len(self._buffer) >= self.flush_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._flush)
+
+        if future is not None:
+            await future
+        elif self.pending_rows > self.max_pending_rows:
+            await self.drain()
+
+    async def drain(self):
+        """Flush the buffer and wait for every flush in flight."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def take_over(self, writer: "BufferedWriter[T]"):
+        """Buffer the rows ``writer`` has not flushed yet, once its event loop is closed."""
+        rows, writer._buffer = writer._buffer, []
+        self._buffer.extend(rows)
+
+    def stats(self) -> dict:
+        return {
+            "pending_rows": self.pending_rows,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+        }
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        rows, self._buffer = self._buffer, []
+        waiters, self._waiters = self._waiters, []
+        if not rows:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+            return
+
+        task = asyncio.get_running_loop().create_task(self._write(rows, waiters))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, rows: list[T], waiters: list[asyncio.Future]):
+        self._in_flight_rows += len(rows)
+        try:
+            async with self._flushing:
+                await executors.run_in_executor(executors.db_executor(), self._flush_rows_fn, rows)
+        except Exception as e:
+            logger.error(f"Failed to flush {len(rows)} rows: {e}")
+            self.failed_rows += len(rows)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            self.flushes += 1
+            self.flushed_rows += len(rows)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+        finally:
+            self._in_flight_rows -= len(rows)
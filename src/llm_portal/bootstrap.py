@@ -2,9 +2,11 @@ import core
 
 from llm_portal import dependencies
 from llm_portal.adapters import orm
+from llm_portal.service import messagebus
 from llm_portal.service.handlers import command, event
 
 BOOTSTRAPPER = None
+ASYNC_BUS = None
 
 def bootstrap(use_orm: bool = True) -> core.MessageBus:
     global BOOTSTRAPPER
@@ -16,4 +18,16 @@ def bootstrap(use_orm: bool = True) -> core.MessageBus:
             event_router=event.EVENT_HANDLERS,
             dependencies=dependencies.DEPENDENCIES,
         )
-    return BOOTSTRAPPER.bootstrap()
\ No newline at end of file
+    return BOOTSTRAPPER.bootstrap()
+
+
+def bootstrap_async(use_orm: bool = True) -> messagebus.AsyncMessageBus:
+    """Bootstrap the application and return the message bus used by the async request path."""
+    global ASYNC_BUS
+    if ASYNC_BUS is None:
+        bootstrap(use_orm=use_orm)
+        ASYNC_BUS = messagebus.AsyncMessageBus(
+            command_handlers=command.ASYNC_COMMAND_HANDLERS,
+            dependencies=dependencies.DEPENDENCIES,
+        )
+    return ASYNC_BUS
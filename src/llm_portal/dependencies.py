@@ -1,11 +1,16 @@
-import core
-import message_broker
-import utils
+from llm_portal.adapters.broker import LazyBroker
+from llm_portal.adapters.unit_of_work import SqlAlchemyUnitOfWork
 
-config = utils.get_config()
 
-
-DEPENDENCIES = {
-    "uow": core.UnitOfWork(config["database"]),
-    "publisher": message_broker.Publisher(config["message_broker"]),
-}
+def __getattr__(name: str):
+    # Created on first use rather than on import, so importing the package does not connect anything
+    if name == "DEPENDENCIES":
+        global DEPENDENCIES
+        DEPENDENCIES = {
+            # Commits through the engine of ``orm.get_engine()``, pooled and tuned by ``embedding.database``
+            "uow": SqlAlchemyUnitOfWork(),
+            # Jobs and domain events share the broker of the ``message_broker`` config, created on first publish
+            "publisher": LazyBroker(),
+        }
+        return DEPENDENCIES
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
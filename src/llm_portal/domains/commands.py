@@ -1,10 +1,14 @@
-from typing import List
+from typing import List, Literal
 
 import core
 import pydantic
 
 __all__ = [
     "InputTextCommand",
+    "BatchInputTextCommand",
+    "SubmitEmbeddingJobCommand",
+    "SubmitClusteringCommand",
+    "SubmitDuplicatesCommand",
     "EmbeddingResult",
 ]
 
@@ -16,10 +20,103 @@ class InputTextCommand(core.Command):
         text (str): The text to be processed
         provider_name (str): The name of the provider used for embedding
         embedding_model (str): The model used for embedding the text
+        dimensions (int, optional): Reduced dimensions of the vector, the model's full size by default
+        pooling (str, optional): Vector of a text longer than the model accepts, ``mean`` or ``weighted``
+            of its chunks, or ``chunks`` to also store every chunk, ``embedding.chunking.pooling`` by default
+        priority (str, optional): Scheduler lane of the request, the ``X-Priority`` header or the default lane
     """
     text: str
     provider_name: str
     embedding_model: str
+    dimensions: int | None = pydantic.Field(default=None, ge=1)
+    pooling: Literal["mean", "weighted", "chunks"] | None = None
+    priority: str | None = None
+
+
+class BatchInputTextCommand(core.Command):
+    """
+    Batch input command
+
+    Args:
+        texts (List[str]): The texts to be processed, results keep this order
+        provider_name (str): The name of the provider used for embedding
+        embedding_model (str): The model used for embedding the texts
+        dimensions (int, optional): Reduced dimensions of the vectors, the model's full size by default
+        pooling (str, optional): Vector of texts longer than the model accepts,
+            ``embedding.chunking.pooling`` by default
+        priority (str, optional): Scheduler lane of the request, the ``X-Priority`` header or the default lane
+    """
+    texts: List[str] = pydantic.Field(min_length=1)
+    provider_name: str
+    embedding_model: str
+    dimensions: int | None = pydantic.Field(default=None, ge=1)
+    pooling: Literal["mean", "weighted", "chunks"] | None = None
+    priority: str | None = None
+
+    def result_ids(self) -> List[str]:
+        """Ids of the stored results, one per text in input order."""
+        return [f"{self._id}-{index}" for index in range(len(self.texts))]
+
+
+class SubmitEmbeddingJobCommand(core.Command):
+    """
+    Submit texts to be embedded in the background
+
+    Args:
+        texts (List[str]): The texts to be processed, results are stored as ``<job id>-<index>``
+        provider_name (str): The name of the provider used for embedding
+        embedding_model (str): The model used for embedding the texts
+        dimensions (int, optional): Reduced dimensions of the vectors, the model's full size by default
+        pooling (str, optional): Vector of texts longer than the model accepts,
+            ``embedding.chunking.pooling`` by default
+        priority (str, optional): Scheduler lane of the request, the ``X-Priority`` header or the default lane
+    """
+    texts: List[str] = pydantic.Field(min_length=1)
+    provider_name: str
+    embedding_model: str
+    dimensions: int | None = pydantic.Field(default=None, ge=1)
+    pooling: Literal["mean", "weighted", "chunks"] | None = None
+    priority: str | None = None
+
+
+class SubmitClusteringCommand(core.Command):
+    """
+    Submit a mini-batch k-means clustering of stored vectors, run in the background
+
+    Args:
+        provider_name (str): The provider the vectors were made with
+        embedding_model (str): The model the vectors were made with
+        dimensions (int, optional): Size of the vectors, the model's full size by default
+        clusters (int): Number of clusters
+        max_iterations (int): Largest number of passes over the vectors
+        tolerance (float): Relative change of the inertia between two passes under which the clustering stops
+        seed (int): Seed of the initial centroids, the same vectors and seed give the same clusters
+    """
+    provider_name: str
+    embedding_model: str
+    dimensions: int | None = pydantic.Field(default=None, ge=1)
+    clusters: int = pydantic.Field(ge=2)
+    max_iterations: int = pydantic.Field(default=10, ge=1)
+    tolerance: float = pydantic.Field(default=1e-4, ge=0)
+    seed: int = 0
+
+
+class SubmitDuplicatesCommand(core.Command):
+    """
+    Submit a search for the pairs of stored vectors above a cosine similarity, run in the background
+
+    Args:
+        provider_name (str): The provider the vectors were made with
+        embedding_model (str): The model the vectors were made with
+        dimensions (int, optional): Size of the vectors, the model's full size by default
+        threshold (float): Smallest cosine similarity of a near-duplicate pair
+        max_pairs (int, optional): Most pairs kept, the most similar ones, ``embedding.analysis.max_pairs`` by default
+    """
+    provider_name: str
+    embedding_model: str
+    dimensions: int | None = pydantic.Field(default=None, ge=1)
+    threshold: float = pydantic.Field(default=0.95, gt=0, le=1)
+    max_pairs: int | None = pydantic.Field(default=None, ge=1)
 
 
 class EmbeddingResult(pydantic.BaseModel):
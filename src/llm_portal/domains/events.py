@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import core
+
+__all__ = [
+    "EmbeddingCreated",
+]
+
+
+class EmbeddingCreated(core.Event):
+    """
+    Embedding created event, raised for every result stored
+
+    Args:
+        result_id (str): Id of the stored result
+        provider (str): The provider the embedding was made with
+        model (str): The model the embedding was made with
+        dimensions (int): Size of the vector
+        text_hash (str, optional): Content hash of the text, shared by the results of identical texts
+        parent_id (str, optional): Result of the whole text when the result is a chunk of it
+        created_time (datetime): Time the embedding was made
+    """
+    result_id: str
+    provider: str
+    model: str
+    dimensions: int
+    text_hash: str | None = None
+    parent_id: str | None = None
+    created_time: datetime
@@ -1 +1,4 @@
-from .embedded import *
\ No newline at end of file
+from .analysis import *  # noqa: F403
+from .embedded import *  # noqa: F403
+from .job import *  # noqa: F403
+from .outbox import *  # noqa: F403
@@ -0,0 +1,55 @@
+import enum
+from typing import Any
+
+import core
+
+from .job import JobStatus
+
+__all__ = [
+    "AnalysisKind",
+    "AnalysisJob",
+]
+
+
+class AnalysisKind(str, enum.Enum):
+    CLUSTERS = "clusters"
+    DUPLICATES = "duplicates"
+
+
+class AnalysisJob(core.BaseModel):
+    """
+    Clustering or near-duplicate analysis of the stored vectors of one (provider, model, dimensions).
+
+    Progress is counted in units of work, vectors for clusters and vector pairs compared for duplicates,
+    ``processed`` of ``total``. The ``result`` is set once the analysis succeeded.
+    """
+
+    def __init__(self,
+                 id: str,
+                 kind: AnalysisKind, provider: str, model: str, dimensions: int,
+                 parameters: dict[str, Any] | None = None,
+                 status: JobStatus = JobStatus.QUEUED, total: int = 0, processed: int = 0,
+                 result: dict[str, Any] | None = None, error: str | None = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.id = id
+        self.kind = AnalysisKind(kind)
+        self.provider = provider
+        self.model = model
+        self.dimensions = dimensions
+        self.parameters = parameters or {}
+        self.status = JobStatus(status)
+        self.total = total
+        self.processed = processed
+        self.result = result
+        self.error = error
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    @property
+    def progress(self) -> float:
+        """Share of the work done, from 0 to 1."""
+        if self.status == JobStatus.SUCCEEDED:
+            return 1.0
+        return min(1.0, self.processed / self.total) if self.total else 0.0
@@ -1,14 +1,34 @@
 import core
+import numpy as np
+
+from llm_portal.domains import vectors
 
 
 class EmbeddedResult(core.BaseModel):
     def __init__(self,
                  id: str,
-                 text: str, provider: str, model: str, dimensions: int, vector: list[float], *args, **kwargs):
+                 text: str, provider: str, model: str, dimensions: int, vector: vectors.VectorLike,
+                 text_hash: str | None = None, parent_id: str | None = None, *args, **kwargs):
         super().__init__(*args,**kwargs)
         self.id = id
         self.text = text
+        self.text_hash = text_hash
+        # Chunks of a long text stored on their own point to the result of the whole text
+        self.parent_id = parent_id
         self.provider = provider
         self.model = model
         self.dimensions = dimensions
-        self.vector = vector
\ No newline at end of file
+        self.vector = vector
+
+    @property
+    def vector(self) -> np.ndarray:
+        """The embedding as a float32 array, decoded from ``vector_data`` on first access."""
+        decoded = self.__dict__.get("_decoded_vector")
+        if decoded is None:
+            decoded = self.__dict__["_decoded_vector"] = vectors.decode(self.vector_data)
+        return decoded
+
+    @vector.setter
+    def vector(self, value: vectors.VectorLike):
+        self.vector_data = vectors.encode(value)
+        self.__dict__["_decoded_vector"] = None
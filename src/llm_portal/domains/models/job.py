@@ -0,0 +1,47 @@
+import enum
+
+import core
+
+__all__ = [
+    "JobStatus",
+    "EmbeddingJob",
+]
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class EmbeddingJob(core.BaseModel):
+    """
+    Texts embedded in the background by the workers.
+
+    Results are stored with the ids ``<job id>-<index>``. A job is ``failed`` once every text is
+    processed and some could not be embedded, the others are still stored.
+    """
+
+    def __init__(self,
+                 id: str,
+                 provider: str, model: str, total: int,
+                 status: JobStatus = JobStatus.QUEUED, completed: int = 0, failed: int = 0,
+                 error: str | None = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.id = id
+        self.provider = provider
+        self.model = model
+        self.total = total
+        self.status = JobStatus(status)
+        self.completed = completed
+        self.failed = failed
+        self.error = error
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def result_ids(self, offset: int = 0, limit: int | None = None) -> list[str]:
+        end = self.total if limit is None else min(self.total, offset + limit)
+        return [f"{self.id}-{index}" for index in range(offset, end)]
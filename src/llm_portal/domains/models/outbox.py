@@ -0,0 +1,29 @@
+import time
+import uuid
+from typing import Any
+
+import core
+
+__all__ = [
+    "OutboxMessage",
+]
+
+
+class OutboxMessage(core.BaseModel):
+    """
+    Domain event waiting in the outbox, stored in the transaction of the change that raised it.
+
+    The outbox relay publishes and then deletes it, so an event is published at least once, ``id``
+    lets consumers drop the events they already handled. Ids start with the creation time, so events
+    of one process are published in the order they were raised.
+    """
+
+    def __init__(self, name: str, body: dict[str, Any], id: str | None = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.id = id or f"{time.time_ns():016x}{uuid.uuid4().hex[:16]}"
+        self.name = name
+        self.body = body
+
+    @classmethod
+    def of(cls, event: core.Event) -> "OutboxMessage":
+        return cls(type(event).__name__, event.model_dump(mode="json"))
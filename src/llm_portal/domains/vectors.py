@@ -0,0 +1,150 @@
+import json
+import struct
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+import numpy as np
+
+__all__ = [
+    "VectorCodec",
+    "Float32Codec",
+    "Float16Codec",
+    "Int8Codec",
+    "CODECS",
+    "encode",
+    "decode",
+    "set_default_codec",
+    "is_legacy",
+    "truncate",
+    "normalize",
+    "pool",
+]
+
+VectorLike = Sequence[float] | np.ndarray
+
+
+class VectorCodec(ABC):
+    """
+    Binary encoding of an embedding vector.
+
+    Encoded vectors start with a one byte ``tag`` so rows written with different codecs, and legacy JSON
+    rows (which start with ``[``), can be decoded side by side.
+    """
+
+    name: str
+    tag: int
+
+    def encode(self, vector: VectorLike) -> bytes:
+        return bytes((self.tag,)) + self._encode(np.asarray(vector, dtype=np.float32))
+
+    def decode(self, data: bytes) -> np.ndarray:
+        return self._decode(memoryview(data)[1:])
+
+    @abstractmethod
+    def _encode(self, vector: np.ndarray) -> bytes:
+        pass
+
+    @abstractmethod
+    def _decode(self, payload: memoryview) -> np.ndarray:
+        pass
+
+
+class Float32Codec(VectorCodec):
+    """Lossless little-endian float32, 4 bytes per dimension."""
+
+    name = "float32"
+    tag = 1
+
+    def _encode(self, vector: np.ndarray) -> bytes:
+        return vector.astype("<f4", copy=False).tobytes()
+
+    def _decode(self, payload: memoryview) -> np.ndarray:
+        return np.frombuffer(payload, dtype="<f4").astype(np.float32, copy=False)
+
+
+class Float16Codec(VectorCodec):
+    """Little-endian float16, 2 bytes per dimension."""
+
+    name = "float16"
+    tag = 2
+
+    def _encode(self, vector: np.ndarray) -> bytes:
+        return vector.astype("<f2").tobytes()
+
+    def _decode(self, payload: memoryview) -> np.ndarray:
+        return np.frombuffer(payload, dtype="<f2").astype(np.float32)
+
+
+class Int8Codec(VectorCodec):
+    """Symmetric int8 scalar quantization with a per-vector float32 scale, 1 byte per dimension."""
+
+    name = "int8"
+    tag = 3
+
+    def _encode(self, vector: np.ndarray) -> bytes:
+        peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+        scale = peak / 127 if peak > 0 else 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        return struct.pack("<f", scale) + quantized.tobytes()
+
+    def _decode(self, payload: memoryview) -> np.ndarray:
+        (scale,) = struct.unpack_from("<f", payload)
+        return np.frombuffer(payload[4:], dtype=np.int8).astype(np.float32) * np.float32(scale)
+
+
+CODECS: dict[str, VectorCodec] = {codec.name: codec for codec in (Float32Codec(), Float16Codec(), Int8Codec())}
+_CODECS_BY_TAG: dict[int, VectorCodec] = {codec.tag: codec for codec in CODECS.values()}
+_LEGACY_JSON_TAG = ord("[")
+
+_default_codec: VectorCodec = CODECS["float32"]
+
+
+def set_default_codec(name: str):
+    """Select the codec used by ``encode`` when none is given."""
+    global _default_codec
+    if name not in CODECS:
+        raise ValueError(f"Vector codec {name} is not supported. Supported codecs are: {list(CODECS.keys())}")
+    _default_codec = CODECS[name]
+
+
+def encode(vector: VectorLike, codec: str | None = None) -> bytes:
+    return (CODECS[codec] if codec else _default_codec).encode(vector)
+
+
+def decode(data: bytes | str) -> np.ndarray:
+    """Decode a stored vector written by any codec, or a legacy JSON list."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if not data:
+        return np.empty(0, dtype=np.float32)
+    if data[0] == _LEGACY_JSON_TAG:
+        return np.asarray(json.loads(data), dtype=np.float32)
+    return _CODECS_BY_TAG[data[0]].decode(data)
+
+
+def is_legacy(data: bytes | str) -> bool:
+    """Whether a stored vector is still a JSON list."""
+    if isinstance(data, str):
+        return data.startswith("[")
+    return bool(data) and data[0] == _LEGACY_JSON_TAG
+
+
+def truncate(vectors: Sequence[VectorLike] | np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Keep the first ``dimensions`` of each vector and rescale the rows to unit length.
+
+    Matryoshka-trained models front-load information, so the prefix of a vector is a usable embedding on its own.
+    """
+    return normalize(np.asarray(vectors, dtype=np.float32)[:, :dimensions])
+
+
+def normalize(vectors: Sequence[VectorLike] | np.ndarray) -> np.ndarray:
+    """Rescale the rows to unit length, zero rows stay zero."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def pool(vectors: Sequence[VectorLike] | np.ndarray, weights: Sequence[float] | None = None) -> np.ndarray:
+    """Unit-length mean of the rows, weighted by ``weights`` when given."""
+    return normalize(np.average(np.asarray(vectors, dtype=np.float32), axis=0, weights=weights))
@@ -1,13 +1,60 @@
-import os
+import contextlib
 
 import fastapi
-import uvicorn
+import utils
 from fastapi.middleware import cors
+
+from llm_portal import bootstrap, executors, settings
+from llm_portal.adapters.broker import get_broker
+from llm_portal.adapters.provider_factory import get_provider_registry
 from llm_portal.entrypoints.rest import routers
+from llm_portal.entrypoints.rest.middleware import RequestContextMiddleware
+from llm_portal.service import jobs, lifecycle, outbox, persistence
+
+logger = utils.get_logger()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: fastapi.FastAPI):
+    # Mappers, tables and the message bus are set up here rather than when the routers are imported
+    await executors.run_in_executor(executors.db_executor(), bootstrap.bootstrap_async)
+    warmup_settings = settings.warmup_settings()
+    ready = await executors.run_in_executor(
+        executors.provider_executor(), get_provider_registry().warm_up, warmup_settings.models
+    )
+    if not ready and warmup_settings.fail_on_error:
+        raise RuntimeError(f"Provider warm-up failed: {get_provider_registry().failed_models()}")
+
+    job_settings = settings.job_settings()
+    workers = []
+    try:
+        workers = [
+            jobs.Worker(get_broker(), job_settings.worker_concurrency) for _ in range(job_settings.in_process_workers)
+        ]
+    except Exception as e:
+        logger.error(f"Job workers are not started, the message broker is unavailable: {e}")
+    for worker in workers:
+        worker.start()
+    try:
+        # Resolved here so an unavailable broker is reported once rather than on every relay flush
+        outbox.start_relay(get_broker())
+    except Exception as e:
+        logger.error(f"Domain events are kept in the outbox, the message broker is unavailable: {e}")
+    scheduler = lifecycle.start_scheduler()
+    yield
+    if scheduler is not None:
+        await scheduler.stop()
+    for worker in workers:
+        await worker.stop()
+    await persistence.flush()
+    await outbox.stop_relay()
+    executors.shutdown()
+
 
 def create_app():
     app = fastapi.FastAPI(
         root_path="/api/v1",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -18,14 +65,21 @@ def create_app():
         allow_headers=["*"],
         expose_headers=["Device-Id", "Session-Id", "Authorization"],
     )
+    app.add_middleware(RequestContextMiddleware)
     app.include_router(routers.embedding.router)
+    app.include_router(routers.search.router)
+    app.include_router(routers.export.router)
+    app.include_router(routers.metrics.router)
+    app.include_router(routers.health.router)
+    app.include_router(routers.jobs.router)
+    app.include_router(routers.analysis.router)
     return app
 
 
 def run():
-    app = create_app()
-    port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    from llm_portal.entrypoints.rest import server
+
+    server.serve(create_app())
 
 if __name__ == '__main__':
     run()
\ No newline at end of file
@@ -0,0 +1,15 @@
+from typing import Annotated
+
+import fastapi
+
+from llm_portal import bootstrap
+from llm_portal.service import messagebus
+
+
+async def get_bus() -> messagebus.AsyncMessageBus:
+    """The async message bus, bootstrapped by the app lifespan, or on first use when the lifespan did not run."""
+    return bootstrap.bootstrap_async()
+
+
+# Parameter type of the endpoints that dispatch commands on the bus
+Bus = Annotated[messagebus.AsyncMessageBus, fastapi.Depends(get_bus)]
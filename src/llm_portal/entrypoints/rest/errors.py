@@ -0,0 +1,25 @@
+import math
+
+import fastapi
+
+from llm_portal.adapters.llm_providers import RateLimitError, TransientProviderError
+
+
+def http_exception(error: Exception) -> fastapi.HTTPException:
+    """
+    HTTP error of a failed request.
+
+    Provider quota errors that outlived the retries and tenants over their cap are ``429``, other
+    transient provider errors and calls rejected for their deadline are ``503``, everything else is ``400``.
+    """
+    retry_after = getattr(error, "retry_after", None)
+    headers = {"Retry-After": str(math.ceil(retry_after))} if retry_after else None
+    if isinstance(error, RateLimitError):
+        return fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_429_TOO_MANY_REQUESTS, detail=str(error), headers=headers
+        )
+    if isinstance(error, TransientProviderError):
+        return fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error), headers=headers
+        )
+    return fastapi.HTTPException(status_code=fastapi.status.HTTP_400_BAD_REQUEST, detail=str(error))
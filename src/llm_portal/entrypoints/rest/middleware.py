@@ -0,0 +1,51 @@
+import contextlib
+import hashlib
+
+from fastapi import responses as fastapi_responses
+from starlette import datastructures, types
+
+from llm_portal.adapters.llm_providers import request_context
+
+PRIORITY_HEADER = "X-Priority"
+TENANT_HEADER = "X-Tenant-Id"
+API_KEY_HEADER = "X-API-Key"
+TIMEOUT_HEADER = "X-Request-Timeout-Ms"
+
+
+def tenant_of(headers: datastructures.Headers) -> str | None:
+    """Tenant of a request, its tenant header or a digest of its API key, so keys are never kept."""
+    tenant = headers.get(TENANT_HEADER)
+    if tenant:
+        return tenant
+    api_key = headers.get(API_KEY_HEADER)
+    return f"key-{hashlib.sha256(api_key.encode()).hexdigest()[:16]}" if api_key else None
+
+
+class RequestContextMiddleware:
+    """
+    Run every request in the scheduler lane, tenant and deadline of its headers.
+
+    ``X-Priority`` chooses the lane, ``X-Tenant-Id`` or else ``X-API-Key`` the tenant, and
+    ``X-Request-Timeout-Ms`` the deadline, counted from the arrival of the request. Requests with an
+    unknown lane or an invalid timeout are rejected with ``400``.
+    """
+
+    def __init__(self, app: types.ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: types.Scope, receive: types.Receive, send: types.Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = datastructures.Headers(scope=scope)
+        with contextlib.ExitStack() as stack:
+            try:
+                timeout_ms = float(headers[TIMEOUT_HEADER]) if TIMEOUT_HEADER in headers else None
+                if timeout_ms is not None and timeout_ms <= 0:
+                    raise ValueError(f"{TIMEOUT_HEADER} must be positive")
+                stack.enter_context(request_context(headers.get(PRIORITY_HEADER), tenant_of(headers), timeout_ms))
+            except ValueError as e:
+                await fastapi_responses.JSONResponse({"detail": str(e)}, status_code=400)(scope, receive, send)
+                return
+            await self.app(scope, receive, send)
@@ -0,0 +1,77 @@
+import base64
+from datetime import datetime
+from typing import Any, Literal, Sequence
+
+import fastapi
+import numpy as np
+from fastapi import responses as fastapi_responses
+
+from llm_portal.domains import models
+
+EncodingFormat = Literal["float", "base64"]
+BatchEncodingFormat = Literal["float", "base64", "binary"]
+
+BINARY_MEDIA_TYPE = "application/octet-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _isoformat(value: datetime | None) -> str:
+    return (value or datetime.now()).isoformat()
+
+
+def vector_to_base64(vector) -> str:
+    """Base64 of the little-endian float32 bytes of a vector."""
+    return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+
+
+def base64_result(result: models.EmbeddedResult) -> dict[str, Any]:
+    """
+    Plain dict of a result with a base64 vector.
+
+    Built by hand so the vector never goes through per-element pydantic validation.
+    """
+    return {
+        "id": result.id,
+        "text": result.text,
+        "provider": result.provider,
+        "model": result.model,
+        "dimensions": result.dimensions,
+        "vector": vector_to_base64(result.vector),
+        "created_time": _isoformat(getattr(result, "created_time", None)),
+        "updated_time": _isoformat(getattr(result, "updated_time", None)),
+    }
+
+
+def binary_response(vectors: Sequence, id_prefix: str) -> fastapi.Response:
+    """
+    Raw little-endian float32 matrix, one row per result in input order.
+
+    Result ids are ``<X-Embedding-Id-Prefix><row>``.
+    """
+    matrix = np.asarray(vectors, dtype="<f4")
+    count, dimensions = matrix.shape if matrix.ndim == 2 else (0, 0)
+    return fastapi.Response(
+        content=matrix.tobytes(),
+        media_type=BINARY_MEDIA_TYPE,
+        headers={
+            "X-Embedding-Count": str(count),
+            "X-Embedding-Dimensions": str(dimensions),
+            "X-Embedding-Dtype": "float32-le",
+            "X-Embedding-Id-Prefix": id_prefix,
+        },
+    )
+
+
+class DuplexStreamingResponse(fastapi_responses.StreamingResponse):
+    """
+    Streaming response sent while the request body is still being read.
+
+    ``StreamingResponse`` watches ``receive`` for a disconnect on servers older than ASGI 2.4, which
+    swallows the body messages the endpoint is still reading. This response leaves ``receive`` to the
+    request, a disconnect surfaces as a ``ClientDisconnect`` while reading the body or a failed send.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -1,2 +1,3 @@
-from llm_portal.entrypoints.rest.routers import embedding
+from llm_portal.entrypoints.rest.routers import analysis, embedding, export, health, jobs, metrics, search
 
+__all__ = ["analysis", "embedding", "export", "health", "jobs", "metrics", "search"]
@@ -0,0 +1,111 @@
+import json
+from typing import Iterator
+
+import fastapi
+import utils
+from fastapi import responses as fastapi_responses
+
+from llm_portal.adapters import queries
+from llm_portal.domains import commands, models
+from llm_portal.entrypoints import schemas
+from llm_portal.entrypoints.rest import depends, errors, responses
+from llm_portal.service import analysis, messagebus
+
+logger = utils.get_logger()
+router = fastapi.APIRouter()
+
+
+async def _get_analysis(job_id: str) -> models.AnalysisJob:
+    job = await queries.aget_analysis(job_id)
+    if job is None:
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_404_NOT_FOUND, detail=f"Analysis {job_id} not found"
+        )
+    return job
+
+
+async def _submit(
+        command: commands.SubmitClusteringCommand | commands.SubmitDuplicatesCommand,
+        bus: messagebus.AsyncMessageBus,
+) -> schemas.AnalysisResponse:
+    try:
+        job = await bus.handle(command)
+        return schemas.AnalysisResponse.model_validate(job)
+    except Exception as e:
+        logger.error(e)
+        raise errors.http_exception(e) from e
+
+
+@router.post("/analysis/clusters", status_code=fastapi.status.HTTP_202_ACCEPTED)
+async def submit_clustering(
+        command: commands.SubmitClusteringCommand,
+        bus: depends.Bus,
+) -> schemas.AnalysisResponse:
+    """
+    Endpoint to cluster the stored embeddings of a provider and model with mini-batch k-means, in the background.
+
+    Poll ``GET /analysis/{job_id}`` for the progress and the centroids, then stream the cluster of every
+    embedding from ``GET /analysis/{job_id}/assignments``.
+
+    Args:
+        command (commands.SubmitClusteringCommand): The embeddings and the number of clusters.
+
+    Returns:
+        schemas.AnalysisResponse: The queued analysis.
+    """
+    return await _submit(command, bus)
+
+
+@router.post("/analysis/duplicates", status_code=fastapi.status.HTTP_202_ACCEPTED)
+async def submit_duplicates(
+        command: commands.SubmitDuplicatesCommand,
+        bus: depends.Bus,
+) -> schemas.AnalysisResponse:
+    """
+    Endpoint to find the pairs of stored embeddings of a provider and model above a cosine similarity,
+    in the background.
+
+    Poll ``GET /analysis/{job_id}`` for the progress and the pairs, most similar first.
+
+    Args:
+        command (commands.SubmitDuplicatesCommand): The embeddings and the similarity threshold.
+
+    Returns:
+        schemas.AnalysisResponse: The queued analysis.
+    """
+    return await _submit(command, bus)
+
+
+@router.get("/analysis/{job_id}", status_code=fastapi.status.HTTP_200_OK)
+async def analysis_status(job_id: str) -> schemas.AnalysisResponse:
+    """
+    Endpoint to get the status and progress of an analysis, and its result once it succeeded.
+    """
+    return schemas.AnalysisResponse.model_validate(await _get_analysis(job_id))
+
+
+@router.get("/analysis/{job_id}/assignments", status_code=fastapi.status.HTTP_200_OK)
+async def analysis_assignments(job_id: str) -> fastapi_responses.StreamingResponse:
+    """
+    Endpoint to stream the cluster of every stored embedding of a clustering, in id order.
+
+    The response is NDJSON, one ``{"id", "cluster", "distance"}`` line per embedding, ``distance`` being
+    the squared distance of the unit-length embedding to its centroid. Embeddings stored after the
+    clustering are assigned to its centroids too.
+    """
+    job = await _get_analysis(job_id)
+    if job.kind != models.AnalysisKind.CLUSTERS or job.status != models.JobStatus.SUCCEEDED:
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_409_CONFLICT,
+            detail=f"Analysis {job_id} is not a succeeded clustering",
+        )
+
+    # A plain generator, starlette iterates it in its thread pool off the event loop
+    def lines() -> Iterator[str]:
+        for ids, labels, distances in analysis.assign(analysis.stored_blocks(job), job.result["centroids"]):
+            yield "".join(
+                json.dumps({"id": result_id, "cluster": label, "distance": distance}) + "\n"
+                for result_id, label, distance in zip(ids, labels.tolist(), distances.tolist(), strict=True)
+            )
+
+    return fastapi_responses.StreamingResponse(lines(), media_type=responses.NDJSON_MEDIA_TYPE)
@@ -1,26 +1,37 @@
+import json
+import uuid
+from typing import Literal
+
 import fastapi
 import utils
+from fastapi import responses as fastapi_responses
 
-from llm_portal.domains import commands, models
-from llm_portal import bootstrap
+from llm_portal import dependencies, metrics, settings
+from llm_portal.adapters.embedding_cache import get_embedding_cache
+from llm_portal.adapters.llm_providers import check_lane, request_context
+from llm_portal.adapters.provider_factory import llm_provider_factory
+from llm_portal.domains import commands
 from llm_portal.entrypoints import schemas
-from llm_portal.service import view
+from llm_portal.entrypoints.rest import depends, errors, middleware, responses
+from llm_portal.service import ingestion
 
-bus = bootstrap.bootstrap()
 logger = utils.get_logger()
 router = fastapi.APIRouter()
 
 
-
 @router.post("/embeddings", status_code=fastapi.status.HTTP_200_OK)
 async def embedding(
-        command: commands.InputTextCommand
+        command: commands.InputTextCommand,
+        bus: depends.Bus,
+        encoding_format: responses.EncodingFormat = "float",
 )-> schemas.EmbeddedResponse:
     """
     Endpoint to get the embedding of a given text.
 
     Args:
         command (commands.InputTextCommand): The command containing text to embed.
+        encoding_format (str): ``float`` for a JSON list of floats, ``base64`` for the base64 of the
+            little-endian float32 bytes.
 
     Returns:
     """
@@ -28,19 +39,146 @@ async def embedding(
     # In a real implementation, this would call the appropriate service
     # to get the embedding based on the provider and model.
     try:
-        bus.handle(command)
+        embedded_result = await bus.handle(command)
 
-        with view.fetch_model(
-            model_cls=models.EmbeddedResult,
-            id=command._id,
-        ) as embedded_result:
+        with metrics.track("serialization", command.provider_name, command.embedding_model):
+            if encoding_format == "base64":
+                return fastapi_responses.JSONResponse({"result": responses.base64_result(embedded_result)})
             return schemas.EmbeddedResponse(
-                result=embedded_result,
+                result=schemas.EmbeddedResult.model_validate(embedded_result),
+            )
+    except Exception as e:
+        logger.error(e)
+        raise errors.http_exception(e) from e
+
+
+@router.post("/embeddings/batch", status_code=fastapi.status.HTTP_200_OK)
+async def batch_embedding(
+        command: commands.BatchInputTextCommand,
+        bus: depends.Bus,
+        encoding_format: responses.BatchEncodingFormat = "float",
+)-> schemas.BatchEmbeddedResponse:
+    """
+    Endpoint to get the embeddings of many texts in one request.
+
+    Args:
+        command (commands.BatchInputTextCommand): The command containing the texts to embed.
+        encoding_format (str): ``float`` or ``base64`` like ``/embeddings``, or ``binary`` for an
+            ``application/octet-stream`` body holding the raw little-endian float32 matrix.
+
+    Returns:
+        schemas.BatchEmbeddedResponse: One result per input text, in input order.
+    """
+    try:
+        embedded_results = await bus.handle(command)
+
+        with metrics.track("serialization", command.provider_name, command.embedding_model):
+            if encoding_format == "binary":
+                return responses.binary_response(
+                    [embedded_result.vector for embedded_result in embedded_results],
+                    id_prefix=f"{command._id}-",
+                )
+            if encoding_format == "base64":
+                return fastapi_responses.JSONResponse(
+                    {"results": [responses.base64_result(embedded_result) for embedded_result in embedded_results]}
+                )
+            return schemas.BatchEmbeddedResponse(
+                results=[
+                    schemas.EmbeddedResult.model_validate(embedded_result) for embedded_result in embedded_results
+                ],
             )
     except Exception as e:
         logger.error(e)
-        raise fastapi.HTTPException(
-            status_code=fastapi.status.HTTP_400_BAD_REQUEST,
-            detail=str(e),
-        )
+        raise errors.http_exception(e) from e
+
+
+@router.post("/embeddings/stream", status_code=fastapi.status.HTTP_200_OK)
+async def stream_embedding(
+        request: fastapi.Request,
+        provider_name: str,
+        embedding_model: str,
+        input_format: Literal["ndjson", "csv"] | None = fastapi.Query(default=None, alias="format"),
+        encoding_format: responses.EncodingFormat = "float",
+        include_vectors: bool = False,
+        dimensions: int | None = fastapi.Query(default=None, ge=1),
+        pooling: Literal["mean", "weighted", "chunks"] | None = None,
+        priority: str | None = None,
+) -> fastapi_responses.StreamingResponse:
+    """
+    Endpoint to embed and store an upload of any size, streamed in and out.
 
+    The body is NDJSON, one ``{"id": ..., "text": ...}`` object per line, or CSV with a header naming a
+    ``text`` column and optionally an ``id`` column. Ids are unique within an upload and at most 40
+    characters long. The response is NDJSON: one line per stored text with its result ``id``, its input
+    ``index`` and its ``record_id``, error lines for invalid lines, duplicate ids or failed batches, then a
+    ``summary`` line. Results are streamed as batches complete, not in input order. The upload is read
+    only as fast as batches are embedded and persisted, clients must read the response while uploading.
+
+    Args:
+        provider_name (str): The name of the provider used for embedding
+        embedding_model (str): The model used for embedding the texts
+        input_format (str, optional): ``ndjson`` or ``csv``, inferred from the content type by default.
+        encoding_format (str): ``float`` or ``base64`` vectors, when ``include_vectors`` is set.
+        include_vectors (bool): Whether result lines include the vectors.
+        dimensions (int, optional): Reduced dimensions of the vectors, the model's full size by default.
+        pooling (str, optional): Vector of texts longer than the model accepts, ``embedding.chunking.pooling``
+            by default.
+        priority (str, optional): Scheduler lane of the upload, the ``X-Priority`` header or the bulk lane by default.
+    """
+    lane = priority or request.headers.get(middleware.PRIORITY_HEADER) or settings.scheduling_settings().bulk_lane
+    try:
+        check_lane(lane)
+        llm_provider = llm_provider_factory(provider_name)
+        if embedding_model not in llm_provider.available_models:
+            raise ValueError(
+                f"Model {embedding_model} is not supported. Supported models are: {llm_provider.available_models}"
+            )
+        llm_provider.reduced_dimensions(embedding_model, dimensions)
+    except Exception as e:
+        logger.error(e)
+        raise errors.http_exception(e) from e
+
+    if input_format is None:
+        input_format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+    def result_line(result, record: ingestion.IngestRecord) -> dict:
+        line = {"id": result.id, "index": record.index, "dimensions": result.dimensions}
+        if record.id is not None:
+            line["record_id"] = record.id
+        if include_vectors:
+            line["vector"] = (
+                responses.vector_to_base64(result.vector) if encoding_format == "base64" else result.vector.tolist()
+            )
+        return line
+
+    ingestion_settings = settings.ingestion_settings()
+    pipeline = ingestion.IngestionPipeline(
+        llm_provider,
+        embedding_model,
+        dependencies.DEPENDENCIES["uow"],
+        get_embedding_cache(),
+        # Short enough for the result ids of records with an id to fit the id column
+        id_prefix=uuid.uuid4().hex[:16],
+        result_line=result_line,
+        batch_size=ingestion_settings.batch_size,
+        queue_batches=ingestion_settings.queue_batches,
+        workers=ingestion_settings.workers,
+        dimensions=dimensions,
+        pooling=pooling,
+    )
+    records = ingestion.parse_records(request.stream(), input_format, ingestion_settings.max_line_bytes)
+
+    async def body():
+        with request_context(lane):
+            async for line in pipeline.run(records):
+                yield json.dumps(line) + "\n"
+
+    return responses.DuplexStreamingResponse(body(), media_type=responses.NDJSON_MEDIA_TYPE)
+
+
+@router.get("/embeddings/cache", status_code=fastapi.status.HTTP_200_OK)
+async def embedding_cache_stats() -> schemas.CacheStatsResponse:
+    """
+    Endpoint to get the hit/miss counters of the embedding cache.
+    """
+    return schemas.CacheStatsResponse(**get_embedding_cache().stats())
@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import Annotated
+
+import fastapi
+from fastapi import responses as fastapi_responses
+
+from llm_portal import executors
+from llm_portal.adapters import export, queries
+from llm_portal.entrypoints.rest import errors
+
+router = fastapi.APIRouter()
+
+
+@router.get("/embeddings/export", status_code=fastapi.status.HTTP_200_OK)
+async def export_embeddings(
+        provider_name: str,
+        embedding_model: str,
+        export_format: Annotated[export.ExportFormat, fastapi.Query(alias="format")] = "npy",
+        since: datetime | None = None,
+        until: datetime | None = None,
+        include_text: bool = False,
+        batch_size: int = fastapi.Query(default=10000, ge=1, le=100000),
+        dimensions: int | None = fastapi.Query(default=None, ge=1),
+) -> fastapi_responses.StreamingResponse:
+    """
+    Endpoint to stream the stored embeddings of a provider and model, in id order.
+
+    Args:
+        provider_name (str): The provider the embeddings were made with
+        embedding_model (str): The model the embeddings were made with
+        export_format (str): ``npy`` for the float32 matrix, ``ids`` for its ids sidecar, one per line and
+            in the same order, ``arrow`` for an Arrow IPC stream or ``parquet``.
+        since (datetime, optional): Only results created at or after this time.
+        until (datetime, optional): Only results created before this time.
+        include_text (bool): Whether Arrow and Parquet exports have a ``text`` column.
+        batch_size (int): Rows read from the database at a time.
+        dimensions (int, optional): Only results of this size, required for models stored at several sizes.
+    """
+    try:
+        export.check_format(export_format)
+    except RuntimeError as e:
+        raise fastapi.HTTPException(status_code=fastapi.status.HTTP_501_NOT_IMPLEMENTED, detail=str(e)) from e
+    if dimensions is None:
+        # Checked before the response starts, a model stored at several sizes needs ``dimensions``
+        try:
+            dimensions = await executors.run_in_executor(
+                executors.db_executor(), queries.stored_dimensions, provider_name, embedding_model, since, until
+            )
+        except ValueError as e:
+            raise errors.http_exception(e) from e
+    # A plain generator, starlette iterates it in its thread pool off the event loop
+    chunks = export.iter_export(
+        export_format, provider_name, embedding_model, since, until, include_text, batch_size, dimensions
+    )
+    filename = f"{provider_name}-{embedding_model}{export.EXTENSIONS[export_format]}"
+    return fastapi_responses.StreamingResponse(
+        chunks,
+        media_type=export.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
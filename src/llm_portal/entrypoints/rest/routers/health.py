@@ -0,0 +1,40 @@
+import fastapi
+from fastapi import responses as fastapi_responses
+
+from llm_portal import executors
+from llm_portal.adapters.provider_factory import get_provider_registry
+from llm_portal.entrypoints import schemas
+
+router = fastapi.APIRouter()
+
+
+@router.get("/health", status_code=fastapi.status.HTTP_200_OK)
+async def health() -> schemas.HealthResponse:
+    """
+    Liveness endpoint, the process is up and serving requests.
+    """
+    return schemas.HealthResponse()
+
+
+@router.get(
+    "/health/ready",
+    status_code=fastapi.status.HTTP_200_OK,
+    responses={fastapi.status.HTTP_503_SERVICE_UNAVAILABLE: {"model": schemas.ReadinessResponse}},
+)
+async def readiness() -> schemas.ReadinessResponse:
+    """
+    Readiness endpoint, 503 until every configured model is loaded.
+
+    Models that failed to load at startup are retried on each probe.
+    """
+    registry = get_provider_registry()
+    failed = registry.failed_models()
+    if failed:
+        await executors.run_in_executor(executors.provider_executor(), registry.warm_up, failed)
+
+    response = schemas.ReadinessResponse(**registry.status())
+    if not response.ready:
+        return fastapi_responses.JSONResponse(
+            response.model_dump(), status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return response
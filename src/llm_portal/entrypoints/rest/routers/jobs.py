@@ -0,0 +1,101 @@
+import asyncio
+
+import fastapi
+import utils
+from fastapi import responses as fastapi_responses
+
+from llm_portal import settings
+from llm_portal.adapters import queries
+from llm_portal.domains import commands, models
+from llm_portal.entrypoints import schemas
+from llm_portal.entrypoints.rest import depends, errors
+
+logger = utils.get_logger()
+router = fastapi.APIRouter()
+
+MAX_RESULTS_PAGE = 1000
+
+
+async def _get_job(job_id: str) -> models.EmbeddingJob:
+    job = await queries.aget_job(job_id)
+    if job is None:
+        raise fastapi.HTTPException(status_code=fastapi.status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.post("/jobs", status_code=fastapi.status.HTTP_202_ACCEPTED)
+async def submit_job(
+        command: commands.SubmitEmbeddingJobCommand,
+        bus: depends.Bus,
+) -> schemas.JobResponse:
+    """
+    Endpoint to embed texts in the background.
+
+    Returns as soon as the texts are queued on the message broker, poll ``GET /jobs/{job_id}`` or
+    subscribe to ``GET /jobs/{job_id}/events`` for the progress.
+
+    Args:
+        command (commands.SubmitEmbeddingJobCommand): The texts, provider and model of the job.
+
+    Returns:
+        schemas.JobResponse: The queued job.
+    """
+    try:
+        job = await bus.handle(command)
+        return schemas.JobResponse.model_validate(job)
+    except Exception as e:
+        logger.error(e)
+        raise errors.http_exception(e) from e
+
+
+@router.get("/jobs/{job_id}", status_code=fastapi.status.HTTP_200_OK)
+async def job_status(job_id: str) -> schemas.JobResponse:
+    """
+    Endpoint to get the status and progress of a job.
+    """
+    return schemas.JobResponse.model_validate(await _get_job(job_id))
+
+
+@router.get("/jobs/{job_id}/results", status_code=fastapi.status.HTTP_200_OK)
+async def job_results(
+        job_id: str,
+        offset: int = fastapi.Query(default=0, ge=0),
+        limit: int = fastapi.Query(default=100, ge=1, le=MAX_RESULTS_PAGE),
+) -> schemas.JobResultsResponse:
+    """
+    Endpoint to get a page of the stored results of a job, in input order.
+
+    Texts that are not embedded yet, or failed, are missing from the page.
+    """
+    job = await _get_job(job_id)
+    results = await queries.aget_results(job.result_ids(offset, limit))
+    return schemas.JobResultsResponse(
+        results=[schemas.EmbeddedResult.model_validate(result) for result in results],
+        offset=offset,
+        total=job.total,
+    )
+
+
+@router.get("/jobs/{job_id}/events", status_code=fastapi.status.HTTP_200_OK)
+async def job_events(job_id: str) -> fastapi_responses.StreamingResponse:
+    """
+    Endpoint to subscribe to the progress of a job, as server-sent events.
+
+    An event is sent on every change of the job, the stream ends once the job is done.
+    """
+    job = await _get_job(job_id)
+    poll_interval = settings.job_settings().poll_interval_ms / 1000
+
+    async def events():
+        current, last = job, None
+        while True:
+            data = schemas.JobResponse.model_validate(current).model_dump_json()
+            if data != last:
+                yield f"event: {current.status.value}\ndata: {data}\n\n"
+                last = data
+            if current.done:
+                return
+            await asyncio.sleep(poll_interval)
+            current = await queries.aget_job(job_id)
+
+    return fastapi_responses.StreamingResponse(events(), media_type="text/event-stream")
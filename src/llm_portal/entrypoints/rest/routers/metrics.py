@@ -0,0 +1,16 @@
+import fastapi
+from fastapi import responses as fastapi_responses
+
+from llm_portal import metrics as metrics_registry
+
+router = fastapi.APIRouter()
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", status_code=fastapi.status.HTTP_200_OK)
+async def metrics() -> fastapi_responses.PlainTextResponse:
+    """
+    Endpoint to scrape the latency and throughput metrics in the Prometheus text format.
+    """
+    return fastapi_responses.PlainTextResponse(metrics_registry.REGISTRY.render(), media_type=PROMETHEUS_MEDIA_TYPE)
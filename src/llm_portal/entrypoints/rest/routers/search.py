@@ -0,0 +1,51 @@
+import fastapi
+import utils
+
+from llm_portal import settings
+from llm_portal.entrypoints import schemas
+from llm_portal.entrypoints.rest import errors
+from llm_portal.service import search as search_service
+
+logger = utils.get_logger()
+router = fastapi.APIRouter()
+
+
+@router.post("/search", status_code=fastapi.status.HTTP_200_OK)
+async def search(
+        request: schemas.SearchRequest
+) -> schemas.SearchResponse:
+    """
+    Endpoint to find the stored embeddings most similar to a text or a vector.
+
+    Args:
+        request (schemas.SearchRequest): The query, the (provider, model) to search and the number of hits.
+
+    Returns:
+        schemas.SearchResponse: The hits, most similar first.
+    """
+    max_top_k = settings.search_settings().max_top_k
+    if request.top_k > max_top_k:
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_400_BAD_REQUEST,
+            detail=f"top_k must be at most {max_top_k}",
+        )
+
+    search_filter = request.filter or schemas.SearchFilter()
+    try:
+        hits = await search_service.search(
+            provider_name=request.provider_name,
+            model=request.embedding_model,
+            top_k=request.top_k,
+            text=request.text,
+            vector=request.vector,
+            approximate=request.mode == "approximate",
+            ids=search_filter.ids,
+            text_contains=search_filter.text_contains,
+            dimensions=request.dimensions,
+        )
+        return schemas.SearchResponse(
+            results=[schemas.SearchHit.model_validate(hit) for hit in hits],
+        )
+    except Exception as e:
+        logger.error(e)
+        raise errors.http_exception(e) from e
@@ -0,0 +1,151 @@
+"""
+Multi-process REST server, the app is created once and forked into every worker.
+
+    WEB_CONCURRENCY=8 python -m llm_portal.entrypoints.rest.server
+"""
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import fastapi
+import utils
+
+from llm_portal import settings
+from llm_portal.adapters import orm
+
+logger = utils.get_logger()
+
+# A worker dying this soon after its start is not restarted, it would only crash again
+MIN_WORKER_UPTIME_S = 5.0
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """Listening socket shared by the workers, the kernel spreads the connections between them."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve_worker(app: fastapi.FastAPI, sock: socket.socket, server_settings: settings.ServerSettings):
+    import uvicorn
+
+    # Forked with the supervisor's handlers, uvicorn re-raises the signals it got once it has shut down
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_DFL)
+
+    config = uvicorn.Config(
+        app,
+        backlog=server_settings.backlog,
+        timeout_graceful_shutdown=server_settings.graceful_shutdown_s,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    Runs ``workers`` server processes on one socket and restarts the ones that die.
+
+    Workers are forked from a process where the app is already imported and created and the tables
+    exist, so they start without importing anything. Each worker bootstraps the app in its lifespan,
+    and with it opens its own database connections, message broker, provider handles and executors,
+    none are opened before the fork. SIGINT and SIGTERM stop the workers with SIGTERM, they finish the
+    requests in flight.
+
+    Args:
+        app (fastapi.FastAPI): The app served by every worker
+        workers (int): Number of worker processes
+        server_settings (settings.ServerSettings): Host, port and socket settings
+    """
+
+    def __init__(self, app: fastapi.FastAPI, workers: int, server_settings: settings.ServerSettings):
+        self.app = app
+        self.workers = workers
+        self.server_settings = server_settings
+        self._context = multiprocessing.get_context("fork")
+        self._processes: dict[int, tuple[multiprocessing.Process, float]] = {}
+        self._stopping = False
+
+    def run(self, port: int):
+        # Tables are created here once, rather than by every worker racing on an empty database. The
+        # dependencies and the message bus are left to the workers, and the pool is emptied so the workers
+        # do not share its connections.
+        orm.start_mapper()
+        orm.get_engine().dispose()
+
+        sock = bind_socket(self.server_settings.host, port, self.server_settings.backlog)
+        logger.info(f"Serving on {self.server_settings.host}:{port} with {self.workers} workers")
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self._stop)
+        try:
+            for _ in range(self.workers):
+                self._start(sock)
+            while self._processes:
+                self._reap(sock)
+                time.sleep(0.5)
+        finally:
+            sock.close()
+
+    def _start(self, sock: socket.socket):
+        process = self._context.Process(target=_serve_worker, args=(self.app, sock, self.server_settings))
+        process.start()
+        self._processes[process.pid] = (process, time.monotonic())
+
+    def _reap(self, sock: socket.socket):
+        for pid, (process, started) in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            del self._processes[pid]
+            if self._stopping:
+                continue
+            uptime = time.monotonic() - started
+            if uptime < MIN_WORKER_UPTIME_S:
+                logger.error(f"Worker {pid} exited with {process.exitcode} after {uptime:.1f}s, not restarted")
+                continue
+            logger.warning(f"Worker {pid} exited with {process.exitcode}, restarting it")
+            self._start(sock)
+
+    def _stop(self, signum, _):
+        # SIGTERM, a terminal's SIGINT already reached the workers and a second SIGINT would abort them
+        self._stopping = True
+        for process, _ in self._processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+
+def serve(app: fastapi.FastAPI, workers: int | None = None, port: int | None = None):
+    """
+    Serve the app, in this process with one worker, or with a ``Supervisor`` of forked workers.
+
+    Workers and port come from ``WEB_CONCURRENCY`` and ``PORT``, then from ``embedding.server``.
+    """
+    server_settings = settings.server_settings()
+    workers = workers or int(os.environ.get("WEB_CONCURRENCY", server_settings.workers))
+    port = port or int(os.environ.get("PORT", server_settings.port))
+    if workers == 1 or "fork" not in multiprocessing.get_all_start_methods():
+        import uvicorn
+
+        uvicorn.run(
+            app,
+            host=server_settings.host,
+            port=port,
+            backlog=server_settings.backlog,
+            timeout_graceful_shutdown=server_settings.graceful_shutdown_s,
+        )
+        return
+    Supervisor(app, workers, server_settings).run(port)
+
+
+def main():
+    from llm_portal.entrypoints.rest.app import create_app
+
+    serve(create_app())
+
+
+if __name__ == "__main__":
+    main()
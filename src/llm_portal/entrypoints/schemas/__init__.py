@@ -1 +1,5 @@
-from .embedded import *
\ No newline at end of file
+from .analysis import *  # noqa: F403
+from .embedded import *  # noqa: F403
+from .health import *  # noqa: F403
+from .job import *  # noqa: F403
+from .search import *  # noqa: F403
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Any, Literal
+
+import pydantic
+
+
+class AnalysisResponse(pydantic.BaseModel):
+    """
+    Status, progress and, once succeeded, result of a clustering or near-duplicate analysis
+    """
+
+    model_config = pydantic.ConfigDict(from_attributes=True)
+
+    id: str
+    kind: Literal["clusters", "duplicates"]
+    provider: str
+    model: str
+    dimensions: int
+    parameters: dict[str, Any]
+    status: Literal["queued", "running", "succeeded", "failed"]
+    total: int
+    processed: int
+    progress: float
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    created_time: datetime | None = None
+    updated_time: datetime | None = None
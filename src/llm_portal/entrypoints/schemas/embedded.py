@@ -31,3 +31,22 @@ class EmbeddedResponse(pydantic.BaseModel):
     model_config = pydantic.ConfigDict(from_attributes=True)
 
     result: EmbeddedResult
+
+class BatchEmbeddedResponse(pydantic.BaseModel):
+    model_config = pydantic.ConfigDict(from_attributes=True)
+
+    results: list[EmbeddedResult]
+
+class CacheStatsResponse(pydantic.BaseModel):
+    """
+    Embedding cache counters
+    """
+
+    size: int
+    max_entries: int
+    memory_hits: int
+    store_hits: int
+    misses: int
+    shared: int
+    evictions: int
+    hit_ratio: float
@@ -0,0 +1,18 @@
+import pydantic
+
+
+class HealthResponse(pydantic.BaseModel):
+    """
+    Liveness of the service
+    """
+
+    status: str = "ok"
+
+
+class ReadinessResponse(pydantic.BaseModel):
+    """
+    Readiness of the service, with the warm-up status of each configured model
+    """
+
+    ready: bool
+    providers: dict[str, dict[str, str]]
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Literal
+
+import pydantic
+
+from .embedded import EmbeddedResult
+
+
+class JobResponse(pydantic.BaseModel):
+    """
+    Status of a background embedding job
+    """
+
+    model_config = pydantic.ConfigDict(from_attributes=True)
+
+    id: str
+    provider: str
+    model: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    total: int
+    completed: int
+    failed: int
+    error: str | None = None
+    created_time: datetime | None = None
+    updated_time: datetime | None = None
+
+
+class JobResultsResponse(pydantic.BaseModel):
+    """
+    A page of the stored results of a job, in input order
+    """
+
+    results: list[EmbeddedResult]
+    offset: int
+    total: int
@@ -0,0 +1,45 @@
+from typing import Literal
+
+import pydantic
+
+
+class SearchFilter(pydantic.BaseModel):
+    """
+    Restricts a search to part of the stored results
+    """
+
+    ids: list[str] | None = None
+    text_contains: str | None = None
+
+
+class SearchRequest(pydantic.BaseModel):
+    """
+    Similarity search request, the query is either a text to embed or a vector
+    """
+
+    text: str | None = None
+    vector: list[float] | None = None
+    provider_name: str
+    embedding_model: str
+    top_k: int = pydantic.Field(default=10, ge=1)
+    dimensions: int | None = pydantic.Field(default=None, ge=1)
+    mode: Literal["exact", "approximate"] = "exact"
+    filter: SearchFilter | None = None
+
+    @pydantic.model_validator(mode="after")
+    def check_query(self) -> "SearchRequest":
+        if (self.text is None) == (self.vector is None):
+            raise ValueError("Exactly one of text or vector must be given")
+        return self
+
+
+class SearchHit(pydantic.BaseModel):
+    model_config = pydantic.ConfigDict(from_attributes=True)
+
+    id: str
+    text: str
+    score: float
+
+
+class SearchResponse(pydantic.BaseModel):
+    results: list[SearchHit]
@@ -0,0 +1,77 @@
+"""
+Job worker processes, scaled independently of the API.
+
+    python -m llm_portal.entrypoints.worker --processes 4 --concurrency 8
+"""
+import argparse
+import asyncio
+import multiprocessing
+import signal
+
+import utils
+
+from llm_portal import bootstrap, executors, settings
+from llm_portal.adapters.broker import get_broker
+from llm_portal.adapters.provider_factory import get_provider_registry
+from llm_portal.service import jobs, outbox
+
+logger = utils.get_logger()
+
+
+async def serve(concurrency: int):
+    """Run one worker until SIGINT or SIGTERM, the chunks being processed are finished first."""
+    bootstrap.bootstrap()
+    await executors.run_in_executor(
+        executors.provider_executor(), get_provider_registry().warm_up, settings.warmup_settings().models
+    )
+
+    broker = get_broker()
+    worker = jobs.Worker(broker, concurrency)
+    # Events of the results stored here are published by this process, like those of the API
+    outbox.start_relay(broker)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, lambda: asyncio.ensure_future(worker.stop()))
+    try:
+        await worker.run()
+    finally:
+        await outbox.stop_relay()
+        await broker.close()
+        executors.shutdown()
+
+
+def run(concurrency: int):
+    asyncio.run(serve(concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process embedding jobs from the message broker")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Chunks processed concurrently per process, embedding.jobs.worker_concurrency by default",
+    )
+    args = parser.parse_args()
+    concurrency = args.concurrency or settings.job_settings().worker_concurrency
+
+    if args.processes == 1:
+        run(concurrency)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run, args=(concurrency,)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # The children got the signal too and finish their chunks
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from llm_portal import settings
+
+T = TypeVar("T")
+
+_provider_executor: ThreadPoolExecutor | None = None
+_db_executor: ThreadPoolExecutor | None = None
+_analysis_executor: ThreadPoolExecutor | None = None
+
+
+def provider_executor() -> ThreadPoolExecutor:
+    """Bounded pool that runs blocking provider calls off the event loop."""
+    global _provider_executor
+    if _provider_executor is None:
+        _provider_executor = ThreadPoolExecutor(
+            max_workers=settings.concurrency_settings().provider_threads,
+            thread_name_prefix="llm-provider",
+        )
+    return _provider_executor
+
+
+def db_executor() -> ThreadPoolExecutor:
+    """Pool that runs blocking database calls off the event loop, one thread per pooled connection."""
+    global _db_executor
+    if _db_executor is None:
+        from llm_portal.adapters import orm
+
+        _db_executor = ThreadPoolExecutor(max_workers=orm.database_threads(), thread_name_prefix="llm-db")
+    return _db_executor
+
+
+def analysis_executor() -> ThreadPoolExecutor:
+    """Pool that runs clustering and near-duplicate analyses, apart from the request paths they would block."""
+    global _analysis_executor
+    if _analysis_executor is None:
+        _analysis_executor = ThreadPoolExecutor(
+            max_workers=settings.analysis_settings().threads,
+            thread_name_prefix="llm-analysis",
+        )
+    return _analysis_executor
+
+
+async def run_in_executor(executor: ThreadPoolExecutor, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown():
+    global _provider_executor, _db_executor, _analysis_executor
+    for executor in (_provider_executor, _db_executor, _analysis_executor):
+        if executor is not None:
+            executor.shutdown(wait=True)
+    _provider_executor = _db_executor = _analysis_executor = None
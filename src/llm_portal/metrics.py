@@ -0,0 +1,247 @@
+import bisect
+import contextlib
+import threading
+import time
+from typing import Callable, Iterator
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "REGISTRY",
+    "track",
+]
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            counts[position] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        samples = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts, strict=True):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+            samples.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            samples.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return samples
+
+
+class Registry:
+    """
+    Metrics of the process, rendered in the Prometheus text exposition format.
+
+    Collectors are called before every render, to refresh gauges that mirror state kept elsewhere.
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.register(
+    Histogram(
+        "llm_portal_stage_duration_seconds",
+        "Latency of each request stage",
+        ("stage", "provider", "model"),
+    )
+)
+PROVIDER_CALLS = REGISTRY.register(
+    Counter("llm_portal_provider_calls_total", "Embedding calls sent to providers", ("provider", "model"))
+)
+TEXTS_EMBEDDED = REGISTRY.register(
+    Counter("llm_portal_texts_embedded_total", "Texts embedded by providers", ("provider", "model"))
+)
+BATCH_SIZE = REGISTRY.register(
+    Histogram(
+        "llm_portal_provider_batch_size",
+        "Number of texts per provider call",
+        ("provider", "model"),
+        buckets=SIZE_BUCKETS,
+    )
+)
+ERRORS = REGISTRY.register(
+    Counter("llm_portal_errors_total", "Errors by stage and exception type", ("stage", "provider", "model", "type"))
+)
+RETRIES = REGISTRY.register(
+    Counter("llm_portal_provider_retries_total", "Provider calls retried, by reason", ("provider", "model", "reason"))
+)
+HEDGES = REGISTRY.register(
+    Counter("llm_portal_provider_hedges_total", "Hedged duplicate provider calls sent", ("provider", "model"))
+)
+BACKEND_LATENCY = REGISTRY.register(
+    Gauge(
+        "llm_portal_backend_latency_ewma_seconds",
+        "Moving average latency of each routed backend",
+        ("route", "backend", "model"),
+    )
+)
+BACKEND_EJECTIONS = REGISTRY.register(
+    Counter("llm_portal_backend_ejections_total", "Routed backends ejected as outliers", ("route", "backend", "model"))
+)
+BACKEND_FAILOVERS = REGISTRY.register(
+    Counter(
+        "llm_portal_backend_failovers_total", "Calls failed over to another backend", ("route", "backend", "model")
+    )
+)
+IN_FLIGHT = REGISTRY.register(
+    Gauge("llm_portal_requests_in_flight", "Commands being handled by the message bus", ("command",))
+)
+SCHEDULER_QUEUED = REGISTRY.register(
+    Gauge("llm_portal_scheduler_queued", "Provider calls waiting in each lane", ("provider", "model", "lane"))
+)
+SCHEDULER_WAIT = REGISTRY.register(
+    Histogram(
+        "llm_portal_scheduler_wait_seconds",
+        "Time provider calls waited in each lane before being sent",
+        ("provider", "model", "lane"),
+    )
+)
+SCHEDULER_REJECTIONS = REGISTRY.register(
+    Counter(
+        "llm_portal_scheduler_rejections_total",
+        "Provider calls rejected by the scheduler, by reason",
+        ("provider", "model", "lane", "reason"),
+    )
+)
+
+EVENTS_PUBLISHED = REGISTRY.register(
+    Counter("llm_portal_events_published_total", "Domain events published from the outbox", ("name",))
+)
+EVENT_BATCH_SIZE = REGISTRY.register(
+    Histogram(
+        "llm_portal_event_batch_size",
+        "Number of events per published broker message",
+        (),
+        buckets=SIZE_BUCKETS,
+    )
+)
+RESULTS_REMOVED = REGISTRY.register(
+    Counter("llm_portal_results_removed_total", "Stored results removed by the lifecycle passes", ("reason",))
+)
+
+
+@contextlib.contextmanager
+def track(stage: str, provider: str = "", model: str = "") -> Iterator[None]:
+    """Time a stage into ``llm_portal_stage_duration_seconds`` and count the errors it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        ERRORS.inc(stage=stage, provider=provider, model=model, type=type(e).__name__)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage, provider=provider, model=model)
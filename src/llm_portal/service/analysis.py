@@ -0,0 +1,368 @@
+import heapq
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Iterator, NamedTuple
+
+import numpy as np
+import utils
+
+from llm_portal import executors, metrics, settings
+from llm_portal.adapters import queries
+from llm_portal.adapters.broker import Broker
+from llm_portal.adapters.provider_factory import llm_provider_factory
+from llm_portal.domains import commands, models, vectors
+
+logger = utils.get_logger()
+
+ANALYSIS_MESSAGE = "analysis"
+
+# Blocks of (ids, vectors) in id order, of the ids greater than the argument when one is given
+VectorBlocks = Callable[[str | None], Iterator[tuple[list[str], np.ndarray]]]
+Progress = Callable[[int], None]
+
+
+class AnalysisInterrupted(Exception):
+    """The worker running an analysis is stopping, the analysis is run again by the next delivery."""
+
+
+class Clusters(NamedTuple):
+    centroids: np.ndarray
+    sizes: np.ndarray
+    inertia: float
+    iterations: int
+
+
+class DuplicatePair(NamedTuple):
+    id: str
+    other_id: str
+    similarity: float
+
+
+class Duplicates(NamedTuple):
+    pairs: list[DuplicatePair]
+    found: int
+
+
+def _sample(
+        blocks: VectorBlocks, size: int, rng: np.random.Generator, progress: Progress
+) -> tuple[np.ndarray, int]:
+    """Uniform sample of at most ``size`` unit vectors, reservoir sampled in one pass, and the number of vectors."""
+    sample, seen = None, 0
+    for _, block in blocks(None):
+        block = vectors.normalize(block)
+        if sample is None:
+            sample = np.empty((size, block.shape[1]), dtype=np.float32)
+        fill = min(max(size - seen, 0), len(block))
+        sample[seen:seen + fill] = block[:fill]
+        if fill < len(block):
+            # Vector i of the stream replaces a random sampled vector with probability size / (i + 1)
+            slots = rng.integers(0, np.arange(seen + fill, seen + len(block)) + 1)
+            kept = slots < size
+            sample[slots[kept]] = block[fill:][kept]
+        seen += len(block)
+        progress(seen)
+    if sample is None:
+        return np.empty((0, 0), dtype=np.float32), 0
+    return sample[:seen], seen
+
+
+def _nearest(block: np.ndarray, centroids: np.ndarray, centroid_norms: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Index of the nearest centroid of each unit vector of the block and its squared distance."""
+    distances = centroid_norms - 2 * (block @ centroids.T)
+    labels = np.argmin(distances, axis=1)
+    return labels, np.maximum(distances[np.arange(len(block)), labels] + 1, 0)
+
+
+def _seed_centroids(sample: np.ndarray, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding on the sample, each centroid is drawn with a probability of its squared distance."""
+    centroids = np.empty((clusters, sample.shape[1]), dtype=np.float32)
+    centroids[0] = sample[rng.integers(len(sample))]
+    distances = np.maximum(2 - 2 * (sample @ centroids[0]), 0)
+    for index in range(1, clusters):
+        total = distances.sum()
+        chosen = rng.choice(len(sample), p=distances / total) if total > 0 else rng.integers(len(sample))
+        centroids[index] = sample[chosen]
+        distances = np.minimum(distances, np.maximum(2 - 2 * (sample @ centroids[index]), 0))
+    return centroids
+
+
+def kmeans(
+        blocks: VectorBlocks,
+        clusters: int,
+        max_iterations: int = 10,
+        tolerance: float = 1e-4,
+        seed: int = 0,
+        sample_size: int | None = None,
+        progress: Progress = lambda processed: None,
+) -> Clusters:
+    """
+    Mini-batch k-means of the vectors of the blocks, each block is a mini-batch.
+
+    Vectors are normalized to unit length, so distances follow the cosine similarity. Centroids are seeded
+    with k-means++ on a uniform sample, then every block moves the centroids of its vectors towards them
+    with a per-centroid learning rate of one over the vectors it has been given. Passes stop once the
+    relative change of the inertia between two passes falls under ``tolerance``. Memory is bounded by
+    a block times the number of clusters, whatever the number of vectors.
+
+    Args:
+        blocks (VectorBlocks): The vectors, read once per pass
+        clusters (int): Number of clusters
+        max_iterations (int): Largest number of passes
+        tolerance (float): Relative change of the inertia under which the clustering stops
+        seed (int): Seed of the sample and of the initial centroids
+        sample_size (int, optional): Vectors the centroids are seeded from, 16 per cluster by default
+        progress (Progress): Called with the vectors processed so far, over the sampling pass and every pass
+
+    Raises:
+        ValueError: When there are fewer vectors than clusters
+    """
+    rng = np.random.default_rng(seed)
+    sample, count = _sample(blocks, sample_size or 16 * clusters, rng, progress)
+    if count < clusters:
+        raise ValueError(f"{clusters} clusters need at least as many vectors, there are {count}")
+    centroids = _seed_centroids(sample, clusters, rng)
+    del sample
+
+    # Vectors given to each centroid over every pass, the inverse of its learning rate
+    seen = np.zeros(clusters, dtype=np.int64)
+    processed, previous = count, None
+    # The number of passes is returned, it is read after the loop
+    for iterations in range(1, max_iterations + 1):  # noqa: B007
+        inertia, sizes = 0.0, np.zeros(clusters, dtype=np.int64)
+        for _, block in blocks(None):
+            block = vectors.normalize(block)
+            labels, distances = _nearest(block, centroids, np.einsum("ij,ij->i", centroids, centroids))
+            inertia += float(distances.sum())
+            counts = np.bincount(labels, minlength=clusters)
+            moved = counts > 0
+            # Sum of the vectors of each centroid, from the block sorted by centroid
+            starts = np.cumsum(counts) - counts
+            sums = np.add.reduceat(block[np.argsort(labels, kind="stable")], starts[moved], axis=0)
+            sizes += counts
+            seen += counts
+            centroids[moved] += (sums - counts[moved, None] * centroids[moved]) / seen[moved, None]
+            processed += len(block)
+            progress(processed)
+        if previous is not None and abs(previous - inertia) <= tolerance * max(previous, 1e-12):
+            break
+        previous = inertia
+    return Clusters(centroids, sizes, inertia, iterations)
+
+
+def assign(blocks: VectorBlocks, centroids: np.ndarray) -> Iterator[tuple[list[str], np.ndarray, np.ndarray]]:
+    """Stream the nearest centroid of every vector, and its squared distance, one block at a time."""
+    centroids = np.asarray(centroids, dtype=np.float32)
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    for ids, block in blocks(None):
+        labels, distances = _nearest(vectors.normalize(block), centroids, centroid_norms)
+        yield ids, labels, distances
+
+
+def _keep_pairs(
+        kept: list[tuple[float, str, str]],
+        similarities: np.ndarray,
+        rows: np.ndarray,
+        columns: np.ndarray,
+        ids: list[str],
+        other_ids: list[str],
+        max_pairs: int,
+):
+    """Add the most similar pairs to the min-heap ``kept`` of at most ``max_pairs`` pairs."""
+    if len(similarities) > max_pairs:
+        top = np.argpartition(similarities, -max_pairs)[-max_pairs:]
+        similarities, rows, columns = similarities[top], rows[top], columns[top]
+    if len(kept) == max_pairs:
+        better = similarities > kept[0][0]
+        similarities, rows, columns = similarities[better], rows[better], columns[better]
+    for similarity, row, column in zip(similarities.tolist(), rows.tolist(), columns.tolist(), strict=True):
+        pair = (similarity, ids[row], other_ids[column])
+        if len(kept) < max_pairs:
+            heapq.heappush(kept, pair)
+        elif similarity > kept[0][0]:
+            heapq.heapreplace(kept, pair)
+
+
+def near_duplicates(
+        blocks: VectorBlocks,
+        threshold: float,
+        max_pairs: int,
+        progress: Progress = lambda processed: None,
+) -> Duplicates:
+    """
+    Pairs of vectors with a cosine similarity of at least ``threshold``, the ``max_pairs`` most similar first.
+
+    Every block is multiplied with itself and with every block after it, read again from the blocks, so
+    every pair is compared once and memory is bounded by two blocks and their product. Pairs are in id
+    order, ``id`` before ``other_id``.
+
+    Args:
+        blocks (VectorBlocks): The vectors, read once per block
+        threshold (float): Smallest cosine similarity of a pair
+        max_pairs (int): Most pairs kept
+        progress (Progress): Called with the pairs compared so far
+    """
+    kept: list[tuple[float, str, str]] = []
+    found = compared = 0
+    for ids, block in blocks(None):
+        block = vectors.normalize(block)
+        products = block @ block.T
+        rows, columns = np.nonzero(np.triu(products >= threshold, k=1))
+        found += len(rows)
+        _keep_pairs(kept, products[rows, columns], rows, columns, ids, ids, max_pairs)
+        compared += len(ids) * (len(ids) - 1) // 2
+        progress(compared)
+
+        for other_ids, other in blocks(ids[-1]):
+            products = block @ vectors.normalize(other).T
+            rows, columns = np.nonzero(products >= threshold)
+            found += len(rows)
+            _keep_pairs(kept, products[rows, columns], rows, columns, ids, other_ids, max_pairs)
+            compared += len(ids) * len(other_ids)
+            progress(compared)
+    pairs = [
+        DuplicatePair(id, other_id, min(similarity, 1.0)) for similarity, id, other_id in sorted(kept, reverse=True)
+    ]
+    return Duplicates(pairs, found)
+
+
+def stored_blocks(job: models.AnalysisJob, block_size: int | None = None) -> VectorBlocks:
+    """The stored vectors of the (provider, model, dimensions) of an analysis."""
+    block_size = block_size or settings.analysis_settings().block_size
+
+    def blocks(after: str | None) -> Iterator[tuple[list[str], np.ndarray]]:
+        for ids, _, matrix in queries.iter_vectors(job.provider, job.model, block_size, job.dimensions, after):
+            yield ids, matrix
+
+    return blocks
+
+
+async def submit(
+        command: commands.SubmitClusteringCommand | commands.SubmitDuplicatesCommand,
+        broker: Broker,
+) -> models.AnalysisJob:
+    """
+    Record an analysis and publish it to the job workers, returning before it runs.
+
+    The provider, model, dimensions and parameters are validated up front so a bad analysis fails on submit.
+    """
+    analysis_settings = settings.analysis_settings()
+    llm_provider = llm_provider_factory(command.provider_name)
+    if command.embedding_model not in llm_provider.available_models:
+        raise ValueError(
+            f"Model {command.embedding_model} is not supported. "
+            f"Supported models are: {llm_provider.available_models}"
+        )
+    dimensions = (
+        llm_provider.reduced_dimensions(command.embedding_model, command.dimensions)
+        or llm_provider.model_dimensions(command.embedding_model)
+    )
+
+    if isinstance(command, commands.SubmitClusteringCommand):
+        if command.clusters > analysis_settings.max_clusters:
+            raise ValueError(
+                f"At most {analysis_settings.max_clusters} clusters are supported, got {command.clusters}"
+            )
+        if command.max_iterations > analysis_settings.max_iterations:
+            raise ValueError(
+                f"At most {analysis_settings.max_iterations} iterations are supported, got {command.max_iterations}"
+            )
+        kind = models.AnalysisKind.CLUSTERS
+        parameters = {
+            "clusters": command.clusters,
+            "max_iterations": command.max_iterations,
+            "tolerance": command.tolerance,
+            "seed": command.seed,
+        }
+    else:
+        max_pairs = min(command.max_pairs or analysis_settings.max_pairs, analysis_settings.max_pairs)
+        kind = models.AnalysisKind.DUPLICATES
+        parameters = {"threshold": command.threshold, "max_pairs": max_pairs}
+
+    job = models.AnalysisJob(
+        id=command._id,
+        kind=kind,
+        provider=command.provider_name,
+        model=command.embedding_model,
+        dimensions=dimensions,
+        parameters=parameters,
+    )
+    await executors.run_in_executor(executors.db_executor(), queries.insert_analysis, job)
+    await broker.publish(settings.job_settings().topic, {"kind": ANALYSIS_MESSAGE, "job_id": job.id})
+    return job
+
+
+def _reporter(job: models.AnalysisJob, interrupted: threading.Event, interval: float = 1.0) -> Progress:
+    """Record the progress of a running analysis at most every ``interval`` seconds, renewing its claim."""
+    last = time.monotonic()
+
+    def report(processed: int):
+        nonlocal last
+        if interrupted.is_set():
+            raise AnalysisInterrupted(f"Analysis {job.id} interrupted")
+        now = time.monotonic()
+        if now - last >= interval:
+            queries.record_analysis_progress(job.id, processed)
+            last = now
+
+    return report
+
+
+def run_analysis(job: models.AnalysisJob, interrupted: threading.Event) -> dict[str, Any]:
+    """Run a claimed analysis over its stored vectors, blocking. Returns its result."""
+    parameters, blocks = job.parameters, stored_blocks(job)
+    count = queries.count_vectors(job.provider, job.model, job.dimensions)
+    report = _reporter(job, interrupted)
+    if job.kind == models.AnalysisKind.CLUSTERS:
+        queries.record_analysis_progress(job.id, 0, count * (parameters["max_iterations"] + 1))
+        clusters = kmeans(
+            blocks,
+            parameters["clusters"],
+            parameters["max_iterations"],
+            parameters["tolerance"],
+            parameters["seed"],
+            progress=report,
+        )
+        return {
+            "centroids": clusters.centroids.tolist(),
+            "sizes": clusters.sizes.tolist(),
+            "inertia": clusters.inertia,
+            "iterations": clusters.iterations,
+        }
+
+    queries.record_analysis_progress(job.id, 0, count * (count - 1) // 2)
+    duplicates = near_duplicates(blocks, parameters["threshold"], parameters["max_pairs"], report)
+    return {"pairs": [pair._asdict() for pair in duplicates.pairs], "found": duplicates.found}
+
+
+async def process_analysis(body: dict[str, Any], interrupted: threading.Event | None = None):
+    """
+    Claim and run an analysis on the analysis threads, then record its result.
+
+    Analyses may be delivered more than once, finished ones are skipped. One still running elsewhere
+    raises so its message is delivered again, and run here once its worker stops renewing its claim.
+    Analysis errors are recorded on the analysis rather than raised.
+
+    Raises:
+        AnalysisInterrupted: When ``interrupted`` is set while the analysis runs
+    """
+    job_id = body["job_id"]
+    job = await queries.aget_analysis(job_id)
+    if job is None or job.done:
+        return
+    lease = timedelta(milliseconds=settings.job_settings().visibility_timeout_ms)
+    if not await executors.run_in_executor(executors.db_executor(), queries.claim_analysis, job_id, lease):
+        raise RuntimeError(f"Analysis {job_id} is running on another worker")
+
+    try:
+        with metrics.track("analysis", job.provider, job.model):
+            result = await executors.run_in_executor(
+                executors.analysis_executor(), run_analysis, job, interrupted or threading.Event()
+            )
+    except AnalysisInterrupted:
+        raise
+    except Exception as e:
+        logger.error(f"Analysis {job_id} failed: {e}")
+        await executors.run_in_executor(executors.db_executor(), queries.finish_analysis, job_id, None, str(e))
+        return
+    await executors.run_in_executor(executors.db_executor(), queries.finish_analysis, job_id, result)
@@ -0,0 +1,154 @@
+import asyncio
+import contextvars
+import functools
+from typing import Callable, List
+
+from llm_portal import settings
+from llm_portal.adapters.llm_providers import LLMProvider, current_context
+
+
+class RequestCoalescer:
+    """
+    Coalesces concurrent single-text embedding requests for one (provider, model, dimensions) into batched calls.
+
+    A request waits until no other request arrived for ``window_ms``, at most ``max_wait_ms`` after the
+    first pending request, or until ``max_batch_size`` requests are pending. The pending texts are
+    then sent as one batched provider call and each caller gets its own vector back. The call is made in
+    the request context of the first pending request, whose deadline is the earliest.
+
+    Args:
+        llm_provider (LLMProvider): The provider that serves the model
+        model (str): The embedding model
+        dimensions (int, optional): Reduced dimensions of the vectors, the model's full size by default
+        window_ms (float): Quiet period that closes a batch
+        max_wait_ms (float): Longest time a request is held
+        max_batch_size (int): Number of pending requests that closes a batch immediately
+        on_idle (Callable[[RequestCoalescer], None], optional): Called once no request is pending or in flight
+    """
+
+    def __init__(
+            self,
+            llm_provider: LLMProvider,
+            model: str,
+            dimensions: int | None = None,
+            window_ms: float = 5.0,
+            max_wait_ms: float = 20.0,
+            max_batch_size: int = 64,
+            on_idle: Callable[["RequestCoalescer"], None] | None = None,
+    ):
+        self.llm_provider = llm_provider
+        self.model = model
+        self.dimensions = dimensions
+        self.window = window_ms / 1000
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.on_idle = on_idle
+
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._first_arrival = 0.0
+        self._first_context: contextvars.Context | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.batches = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = self.loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        now = loop.time()
+
+        if not self._pending:
+            self._first_arrival = now
+            self._first_context = contextvars.copy_context()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        else:
+            self._schedule(loop, now)
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop, now: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        deadline = min(now + self.window, self._first_arrival + self.max_wait)
+        self._timer = loop.call_at(deadline, self._flush)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        self.batches += 1
+        task = asyncio.get_running_loop().create_task(self._run(pending), context=self._first_context)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not self._tasks and not self._pending and self.on_idle is not None:
+            self.on_idle(self)
+
+    async def _run(self, pending: list[tuple[str, asyncio.Future]]):
+        try:
+            vectors = await self.llm_provider.agenerate_embeddings_batched(
+                [text for text, _ in pending], self.model, self.dimensions
+            )
+            # A response that misses vectors fails every request rather than leaving some waiting
+            results = list(zip(pending, vectors, strict=True))
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in results:
+            if not future.done():
+                future.set_result(vector)
+
+
+# Coalescers with requests pending or in flight, removed once idle so tenants that stopped calling take no memory
+_coalescers: dict[tuple[str, str, int | None, str, str], RequestCoalescer] = {}
+
+
+def _remove(key: tuple[str, str, int | None, str, str], coalescer: RequestCoalescer):
+    if _coalescers.get(key) is coalescer:
+        del _coalescers[key]
+
+
+def coalescer_for(llm_provider: LLMProvider, model: str, dimensions: int | None = None) -> RequestCoalescer:
+    """
+    Return the coalescer for (provider, model, dimensions) and the lane and tenant of the current request
+    on the running event loop, configured by ``embedding.batching``. Requests of different lanes or tenants
+    are never sent in one call.
+    """
+    loop = asyncio.get_running_loop()
+    context = current_context()
+    key = (llm_provider.provider_name, model, dimensions, context.lane, context.tenant)
+    coalescer = _coalescers.get(key)
+    if coalescer is None or coalescer.loop not in (None, loop):
+        batching_settings = settings.batching_settings()
+        coalescer = RequestCoalescer(
+            llm_provider,
+            model,
+            dimensions,
+            window_ms=batching_settings.window_ms,
+            max_wait_ms=batching_settings.max_wait_ms,
+            max_batch_size=batching_settings.max_batch_size,
+            on_idle=functools.partial(_remove, key),
+        )
+        _coalescers[key] = coalescer
+    return coalescer
@@ -0,0 +1,99 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Literal
+
+from llm_portal.adapters.llm_providers import LLMProvider
+
+Pooling = Literal["mean", "weighted", "chunks"]
+
+_WORD = re.compile(r"\S+\s*")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n\s*")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A piece of a text, ``start`` is its character offset in the text."""
+
+    text: str
+    start: int
+    tokens: int
+
+
+@dataclass(frozen=True)
+class _Word:
+    start: int
+    end: int
+    tokens: int
+    starts_paragraph: bool
+
+
+def _words(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> Iterator[_Word]:
+    """Words of the text with their trailing spaces, a word longer than a chunk is cut into chunk-sized pieces."""
+    paragraph_starts = {match.end() for match in _PARAGRAPH_BREAK.finditer(text)}
+    for match in _WORD.finditer(text):
+        start, end = match.span()
+        pieces = -(-count_tokens(match.group()) // max_tokens)
+        step = -(-(end - start) // pieces)
+        for piece_start in range(start, end, step):
+            piece_end = min(piece_start + step, end)
+            yield _Word(
+                piece_start,
+                piece_end,
+                count_tokens(text[piece_start:piece_end]),
+                piece_start == start and start in paragraph_starts,
+            )
+
+
+def split_text(
+        text: str,
+        max_tokens: int,
+        overlap_tokens: int = 0,
+        count_tokens: Callable[[str], int] = LLMProvider.estimate_tokens,
+) -> List[Chunk]:
+    """
+    Split a text into chunks of at most ``max_tokens`` tokens, a text that fits is a single chunk of itself.
+
+    Chunks end at a paragraph break when one falls in their second half, otherwise between two words,
+    and then start ``overlap_tokens`` back so the split words keep some of their context. Boundaries
+    depend on the text around them only, so editing one paragraph leaves the chunks before it unchanged
+    and those after it unchanged once a boundary falls at the same paragraph again.
+
+    Args:
+        text (str): The text to split
+        max_tokens (int): Largest chunk, in ``count_tokens`` tokens
+        overlap_tokens (int): Tokens repeated at the start of a chunk that continues a paragraph
+        count_tokens (Callable[[str], int]): Token count of a piece of text, the provider estimate by default
+    """
+    words = list(_words(text, max_tokens, count_tokens))
+    total = sum(word.tokens for word in words)
+    if total <= max_tokens:
+        return [Chunk(text, 0, total)]
+
+    chunks, first = [], 0
+    while first < len(words):
+        last, tokens, paragraph_end, paragraph_tokens = first, 0, None, 0
+        while last < len(words) and tokens + words[last].tokens <= max_tokens:
+            if last > first and words[last].starts_paragraph and tokens * 2 >= max_tokens:
+                paragraph_end, paragraph_tokens = last, tokens
+            tokens += words[last].tokens
+            last += 1
+        if last == first:
+            # A piece the token count still finds too long goes alone
+            last, tokens = first + 1, words[first].tokens
+        ends_paragraph = last == len(words) or words[last].starts_paragraph
+        if not ends_paragraph and paragraph_end is not None:
+            last, tokens, ends_paragraph = paragraph_end, paragraph_tokens, True
+
+        start = words[first].start
+        chunks.append(Chunk(text[start:words[last - 1].end].rstrip(), start, tokens))
+        if ends_paragraph or last == len(words):
+            first = last
+            continue
+        # Step back over the overlap, always moving forward by at least one word
+        overlap, next_first = 0, last
+        while next_first - 1 > first and overlap + words[next_first - 1].tokens <= overlap_tokens:
+            next_first -= 1
+            overlap += words[next_first].tokens
+        first = next_first
+    return chunks
+
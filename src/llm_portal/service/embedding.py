@@ -0,0 +1,287 @@
+from datetime import datetime
+from typing import List, NamedTuple
+
+from llm_portal import executors, settings
+from llm_portal.adapters.embedding_cache import EmbeddingCache, text_hash
+from llm_portal.adapters.llm_providers import LLMProvider
+from llm_portal.domains import events, models, vectors
+from llm_portal.domains.vectors import VectorLike
+from llm_portal.service import batching, chunking
+
+
+class EmbeddedChunk(NamedTuple):
+    chunk: chunking.Chunk
+    key: str
+    vector: VectorLike
+
+
+class EmbeddedTexts(NamedTuple):
+    """
+    Text hashes and vectors of texts in input order, a chunked text has the pooled vector of its chunks.
+
+    ``chunks`` holds, per text, the chunks to store as child results, only with ``chunks`` pooling.
+    """
+    keys: List[str]
+    vectors: List[VectorLike]
+    chunks: List[List[EmbeddedChunk]]
+
+
+def _created(results: List[models.EmbeddedResult]) -> List[models.EmbeddedResult]:
+    """Raise ``EmbeddingCreated`` on new results, stored in the outbox with them."""
+    if settings.event_settings().enabled:
+        for result in results:
+            result.events.append(
+                events.EmbeddingCreated(
+                    result_id=result.id,
+                    provider=result.provider,
+                    model=result.model,
+                    dimensions=result.dimensions,
+                    text_hash=result.text_hash,
+                    parent_id=result.parent_id,
+                    created_time=getattr(result, "created_time", None) or datetime.now(),
+                )
+            )
+    return results
+
+
+def build_results(
+        llm_provider: LLMProvider,
+        result_ids: List[str],
+        texts: List[str],
+        keys: List[str],
+        embedding_vectors: List[VectorLike],
+        model: str,
+        dimensions: int | None = None,
+) -> List[models.EmbeddedResult]:
+    """Build the results of embedded texts, all of the same provider, model and dimensions."""
+    dimensions = dimensions or llm_provider.model_dimensions(model)
+    return _created([
+        models.EmbeddedResult(
+            id=result_id,
+            text=text,
+            text_hash=key,
+            vector=embedding_vector,
+            model=model,
+            provider=llm_provider.provider_name,
+            dimensions=dimensions,
+        )
+        for result_id, text, key, embedding_vector in zip(result_ids, texts, keys, embedding_vectors, strict=True)
+    ])
+
+
+def build_chunk_results(
+        llm_provider: LLMProvider,
+        result_ids: List[str],
+        chunks: List[List[EmbeddedChunk]],
+        model: str,
+        dimensions: int | None = None,
+) -> List[models.EmbeddedResult]:
+    """Build the child results ``<result id>#<index>`` of the chunks of each result."""
+    dimensions = dimensions or llm_provider.model_dimensions(model)
+    return _created([
+        models.EmbeddedResult(
+            id=f"{result_id}#{index}",
+            text=embedded.chunk.text,
+            text_hash=embedded.key,
+            parent_id=result_id,
+            vector=embedded.vector,
+            model=model,
+            provider=llm_provider.provider_name,
+            dimensions=dimensions,
+        )
+        for result_id, text_chunks in zip(result_ids, chunks, strict=True)
+        for index, embedded in enumerate(text_chunks)
+    ])
+
+
+def _lookup_cached(cache: EmbeddingCache, keys: List[str], texts: List[str]) -> tuple[dict, dict]:
+    """Split distinct keys into cached vectors and texts that still have to be embedded."""
+    vectors, missing = {}, {}
+    for key, text in zip(keys, texts, strict=True):
+        if key in vectors or key in missing:
+            continue
+        vector = cache.get(key)
+        if vector is None:
+            missing[key] = text
+        else:
+            vectors[key] = vector
+    return vectors, missing
+
+
+def embed_with_cache(
+        llm_provider: LLMProvider,
+        cache: EmbeddingCache,
+        texts: List[str],
+        model: str,
+        dimensions: int | None = None,
+) -> tuple[List[str], List[VectorLike]]:
+    """
+    Embed texts through the cache, sending only distinct cache misses to the provider.
+
+    Args:
+        dimensions (int, optional): Reduced dimensions of the vectors, the model's full size by default
+
+    Returns:
+        tuple[List[str], List[VectorLike]]: The text hashes and the vectors, in input order.
+    """
+    dimensions = llm_provider.reduced_dimensions(model, dimensions)
+    keys = [text_hash(llm_provider.provider_name, model, text, dimensions) for text in texts]
+    vectors, missing = _lookup_cached(cache, keys, texts)
+
+    if missing:
+        embedded = llm_provider.generate_embeddings_batched(list(missing.values()), model, dimensions)
+        for key, vector in zip(missing, embedded, strict=True):
+            cache.put(key, vector)
+            vectors[key] = vector
+    return keys, [vectors[key] for key in keys]
+
+
+async def aembed_with_cache(
+        llm_provider: LLMProvider,
+        cache: EmbeddingCache,
+        texts: List[str],
+        model: str,
+        dimensions: int | None = None,
+) -> tuple[List[str], List[VectorLike]]:
+    """Async variant of ``embed_with_cache``, cache lookups run on the database thread."""
+    dimensions = llm_provider.reduced_dimensions(model, dimensions)
+    keys = [text_hash(llm_provider.provider_name, model, text, dimensions) for text in texts]
+    vectors, missing = await executors.run_in_executor(executors.db_executor(), _lookup_cached, cache, keys, texts)
+
+    if missing:
+        embedded = await llm_provider.agenerate_embeddings_batched(list(missing.values()), model, dimensions)
+        for key, vector in zip(missing, embedded, strict=True):
+            cache.put(key, vector)
+            vectors[key] = vector
+    return keys, [vectors[key] for key in keys]
+
+
+async def aembed_text(
+        llm_provider: LLMProvider,
+        cache: EmbeddingCache,
+        text: str,
+        model: str,
+        dimensions: int | None = None,
+) -> tuple[str, VectorLike]:
+    """
+    Embed a single text through the cache.
+
+    When batching is enabled, concurrent requests for the same model are coalesced into one provider call.
+
+    Returns:
+        tuple[str, VectorLike]: The text hash and the vector.
+    """
+
+    async def embed() -> VectorLike:
+        if settings.batching_settings().enabled:
+            return await batching.coalescer_for(llm_provider, model, dimensions).embed(text)
+        if dimensions is None:
+            return (await llm_provider.agenerate_embeddings([text], model))[0]
+        return (await llm_provider.agenerate_embeddings_batched([text], model, dimensions))[0]
+
+    dimensions = llm_provider.reduced_dimensions(model, dimensions)
+    key = text_hash(llm_provider.provider_name, model, text, dimensions)
+    return key, await cache.aget_or_compute(key, embed)
+
+
+def split_texts(llm_provider: LLMProvider, texts: List[str], model: str) -> List[List[chunking.Chunk]]:
+    """Chunks of each text, configured by ``embedding.chunking``, a text is its only chunk when it fits the model."""
+    chunking_settings = settings.chunking_settings()
+    if not chunking_settings.enabled:
+        return [[chunking.Chunk(text, 0, llm_provider.estimate_tokens(text))] for text in texts]
+    max_tokens = chunking_settings.max_tokens or llm_provider.max_input_tokens(model)
+    return [
+        chunking.split_text(text, max_tokens, chunking_settings.overlap_tokens, llm_provider.estimate_tokens)
+        for text in texts
+    ]
+
+
+def _pool(
+        llm_provider: LLMProvider,
+        texts: List[str],
+        split: List[List[chunking.Chunk]],
+        keys: List[str],
+        embedded: List[VectorLike],
+        model: str,
+        dimensions: int | None,
+        pooling: chunking.Pooling,
+) -> EmbeddedTexts:
+    """Pool the flat chunk vectors of ``split`` back into one vector per text."""
+    pooled = EmbeddedTexts([], [], [])
+    position = 0
+    for text, chunks in zip(texts, split, strict=True):
+        chunk_keys = keys[position:position + len(chunks)]
+        chunk_vectors = embedded[position:position + len(chunks)]
+        position += len(chunks)
+        if len(chunks) == 1:
+            pooled.keys.append(chunk_keys[0])
+            pooled.vectors.append(chunk_vectors[0])
+            pooled.chunks.append([])
+            continue
+
+        weights = [chunk.tokens for chunk in chunks] if pooling == "weighted" else None
+        pooled.keys.append(
+            text_hash(llm_provider.provider_name, model, text, dimensions, "weighted" if weights else "mean")
+        )
+        pooled.vectors.append(vectors.pool(chunk_vectors, weights))
+        pooled.chunks.append(
+            [EmbeddedChunk(*embedded_chunk) for embedded_chunk in zip(chunks, chunk_keys, chunk_vectors, strict=True)]
+            if pooling == "chunks" else []
+        )
+    return pooled
+
+
+def embed_texts(
+        llm_provider: LLMProvider,
+        cache: EmbeddingCache,
+        texts: List[str],
+        model: str,
+        dimensions: int | None = None,
+        pooling: chunking.Pooling | None = None,
+) -> EmbeddedTexts:
+    """
+    Embed texts of any length through the cache.
+
+    Texts longer than the model accepts are split into chunks, the chunks of all texts are embedded
+    together in provider-sized batches and pooled back into one vector per text. Chunks are cached on
+    their own, so a text edited in one place only re-embeds the chunks that changed.
+
+    Args:
+        dimensions (int, optional): Reduced dimensions of the vectors, the model's full size by default
+        pooling (str, optional): ``mean``, ``weighted`` or ``chunks``, ``embedding.chunking.pooling`` by default
+    """
+    pooling = pooling or settings.chunking_settings().pooling
+    # Validates the model before its input limit is read
+    reduced = llm_provider.reduced_dimensions(model, dimensions)
+    split = split_texts(llm_provider, texts, model)
+    keys, embedded = embed_with_cache(
+        llm_provider, cache, [chunk.text for chunks in split for chunk in chunks], model, dimensions
+    )
+    return _pool(llm_provider, texts, split, keys, embedded, model, reduced, pooling)
+
+
+async def aembed_texts(
+        llm_provider: LLMProvider,
+        cache: EmbeddingCache,
+        texts: List[str],
+        model: str,
+        dimensions: int | None = None,
+        pooling: chunking.Pooling | None = None,
+) -> EmbeddedTexts:
+    """
+    Async variant of ``embed_texts``, the batches of chunks are sent concurrently.
+
+    A single text that fits the model goes through ``aembed_text`` and is coalesced with concurrent requests.
+    """
+    pooling = pooling or settings.chunking_settings().pooling
+    # Validates the model before its input limit is read
+    reduced = llm_provider.reduced_dimensions(model, dimensions)
+    split = split_texts(llm_provider, texts, model)
+    if len(texts) == 1 and len(split[0]) == 1:
+        key, vector = await aembed_text(llm_provider, cache, texts[0], model, dimensions)
+        return EmbeddedTexts([key], [vector], [[]])
+
+    keys, embedded = await aembed_with_cache(
+        llm_provider, cache, [chunk.text for chunks in split for chunk in chunks], model, dimensions
+    )
+    return _pool(llm_provider, texts, split, keys, embedded, model, reduced, pooling)
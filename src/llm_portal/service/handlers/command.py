@@ -1,14 +1,18 @@
 import core
 from typing import List, Callable, TypeVar
 
-from llm_portal.domains import commands, models
+from llm_portal.domains import commands
+from llm_portal.adapters.broker import get_broker
+from llm_portal.adapters.embedding_cache import get_embedding_cache
 from llm_portal.adapters.provider_factory import llm_provider_factory
+from llm_portal.service import analysis, embedding, jobs, persistence
 
 TCommand = TypeVar("TCommand", bound=core.Command)
 TResult = TypeVar("TResult")
 
 CommandHandler = Callable[[TCommand, core.UnitOfWork], TResult]
 
+
 def generate_text_embeddings(command: commands.InputTextCommand, uow: core.UnitOfWork):
     """
     Generate text embeddings for the given command.
@@ -18,27 +22,174 @@ def generate_text_embeddings(command: commands.InputTextCommand, uow: core.UnitO
         uow (core.UnitOfWork): Unit of work for database operations
 
     Returns:
-        commands.EmbeddingResult: The embedding result containing the vector and metadata
+        models.EmbeddedResult: The stored embedding result
+    """
+    llm_provider = llm_provider_factory(command.provider_name)
+
+    # Generate embeddings using the LLM, identical texts and chunks are served from the cache
+    embedded = embedding.embed_texts(
+        llm_provider,
+        get_embedding_cache(),
+        [command.text],
+        command.embedding_model,
+        command.dimensions,
+        command.pooling,
+    )
+
+    result_ids = [command._id]
+    results = embedding.build_results(
+        llm_provider,
+        result_ids,
+        [command.text],
+        embedded.keys,
+        embedded.vectors,
+        command.embedding_model,
+        command.dimensions,
+    )
+    chunk_results = embedding.build_chunk_results(
+        llm_provider, result_ids, embedded.chunks, command.embedding_model, command.dimensions
+    )
+    persistence.store_results(uow, results + chunk_results)
+    return results[0]
+
+
+def generate_batch_text_embeddings(command: commands.BatchInputTextCommand, uow: core.UnitOfWork):
+    """
+    Generate text embeddings for every text of the given batch command.
+
+    Cached texts are not re-embedded, the rest are split into provider-sized batches and all results
+    are stored in a single unit of work. Texts longer than the model accepts are chunked and pooled.
+
+    Args:
+        command (commands.BatchInputTextCommand): The command containing the texts to embed
+        uow (core.UnitOfWork): Unit of work for database operations
+
+    Returns:
+        List[models.EmbeddedResult]: The stored results, in input order
+    """
+    llm_provider = llm_provider_factory(command.provider_name)
+
+    embedded = embedding.embed_texts(
+        llm_provider,
+        get_embedding_cache(),
+        command.texts,
+        command.embedding_model,
+        command.dimensions,
+        command.pooling,
+    )
+
+    results = embedding.build_results(
+        llm_provider,
+        command.result_ids(),
+        command.texts,
+        embedded.keys,
+        embedded.vectors,
+        command.embedding_model,
+        command.dimensions,
+    )
+    chunk_results = embedding.build_chunk_results(
+        llm_provider, command.result_ids(), embedded.chunks, command.embedding_model, command.dimensions
+    )
+    persistence.store_results(uow, results + chunk_results)
+    return results
+
+
+async def agenerate_text_embeddings(command: commands.InputTextCommand, uow: core.UnitOfWork):
+    """
+    Async variant of ``generate_text_embeddings``.
+
+    The provider call is awaited on the event loop, results are persisted according to
+    ``embedding.storage.write_mode`` and returned through the message bus. When batching is enabled,
+    concurrent requests for the same model are coalesced into one provider call.
     """
-    with uow:
-        llm_provider = llm_provider_factory(command.provider_name)
+    llm_provider = llm_provider_factory(command.provider_name)
 
-        # Generate embeddings using the LLM
-        embedding_vector = llm_provider.generate_embeddings([command.text], command.embedding_model)
+    embedded = await embedding.aembed_texts(
+        llm_provider,
+        get_embedding_cache(),
+        [command.text],
+        command.embedding_model,
+        command.dimensions,
+        command.pooling,
+    )
 
-        # Create embedding result
-        result = models.EmbeddedResult(
-            id=command._id,
-            text=command.text,
-            vector=embedding_vector,
-            model=command.embedding_model,
-            provider=command.provider_name,
-            dimensions=llm_provider.model_dimensions(command.embedding_model),
-        )
+    result_ids = [command._id]
+    results = embedding.build_results(
+        llm_provider,
+        result_ids,
+        [command.text],
+        embedded.keys,
+        embedded.vectors,
+        command.embedding_model,
+        command.dimensions,
+    )
+    chunk_results = embedding.build_chunk_results(
+        llm_provider, result_ids, embedded.chunks, command.embedding_model, command.dimensions
+    )
+    await persistence.persist(uow, results + chunk_results)
+    return results[0]
+
+
+async def agenerate_batch_text_embeddings(command: commands.BatchInputTextCommand, uow: core.UnitOfWork):
+    """
+    Async variant of ``generate_batch_text_embeddings``.
+    """
+    llm_provider = llm_provider_factory(command.provider_name)
+
+    embedded = await embedding.aembed_texts(
+        llm_provider,
+        get_embedding_cache(),
+        command.texts,
+        command.embedding_model,
+        command.dimensions,
+        command.pooling,
+    )
+
+    results = embedding.build_results(
+        llm_provider,
+        command.result_ids(),
+        command.texts,
+        embedded.keys,
+        embedded.vectors,
+        command.embedding_model,
+        command.dimensions,
+    )
+    chunk_results = embedding.build_chunk_results(
+        llm_provider, command.result_ids(), embedded.chunks, command.embedding_model, command.dimensions
+    )
+    await persistence.persist(uow, results + chunk_results)
+    return results
+
+
+async def asubmit_embedding_job(command: commands.SubmitEmbeddingJobCommand):
+    """
+    Submit a background embedding job, processed by the workers consuming the message broker.
+
+    Returns:
+        models.EmbeddingJob: The queued job
+    """
+    return await jobs.submit(command, get_broker())
+
+
+async def asubmit_analysis(command: commands.SubmitClusteringCommand | commands.SubmitDuplicatesCommand):
+    """
+    Submit a background clustering or near-duplicate analysis, run by the workers consuming the message broker.
+
+    Returns:
+        models.AnalysisJob: The queued analysis
+    """
+    return await analysis.submit(command, get_broker())
 
-        uow.repo.add(result)
-        uow.commit()
 
 COMMAND_HANDLERS: dict[type[core.Command], CommandHandler] = {
     commands.InputTextCommand: generate_text_embeddings,
-}
\ No newline at end of file
+    commands.BatchInputTextCommand: generate_batch_text_embeddings,
+}
+
+ASYNC_COMMAND_HANDLERS: dict[type[core.Command], CommandHandler] = {
+    commands.InputTextCommand: agenerate_text_embeddings,
+    commands.BatchInputTextCommand: agenerate_batch_text_embeddings,
+    commands.SubmitEmbeddingJobCommand: asubmit_embedding_job,
+    commands.SubmitClusteringCommand: asubmit_analysis,
+    commands.SubmitDuplicatesCommand: asubmit_analysis,
+}
@@ -1 +1,7 @@
-EVENT_HANDLERS = {}
\ No newline at end of file
+from llm_portal.domains import events
+
+# Domain events are published to the ``events`` topic from the outbox, committed with the results that
+# raised them, rather than handled in process
+EVENT_HANDLERS = {
+    events.EmbeddingCreated: [],
+}
@@ -0,0 +1,318 @@
+import asyncio
+import csv
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Literal
+
+import core
+import utils
+
+from llm_portal import metrics
+from llm_portal.adapters.embedding_cache import EmbeddingCache
+from llm_portal.adapters.llm_providers import LLMProvider
+from llm_portal.domains import models
+from llm_portal.service import chunking, embedding, persistence
+
+logger = utils.get_logger()
+
+InputFormat = Literal["ndjson", "csv"]
+
+# Longest record id, its result id adds the upload prefix and the chunk suffixes within 64 characters
+MAX_ID_LENGTH = 40
+
+
+@dataclass(frozen=True)
+class IngestRecord:
+    """One input text, ``index`` is its position in the upload."""
+
+    index: int
+    id: str | None
+    text: str
+
+
+@dataclass(frozen=True)
+class IngestFailure:
+    """An input line that could not be parsed."""
+
+    line: int
+    error: str
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[str | IngestFailure]:
+    """
+    Split a byte stream into decoded lines, without the line breaks.
+
+    Only the current line is buffered. A line longer than ``max_line_bytes`` is skipped and reported.
+    """
+    buffer = bytearray()
+    number = 0
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                if not skipping:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        skipping = True
+                        buffer.clear()
+                break
+            number += 1
+            if skipping:
+                skipping = False
+                yield IngestFailure(number, f"Line longer than {max_line_bytes} bytes")
+            else:
+                buffer += chunk[start:end]
+                if len(buffer) > max_line_bytes:
+                    yield IngestFailure(number, f"Line longer than {max_line_bytes} bytes")
+                else:
+                    yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+            buffer.clear()
+            start = end + 1
+    if skipping:
+        yield IngestFailure(number + 1, f"Line longer than {max_line_bytes} bytes")
+    elif buffer:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def _id_error(record_id: str | None) -> str | None:
+    if record_id is not None and len(record_id) > MAX_ID_LENGTH:
+        return f"Id longer than {MAX_ID_LENGTH} characters"
+    return None
+
+
+async def iter_ndjson_records(
+        lines: AsyncIterator[str | IngestFailure],
+) -> AsyncIterator[IngestRecord | IngestFailure]:
+    """Records of NDJSON lines like ``{"id": "a", "text": "..."}``, ``id`` is optional and blank lines are skipped."""
+    index = 0
+    number = 0
+    async for line in lines:
+        number += 1
+        if isinstance(line, IngestFailure):
+            yield line
+            continue
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            text = item["text"]
+            if not isinstance(text, str) or not text:
+                raise ValueError("text must be a non-empty string")
+            record_id = item.get("id")
+            record_id = None if record_id in (None, "") else str(record_id)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            yield IngestFailure(number, f"Invalid record: {e!r}")
+            continue
+        if error := _id_error(record_id):
+            yield IngestFailure(number, error)
+            continue
+        yield IngestRecord(index, record_id, text)
+        index += 1
+
+
+async def iter_csv_records(
+        lines: AsyncIterator[str | IngestFailure],
+) -> AsyncIterator[IngestRecord | IngestFailure]:
+    """Records of CSV rows, the header names a ``text`` column and optionally an ``id`` column."""
+    header = None
+    pending = ""
+    index = 0
+    number = 0
+    async for line in lines:
+        number += 1
+        if isinstance(line, IngestFailure):
+            yield line
+            continue
+        # A quoted field may hold line breaks, wait for its closing quote
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        row, pending = next(csv.reader([pending]), []), ""
+        if not row:
+            continue
+        if header is None:
+            header = [name.strip().lower() for name in row]
+            if "text" not in header:
+                yield IngestFailure(number, "The CSV header has no text column")
+                return
+            continue
+
+        values = dict(zip(header, row, strict=False))
+        text, record_id = values.get("text"), values.get("id") or None
+        if not text:
+            yield IngestFailure(number, "Empty text")
+            continue
+        if error := _id_error(record_id):
+            yield IngestFailure(number, error)
+            continue
+        yield IngestRecord(index, record_id, text)
+        index += 1
+
+
+def parse_records(
+        chunks: AsyncIterator[bytes],
+        input_format: InputFormat,
+        max_line_bytes: int,
+) -> AsyncIterator[IngestRecord | IngestFailure]:
+    lines = iter_lines(chunks, max_line_bytes)
+    return iter_csv_records(lines) if input_format == "csv" else iter_ndjson_records(lines)
+
+
+class IngestionPipeline:
+    """
+    Bounded streaming pipeline: parse, batch, dedupe, embed, persist.
+
+    Records are grouped into batches of ``batch_size`` texts, each batch is embedded through the cache,
+    which also dedupes identical texts, then persisted. ``workers`` batches are processed concurrently
+    and the result lines of a batch are yielded as soon as it is persisted, so results are not in input
+    order. Stages are connected by queues of ``queue_batches`` batches: when the provider, the database
+    or the reader of the results is slow, the queues fill up and the records stop being read, so memory
+    stays bounded whatever the size of the upload.
+
+    Results are stored under ids of the upload: ``<id_prefix>:<id>`` for records with an id, whose ids
+    must be unique within the upload, and ``<id_prefix>-<index>`` for the others. A duplicate id is
+    reported as invalid within a batch, and fails the batch it is in when an earlier batch had it.
+
+    Args:
+        llm_provider (LLMProvider): The provider that serves the model
+        model (str): The embedding model
+        uow (core.UnitOfWork): Unit of work results are persisted with
+        cache (EmbeddingCache): The embedding cache
+        id_prefix (str): Prefix of the result ids, unique per upload
+        result_line (Callable[[models.EmbeddedResult, IngestRecord], dict]): Output line of a stored result
+        batch_size (int): Records per batch
+        queue_batches (int): Batches buffered between stages
+        workers (int): Batches processed concurrently
+        dimensions (int, optional): Reduced dimensions of the vectors, the model's full size by default
+        pooling (str, optional): Vector of texts longer than the model accepts,
+            ``embedding.chunking.pooling`` by default
+    """
+
+    def __init__(
+            self,
+            llm_provider: LLMProvider,
+            model: str,
+            uow: core.UnitOfWork,
+            cache: EmbeddingCache,
+            id_prefix: str,
+            result_line: Callable[[models.EmbeddedResult, IngestRecord], dict],
+            batch_size: int = 256,
+            queue_batches: int = 4,
+            workers: int = 4,
+            dimensions: int | None = None,
+            pooling: chunking.Pooling | None = None,
+    ):
+        self.llm_provider = llm_provider
+        self.model = model
+        self.uow = uow
+        self.cache = cache
+        self.id_prefix = id_prefix
+        self.result_line = result_line
+        self.batch_size = batch_size
+        self.queue_batches = queue_batches
+        self.workers = workers
+        self.dimensions = dimensions
+        self.pooling = pooling
+
+        self.received = 0
+        self.embedded = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.invalid = 0
+
+    async def run(self, records: AsyncIterator[IngestRecord | IngestFailure]) -> AsyncIterator[dict[str, Any]]:
+        """Yield one line per stored result or failure, then a summary line."""
+        batches: asyncio.Queue = asyncio.Queue(self.queue_batches)
+        output: asyncio.Queue = asyncio.Queue(self.queue_batches)
+
+        async def produce():
+            batch = []
+            # Ids of the current batch only, a duplicate of an earlier batch is caught by the unique result id
+            batch_ids = set()
+            try:
+                async for record in records:
+                    if isinstance(record, IngestFailure):
+                        self.invalid += 1
+                        await output.put([{"line": record.line, "error": record.error}])
+                        continue
+                    if record.id is not None:
+                        if record.id in batch_ids:
+                            self.invalid += 1
+                            await output.put([{"index": record.index, "error": f"Duplicate id {record.id}"}])
+                            continue
+                        batch_ids.add(record.id)
+                    self.received += 1
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        await batches.put(batch)
+                        batch = []
+                        batch_ids = set()
+                if batch:
+                    await batches.put(batch)
+            finally:
+                for _ in range(self.workers):
+                    await batches.put(None)
+
+        async def work():
+            while (batch := await batches.get()) is not None:
+                await output.put(await self._process(batch))
+            await output.put(None)
+
+        producer = asyncio.create_task(produce())
+        workers = [asyncio.create_task(work()) for _ in range(self.workers)]
+        try:
+            finished = 0
+            while finished < self.workers:
+                lines = await output.get()
+                if lines is None:
+                    finished += 1
+                    continue
+                for line in lines:
+                    yield line
+
+            error = producer.exception()
+            if error is not None:
+                logger.error(f"Ingestion stopped reading the upload: {error}")
+                yield {"error": f"Upload aborted: {error}"}
+            yield {"summary": self.stats()}
+        finally:
+            for task in (producer, *workers):
+                task.cancel()
+
+    async def _process(self, batch: list[IngestRecord]) -> list[dict[str, Any]]:
+        texts = [record.text for record in batch]
+        result_ids = [
+            f"{self.id_prefix}-{record.index}" if record.id is None else f"{self.id_prefix}:{record.id}"
+            for record in batch
+        ]
+        try:
+            with metrics.track("ingest_batch", self.llm_provider.provider_name, self.model):
+                embedded = await embedding.aembed_texts(
+                    self.llm_provider, self.cache, texts, self.model, self.dimensions, self.pooling
+                )
+                results = embedding.build_results(
+                    self.llm_provider, result_ids, texts, embedded.keys, embedded.vectors, self.model, self.dimensions
+                )
+                chunk_results = embedding.build_chunk_results(
+                    self.llm_provider, result_ids, embedded.chunks, self.model, self.dimensions
+                )
+                await persistence.persist(self.uow, results + chunk_results)
+        except Exception as e:
+            logger.error(f"Failed to ingest a batch of {len(batch)} records: {e}")
+            self.failed += len(batch)
+            return [{"ids": result_ids, "error": str(e)}]
+
+        self.embedded += len(batch)
+        self.duplicates += len(embedded.keys) - len(set(embedded.keys))
+        return [self.result_line(result, record) for result, record in zip(results, batch, strict=True)]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "received": self.received,
+            "embedded": self.embedded,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "invalid": self.invalid,
+        }
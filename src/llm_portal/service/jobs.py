@@ -0,0 +1,178 @@
+import asyncio
+import os
+import socket
+import threading
+import uuid
+from typing import Any
+
+import utils
+from sqlalchemy.exc import IntegrityError
+
+from llm_portal import executors, metrics, settings
+from llm_portal.adapters import queries
+from llm_portal.adapters.broker import Broker, Message
+from llm_portal.adapters.embedding_cache import get_embedding_cache
+from llm_portal.adapters.llm_providers import current_context, request_context
+from llm_portal.adapters.provider_factory import llm_provider_factory
+from llm_portal.domains import commands, models
+from llm_portal.service import analysis, embedding, persistence
+
+logger = utils.get_logger()
+
+
+async def submit(command: commands.SubmitEmbeddingJobCommand, broker: Broker) -> models.EmbeddingJob:
+    """
+    Record a job and publish its texts in chunks, returning before any text is embedded.
+
+    The provider, model and dimensions are validated up front so a bad job fails on submit, not in a worker.
+    """
+    job_settings = settings.job_settings()
+    if len(command.texts) > job_settings.max_texts:
+        raise ValueError(f"A job holds at most {job_settings.max_texts} texts, got {len(command.texts)}")
+    llm_provider = llm_provider_factory(command.provider_name)
+    if command.embedding_model not in llm_provider.available_models:
+        raise ValueError(
+            f"Model {command.embedding_model} is not supported. "
+            f"Supported models are: {llm_provider.available_models}"
+        )
+    dimensions = llm_provider.reduced_dimensions(command.embedding_model, command.dimensions)
+
+    job = models.EmbeddingJob(
+        id=command._id,
+        provider=command.provider_name,
+        model=command.embedding_model,
+        total=len(command.texts),
+    )
+    await executors.run_in_executor(executors.db_executor(), queries.insert_job, job)
+    for start in range(0, len(command.texts), job_settings.chunk_size):
+        await broker.publish(
+            job_settings.topic,
+            {
+                "job_id": job.id,
+                "provider_name": job.provider,
+                "embedding_model": job.model,
+                "dimensions": dimensions,
+                "pooling": command.pooling,
+                "priority": command.priority or settings.scheduling_settings().bulk_lane,
+                "tenant": current_context().tenant,
+                "start": start,
+                "texts": command.texts[start:start + job_settings.chunk_size],
+            },
+        )
+    return job
+
+
+async def process_chunk(body: dict[str, Any]):
+    """
+    Embed and store one chunk of a job, then record its progress.
+
+    Chunks may be delivered more than once, results are counted in the transaction that stores them, so
+    results that are already stored, or stored meanwhile by a concurrent delivery, are not counted again.
+    Embedding errors are recorded on the job rather than raised, so the chunk is not retried forever.
+    Provider calls are made in the lane of the job, the bulk lane by default, for the tenant that submitted it.
+    """
+    job_id, start, texts = body["job_id"], body["start"], body["texts"]
+    result_ids = [f"{job_id}-{start + offset}" for offset in range(len(texts))]
+    existing = set()
+    try:
+        existing = await executors.run_in_executor(executors.db_executor(), queries.existing_result_ids, result_ids)
+        todo = [
+            (result_id, text) for result_id, text in zip(result_ids, texts, strict=True) if result_id not in existing
+        ]
+        if todo:
+            llm_provider = llm_provider_factory(body["provider_name"])
+            model, dimensions = body["embedding_model"], body.get("dimensions")
+            todo_ids, todo_texts = [list(column) for column in zip(*todo, strict=True)]
+            with request_context(body.get("priority"), body.get("tenant")), \
+                    metrics.track("job_chunk", llm_provider.provider_name, model):
+                embedded = await embedding.aembed_texts(
+                    llm_provider, get_embedding_cache(), todo_texts, model, dimensions, body.get("pooling")
+                )
+                results = embedding.build_results(
+                    llm_provider, todo_ids, todo_texts, embedded.keys, embedded.vectors, model, dimensions
+                )
+                results += embedding.build_chunk_results(llm_provider, todo_ids, embedded.chunks, model, dimensions)
+                # Written through, the job must not report texts that are not stored yet
+                await executors.run_in_executor(
+                    executors.db_executor(), persistence.insert_results, results, job_id
+                )
+    except IntegrityError:
+        # Another delivery of the chunk stored and counted the results first
+        logger.info(f"Job {job_id} texts {start}-{start + len(texts) - 1} were already stored")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed to embed texts {start}-{start + len(texts) - 1}: {e}")
+        await executors.run_in_executor(
+            executors.db_executor(), queries.record_job_progress, job_id, 0, len(texts) - len(existing), str(e)
+        )
+
+
+class Worker:
+    """
+    Consumer of job chunks, any number of workers share the chunks of a broker consumer group.
+
+    A chunk is acknowledged once processed, chunks of a worker that dies are delivered again to
+    another worker after the visibility timeout. Analyses published on the same topic are run on the
+    analysis threads, a stopping worker interrupts them and leaves them to be delivered again.
+
+    Args:
+        broker (Broker): The broker job chunks are read from
+        concurrency (int): Chunks processed concurrently
+        name (str, optional): Consumer name, unique per worker
+    """
+
+    def __init__(self, broker: Broker, concurrency: int = 4, name: str | None = None):
+        self.broker = broker
+        self.concurrency = concurrency
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+        self._interrupted = threading.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> asyncio.Task:
+        """Run the worker in a task of the running event loop."""
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        job_settings = settings.job_settings()
+        slots = asyncio.Semaphore(self.concurrency)
+        in_flight: set[asyncio.Task] = set()
+        logger.info(f"Worker {self.name} consuming {job_settings.topic}")
+        while not self._stopping.is_set():
+            await slots.acquire()
+            slots.release()
+            free = self.concurrency - len(in_flight)
+            try:
+                messages = await self.broker.consume(job_settings.topic, job_settings.group, self.name, free, 1000)
+            except Exception as e:
+                logger.error(f"Worker {self.name} failed to read {job_settings.topic}: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for message in messages:
+                await slots.acquire()
+                task = asyncio.create_task(self._handle(message, job_settings))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                task.add_done_callback(lambda _: slots.release())
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def _handle(self, message: Message, job_settings: settings.JobSettings):
+        try:
+            if message.body.get("kind") == analysis.ANALYSIS_MESSAGE:
+                await analysis.process_analysis(message.body, self._interrupted)
+            else:
+                await process_chunk(message.body)
+        except Exception as e:
+            # Not acknowledged, the chunk is delivered again after the visibility timeout
+            logger.error(f"Worker {self.name} failed to handle message {message.id}: {e}")
+            return
+        await self.broker.ack(job_settings.topic, job_settings.group, message.id)
+
+    async def stop(self):
+        """Stop reading chunks and wait for the chunks being processed, running analyses are interrupted."""
+        self._stopping.set()
+        self._interrupted.set()
+        if self._task is not None:
+            await self._task
@@ -0,0 +1,169 @@
+"""
+Lifecycle passes over the stored results: expiry, deduplicating compaction and space reclaim.
+
+    python -m llm_portal.service.lifecycle
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import utils
+
+from llm_portal import executors, metrics, settings
+from llm_portal.adapters import orm, queries
+from llm_portal.adapters.embedding_cache import text_hash
+from llm_portal.service import search
+
+logger = utils.get_logger()
+
+# SQLite pages freed per reclaim step
+RECLAIM_PAGES = 1000
+
+
+class LifecycleReport(NamedTuple):
+    expired: int = 0
+    hashed: int = 0
+    compacted: int = 0
+
+
+async def _db(function, *args):
+    # One short transaction per call, other queries of the database thread run in between
+    return await executors.run_in_executor(executors.db_executor(), function, *args)
+
+
+async def _delete(ids: list[str], retention: settings.RetentionSettings, keys: set, reason: str) -> int:
+    for start in range(0, len(ids), retention.batch_size):
+        batch = ids[start:start + retention.batch_size]
+        keys |= await _db(queries.delete_results, batch)
+        metrics.RESULTS_REMOVED.inc(len(batch), reason=reason)
+        await asyncio.sleep(retention.batch_pause_ms / 1000)
+    return len(ids)
+
+
+async def expire_results(retention: settings.RetentionSettings, keys: set) -> int:
+    """Delete the results older than the ``ttl_days`` of their provider and model, oldest first."""
+    now, expired = datetime.now(), 0
+    if not retention.ttl_days:
+        return expired
+    for provider, model in await _db(queries.result_models):
+        ttl = retention.ttl(provider, model)
+        if ttl is None:
+            continue
+        while ids := await _db(queries.expired_result_ids, provider, model, now - ttl, retention.batch_size):
+            expired += await _delete(ids, retention, keys, "expired")
+    return expired
+
+
+async def hash_results(retention: settings.RetentionSettings) -> int:
+    """Set the text hash of the results stored before text hashes existed, so their duplicates are found."""
+    after, hashed = None, 0
+    while rows := await _db(queries.results_without_text_hash, after, retention.batch_size):
+        # Results without a hash predate reduced dimensions and chunking, they are full-size whole texts
+        await _db(queries.set_text_hashes, {row.id: text_hash(row.provider, row.model, row.text) for row in rows})
+        after, hashed = rows[-1].id, hashed + len(rows)
+        await asyncio.sleep(retention.batch_pause_ms / 1000)
+    return hashed
+
+
+async def compact_results(retention: settings.RetentionSettings, keys: set) -> int:
+    """Delete the duplicates of each text hash older than ``min_age_days``, the oldest result is kept."""
+    before = datetime.now() - timedelta(days=retention.min_age_days)
+    after, compacted = None, 0
+    while hashes := await _db(queries.duplicate_text_hashes, after, retention.batch_size):
+        duplicates = await _db(queries.duplicate_result_ids, hashes, before)
+        compacted += await _delete(duplicates, retention, keys, "duplicate")
+        after = hashes[-1]
+    return compacted
+
+
+async def reclaim_space(retention: settings.RetentionSettings):
+    # A PostgreSQL VACUUM takes long, it runs off the database thread
+    while await executors.run_in_executor(executors.analysis_executor(), queries.reclaim_space, RECLAIM_PAGES):
+        await asyncio.sleep(retention.batch_pause_ms / 1000)
+
+
+async def run_lifecycle(retention: settings.RetentionSettings | None = None) -> LifecycleReport:
+    """
+    Run one lifecycle pass: expire results, then hash and compact them when ``compaction`` is set, and reclaim
+    the space of the removed rows. Every step reads and deletes ``batch_size`` rows per transaction.
+
+    Args:
+        retention (settings.RetentionSettings, optional): Defaults to ``embedding.retention``
+
+    Returns:
+        LifecycleReport: The results expired, hashed and removed as duplicates.
+    """
+    retention = retention or settings.retention_settings()
+    keys = set()
+    with metrics.track("lifecycle"):
+        try:
+            report = LifecycleReport(expired=await expire_results(retention, keys))
+            if retention.compaction:
+                report = report._replace(
+                    hashed=await hash_results(retention), compacted=await compact_results(retention, keys)
+                )
+        finally:
+            # Searches of the deleted results reload their index from storage
+            search.get_index_registry().evict(keys)
+        if (report.expired or report.compacted) and retention.reclaim_space:
+            await reclaim_space(retention)
+    logger.info(
+        f"Lifecycle pass expired {report.expired} results, hashed {report.hashed}, "
+        f"removed {report.compacted} duplicates"
+    )
+    return report
+
+
+class LifecycleScheduler:
+    """
+    Runs a lifecycle pass every ``interval_s`` in a task of the event loop.
+
+    Passes of several processes may overlap, they delete the same rows and the second one finds nothing left.
+
+    Args:
+        interval_s (float): Time between the end of a pass and the start of the next one
+    """
+
+    def __init__(self, interval_s: float):
+        self.interval = interval_s
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_lifecycle()
+            except Exception as e:
+                logger.error(f"Lifecycle pass failed: {e}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def start_scheduler() -> LifecycleScheduler | None:
+    """Start the lifecycle passes on the running event loop, None when ``interval_s`` is 0."""
+    interval_s = settings.retention_settings().interval_s
+    if not interval_s:
+        return None
+    scheduler = LifecycleScheduler(interval_s)
+    scheduler.start()
+    return scheduler
+
+
+def main():
+    orm.start_mapper()
+    asyncio.run(run_lifecycle())
+    executors.shutdown()
+
+
+if __name__ == "__main__":
+    main()
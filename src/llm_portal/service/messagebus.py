@@ -0,0 +1,55 @@
+import inspect
+from typing import Any, Callable
+
+import core
+
+from llm_portal import executors, metrics
+from llm_portal.adapters.llm_providers import request_context
+
+
+class AsyncMessageBus:
+    """
+    Message bus for the async request path.
+
+    Coroutine handlers are awaited on the event loop. Plain handlers run on the database thread,
+    since they use the shared unit of work directly. Dependencies are injected by parameter name,
+    like the core bootstrapper does. Every command is timed as the ``handler`` stage and counted
+    in ``llm_portal_requests_in_flight`` while it runs. A command with a ``priority`` makes its
+    provider calls in that scheduler lane.
+
+    Args:
+        command_handlers (dict[type[core.Command], Callable]): Handler for each command type
+        dependencies (dict[str, Any]): Dependencies available to the handlers
+    """
+
+    def __init__(
+            self,
+            command_handlers: dict[type[core.Command], Callable],
+            dependencies: dict[str, Any],
+    ):
+        self.command_handlers = command_handlers
+        self.dependencies = dependencies
+
+    async def handle(self, command: core.Command) -> Any:
+        handler = self.command_handlers.get(type(command))
+        if handler is None:
+            raise ValueError(f"No handler registered for {type(command).__name__}")
+
+        kwargs = self._inject(handler)
+        command_name = type(command).__name__
+        metrics.IN_FLIGHT.inc(command=command_name)
+        try:
+            with request_context(lane=getattr(command, "priority", None)), metrics.track(
+                    "handler",
+                    getattr(command, "provider_name", ""),
+                    getattr(command, "embedding_model", ""),
+            ):
+                if inspect.iscoroutinefunction(handler):
+                    return await handler(command, **kwargs)
+                return await executors.run_in_executor(executors.db_executor(), handler, command, **kwargs)
+        finally:
+            metrics.IN_FLIGHT.dec(command=command_name)
+
+    def _inject(self, handler: Callable) -> dict[str, Any]:
+        parameters = inspect.signature(handler).parameters
+        return {name: dependency for name, dependency in self.dependencies.items() if name in parameters}
@@ -0,0 +1,154 @@
+import asyncio
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+import utils
+
+from llm_portal import executors, metrics, settings
+from llm_portal.adapters import queries
+from llm_portal.adapters.broker import Broker
+
+logger = utils.get_logger()
+
+
+class OutboxRelay:
+    """
+    Publisher of the domain events of the outbox table, in micro-batches.
+
+    Events are claimed ``batch_size`` at a time and published as one broker message
+    ``{"events": [{"id", "name", "body"}, ...]}``, then deleted from the outbox. The outbox is read every
+    ``flush_interval_ms``, and as soon as a full batch of events is notified, so events are published in
+    batches rather than one message per embedding, and wait at most the flush interval.
+
+    An event is published at least once: events of a relay that dies before deleting them are published
+    again by another relay once their claim expires. Consumers drop duplicates by event ``id``.
+
+    Args:
+        publisher (Broker): The broker events are published to
+        topic (str): Broker topic of the event batches
+        flush_interval_ms (float): Longest time an event waits in the outbox
+        batch_size (int): Events per broker message
+        lease_ms (float): Time after which events claimed by this relay may be claimed by another one
+    """
+
+    def __init__(
+            self,
+            publisher: Broker,
+            topic: str = "llm-portal.events",
+            flush_interval_ms: float = 200.0,
+            batch_size: int = 500,
+            lease_ms: float = 30_000.0,
+    ):
+        self.publisher = publisher
+        self.topic = topic
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.lease = timedelta(milliseconds=lease_ms)
+        self.name = f"relay-{uuid.uuid4().hex[:16]}"
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup = asyncio.Event()
+        self._pending = 0
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls, publisher: Broker) -> "OutboxRelay":
+        event_settings = settings.event_settings()
+        return cls(
+            publisher,
+            topic=event_settings.topic,
+            flush_interval_ms=event_settings.flush_interval_ms,
+            batch_size=event_settings.batch_size,
+            lease_ms=event_settings.lease_ms,
+        )
+
+    def start(self) -> asyncio.Task:
+        """Run the relay in a task of the running event loop."""
+        self.loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def notify(self, events: int = 1):
+        """Count events committed to the outbox, a full batch is published at once. Safe from any thread."""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._add_pending, events)
+
+    def _add_pending(self, events: int):
+        self._pending += events
+        if self._pending >= self.batch_size:
+            self._wakeup.set()
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._pending = 0
+            try:
+                await self.relay()
+            except Exception as e:
+                # The events stay in the outbox and are published again once their claim expires
+                logger.error(f"Outbox relay {self.name} failed to publish events: {e}")
+
+    async def relay(self) -> int:
+        """Publish the outbox in batches until fewer than a batch is left. Returns the events published."""
+        published = 0
+        while True:
+            messages = await executors.run_in_executor(
+                executors.db_executor(), queries.claim_outbox, self.name, self.batch_size, self.lease
+            )
+            if not messages:
+                return published
+            await self.publisher.publish(
+                self.topic,
+                {"events": [{"id": message.id, "name": message.name, "body": message.body} for message in messages]},
+            )
+            await executors.run_in_executor(
+                executors.db_executor(), queries.delete_outbox, [message.id for message in messages]
+            )
+            published += len(messages)
+            metrics.EVENT_BATCH_SIZE.observe(len(messages))
+            for name, count in Counter(message.name for message in messages).items():
+                metrics.EVENTS_PUBLISHED.inc(count, name=name)
+            if len(messages) < self.batch_size:
+                return published
+
+    async def stop(self):
+        """Stop the relay after publishing what is left in the outbox."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+        try:
+            await self.relay()
+        except Exception as e:
+            logger.error(f"Outbox relay {self.name} stopped with events left in the outbox: {e}")
+
+
+_relay: OutboxRelay | None = None
+
+
+def start_relay(publisher: Broker) -> OutboxRelay | None:
+    """Start the outbox relay of this process on the running event loop, None when events are disabled."""
+    global _relay
+    if not settings.event_settings().enabled:
+        return None
+    _relay = OutboxRelay.from_settings(publisher)
+    _relay.start()
+    return _relay
+
+
+async def stop_relay():
+    global _relay
+    if _relay is not None:
+        relay, _relay = _relay, None
+        await relay.stop()
+
+
+def notify(events: int = 1):
+    """Count events committed to the outbox for the relay of this process."""
+    if _relay is not None and events:
+        _relay.notify(events)
@@ -0,0 +1,71 @@
+import asyncio
+from typing import List
+
+import core
+
+from llm_portal import executors, metrics, settings
+from llm_portal.adapters import queries
+from llm_portal.adapters.writer import BufferedWriter
+from llm_portal.domains import models
+from llm_portal.service import outbox, search
+
+
+def store_results(uow: core.UnitOfWork, results: List[models.EmbeddedResult]):
+    """Commit results and the events they raised through the unit of work, and make them searchable."""
+    with uow:
+        for result in results:
+            uow.repo.add(result)
+            for event in result.events:
+                uow.repo.add(models.OutboxMessage.of(event))
+        uow.commit()
+    search.get_index_registry().add_results(results)
+    outbox.notify(sum(len(result.events) for result in results))
+
+
+def insert_results(results: List[models.EmbeddedResult], job_id: str | None = None):
+    """Bulk insert buffered results and the events they raised, and make them searchable."""
+    queries.insert_results(results, job_id)
+    search.get_index_registry().add_results(results)
+    outbox.notify(sum(len(result.events) for result in results))
+
+
+# Writers of each event loop, a writer buffers rows and flushes them on its loop
+_writers: dict[asyncio.AbstractEventLoop, BufferedWriter] = {}
+
+
+def get_result_writer() -> BufferedWriter:
+    """
+    Return the result writer of the running event loop, configured by ``embedding.storage``.
+
+    A new writer takes over the rows left buffered by the writers of closed loops, they are flushed with its own.
+    """
+    loop = asyncio.get_running_loop()
+    writer = _writers.get(loop)
+    if writer is None:
+        storage_settings = settings.storage_settings()
+        writer = _writers[loop] = BufferedWriter(
+            insert_results,
+            flush_interval_ms=storage_settings.flush_interval_ms,
+            flush_rows=storage_settings.flush_rows,
+            max_pending_rows=storage_settings.max_pending_rows,
+        )
+        for closed in [other for other in _writers if other.is_closed()]:
+            writer.take_over(_writers.pop(closed))
+    return writer
+
+
+async def persist(uow: core.UnitOfWork, results: List[models.EmbeddedResult]):
+    """Persist results according to ``embedding.storage.write_mode``."""
+    write_mode = settings.storage_settings().write_mode
+    labels = (results[0].provider, results[0].model) if results else ("", "")
+    with metrics.track("db_commit", *labels):
+        if write_mode == "sync":
+            await executors.run_in_executor(executors.db_executor(), store_results, uow, results)
+        else:
+            await get_result_writer().write(results, wait=write_mode == "group")
+
+
+async def flush():
+    """Write out everything still buffered, used on shutdown."""
+    if _writers:
+        await get_result_writer().drain()
@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, NamedTuple, Sequence
+
+import numpy as np
+import utils
+
+from llm_portal import executors, metrics, settings
+from llm_portal.adapters import queries
+from llm_portal.adapters.embedding_cache import get_embedding_cache
+from llm_portal.adapters.provider_factory import llm_provider_factory
+from llm_portal.adapters.vector_index import SearchHit, VectorIndex
+from llm_portal.domains import models
+from llm_portal.domains.vectors import VectorLike
+from llm_portal.service import embedding
+
+logger = utils.get_logger()
+
+IndexLoader = Callable[[str, str, int, datetime | None], Iterator[tuple[list[str], list[str], np.ndarray]]]
+IndexVersion = Callable[[str, str, int], int]
+
+# Rows are committed some time after their creation time, by write buffers and job workers, a refresh reads
+# again the rows created this long before the previous one
+COMMIT_LAG = timedelta(seconds=30)
+
+
+class Refresh(NamedTuple):
+    at: float
+    since: datetime
+    version: int
+
+
+class IndexRegistry:
+    """
+    One ``VectorIndex`` per (provider, model, dimensions), loaded from storage on first use.
+
+    An index is registered before it is loaded, so results stored while it loads are added to it
+    as well and none are missed. Indexes ignore ids they already hold.
+
+    Results stored by the process are added to its indexes at once, those of other processes when an
+    index is used ``refresh_interval_ms`` after its last refresh: the results created since are read
+    from storage, and the index is reloaded instead when its version changed, as results were deleted.
+
+    Args:
+        loader (IndexLoader): Streams the stored (ids, texts, vectors) of a (provider, model, dimensions),
+            all of them or those created since a time
+        version (IndexVersion, optional): Version of the stored results of a (provider, model, dimensions),
+            indexes are never refreshed without it
+        refresh_interval_ms (float): Time between the refreshes of an index
+    """
+
+    def __init__(self, loader: IndexLoader, version: IndexVersion | None = None, refresh_interval_ms: float = 5000.0):
+        self._loader = loader
+        self._version = version
+        self._refresh_interval = refresh_interval_ms / 1000
+        self._indexes: dict[tuple[str, str, int], VectorIndex] = {}
+        self._loaded: dict[tuple[str, str, int], threading.Event] = {}
+        self._refreshes: dict[tuple[str, str, int], Refresh] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, model: str, dimensions: int) -> VectorIndex:
+        """Return the index of (provider, model, dimensions), loading it if needed. Blocking."""
+        key = (provider, model, dimensions)
+        with self._lock:
+            index = self._indexes.get(key)
+            owner = index is None
+            if owner:
+                search_settings = settings.search_settings()
+                index = self._indexes[key] = VectorIndex(
+                    dimensions,
+                    nlist=search_settings.nlist,
+                    nprobe=search_settings.nprobe,
+                    min_train_size=search_settings.min_train_size,
+                )
+                self._loaded[key] = threading.Event()
+            loaded = self._loaded[key]
+
+        if not owner:
+            loaded.wait()
+            if self._indexes.get(key) is not index:
+                # The load failed, try again
+                return self.get(provider, model, dimensions)
+            return self._refresh(key, index)
+
+        try:
+            # Read before the rows, a deletion during the load changes it and the index is loaded again
+            version = self._version(*key) if self._version is not None else 0
+            started = datetime.now()
+            for ids, texts, matrix in self._loader(provider, model, dimensions, None):
+                index.add(ids, texts, matrix)
+            with self._lock:
+                self._refreshes[key] = Refresh(time.monotonic(), started, version)
+            logger.info(f"Loaded search index for {provider}/{model}/{dimensions} with {len(index)} vectors")
+        except Exception:
+            with self._lock:
+                if self._indexes.get(key) is index:
+                    del self._indexes[key]
+            raise
+        finally:
+            loaded.set()
+        return index
+
+    def _refresh(self, key: tuple[str, str, int], index: VectorIndex) -> VectorIndex:
+        # Claimed by one caller per interval, concurrent searches use the index as it is meanwhile
+        with self._lock:
+            refresh = self._refreshes.get(key)
+            if (
+                    self._version is None
+                    or refresh is None
+                    or self._indexes.get(key) is not index
+                    or time.monotonic() - refresh.at < self._refresh_interval
+            ):
+                return index
+            self._refreshes[key] = refresh._replace(at=time.monotonic())
+
+        try:
+            version = self._version(*key)
+            if version != refresh.version:
+                logger.info(f"Results of {'/'.join(map(str, key))} were deleted, reloading its search index")
+                self.evict([key])
+                return self.get(*key)
+            started = datetime.now()
+            for ids, texts, matrix in self._loader(*key, refresh.since - COMMIT_LAG):
+                index.add(ids, texts, matrix)
+        except Exception as e:
+            # Searched as it is, the next refresh tries again
+            logger.error(f"Failed to refresh the search index of {'/'.join(map(str, key))}: {e}")
+            return index
+        with self._lock:
+            if self._indexes.get(key) is index:
+                self._refreshes[key] = Refresh(time.monotonic(), started, version)
+        return index
+
+    def add_results(self, results: Sequence[models.EmbeddedResult]):
+        """Add newly stored whole-text results to the indexes that are already in memory."""
+        grouped = defaultdict(list)
+        for result in results:
+            if result.parent_id is not None:
+                continue
+            grouped[(result.provider, result.model, result.dimensions)].append(result)
+        for key, group in grouped.items():
+            index = self._indexes.get(key)
+            if index is not None:
+                index.add(
+                    [result.id for result in group],
+                    [result.text for result in group],
+                    [result.vector for result in group],
+                )
+
+    def evict(self, keys: Iterable[tuple[str, str, int]]):
+        """Drop the indexes of (provider, model, dimensions) whose results were deleted, reloaded on next use."""
+        with self._lock:
+            for key in keys:
+                self._indexes.pop(key, None)
+                self._refreshes.pop(key, None)
+
+
+_registry: IndexRegistry | None = None
+
+
+def get_index_registry() -> IndexRegistry:
+    global _registry
+    if _registry is None:
+        search_settings = settings.search_settings()
+        _registry = IndexRegistry(
+            lambda provider, model, dimensions, since: queries.iter_vectors(
+                provider, model, search_settings.load_batch_size, dimensions, since=since
+            ),
+            version=queries.index_version,
+            refresh_interval_ms=search_settings.refresh_interval_ms,
+        )
+    return _registry
+
+
+async def search(
+        provider_name: str,
+        model: str,
+        top_k: int = 10,
+        text: str | None = None,
+        vector: VectorLike | None = None,
+        approximate: bool = False,
+        ids: Sequence[str] | None = None,
+        text_contains: str | None = None,
+        dimensions: int | None = None,
+) -> list[SearchHit]:
+    """
+    Find the stored results of (provider, model) most similar to a text or a vector.
+
+    A query text is embedded through the cache like any other request. Only results of the requested
+    ``dimensions`` are searched, the model's full size by default. Loading the index and scoring run in
+    the provider thread pool.
+    """
+    llm_provider = llm_provider_factory(provider_name)
+    if model not in llm_provider.available_models:
+        raise ValueError(f"Model {model} is not supported. Supported models are: {llm_provider.available_models}")
+    reduced = llm_provider.reduced_dimensions(model, dimensions)
+    dimensions = reduced or llm_provider.model_dimensions(model)
+
+    if vector is None:
+        _, vector = await embedding.aembed_text(llm_provider, get_embedding_cache(), text, model, reduced)
+
+    with metrics.track("index_load", llm_provider.provider_name, model):
+        index = await executors.run_in_executor(
+            executors.provider_executor(),
+            get_index_registry().get,
+            llm_provider.provider_name,
+            model,
+            dimensions,
+        )
+    with metrics.track("search", llm_provider.provider_name, model):
+        return await executors.run_in_executor(
+            executors.provider_executor(),
+            index.search,
+            vector,
+            top_k,
+            approximate=approximate,
+            ids=ids,
+            text_contains=text_contains,
+        )
@@ -1 +1,545 @@
+from datetime import timedelta
+from typing import Any, Literal
 
+import pydantic
+import utils
+
+config = utils.get_config()
+
+
+def _section(name: str) -> dict:
+    """Return the ``embedding.<name>`` config section, empty when not configured."""
+    return (config.get("embedding") or {}).get(name) or {}
+
+
+class CacheSettings(pydantic.BaseModel):
+    """
+    Embedding cache settings
+
+    Args:
+        max_entries (int): Number of vectors kept in the in-process LRU tier, 0 disables it
+        use_store (bool): Fall back to a lookup on stored results by text hash
+    """
+    max_entries: int = pydantic.Field(default=10000, ge=0)
+    use_store: bool = True
+
+
+def cache_settings() -> CacheSettings:
+    return CacheSettings(**_section("cache"))
+
+
+class ConcurrencySettings(pydantic.BaseModel):
+    """
+    Request path concurrency settings
+
+    Args:
+        provider_threads (int): Size of the thread pool that runs synchronous provider calls
+    """
+    provider_threads: int = pydantic.Field(default=32, ge=1)
+
+
+def concurrency_settings() -> ConcurrencySettings:
+    return ConcurrencySettings(**_section("concurrency"))
+
+
+class BatchingSettings(pydantic.BaseModel):
+    """
+    Micro-batching of concurrent single-text requests
+
+    Args:
+        enabled (bool): Coalesce single-text requests per (provider, model)
+        window_ms (float): Quiet period that closes a batch
+        max_wait_ms (float): Longest time a request is held before its batch is sent
+        max_batch_size (int): Number of pending requests that closes a batch immediately
+    """
+    enabled: bool = True
+    window_ms: float = pydantic.Field(default=5.0, ge=0)
+    max_wait_ms: float = pydantic.Field(default=20.0, ge=0)
+    max_batch_size: int = pydantic.Field(default=64, ge=1)
+
+
+def batching_settings() -> BatchingSettings:
+    return BatchingSettings(**_section("batching"))
+
+
+class ChunkingSettings(pydantic.BaseModel):
+    """
+    Chunking of texts longer than their model accepts
+
+    Args:
+        enabled (bool): Split long texts into chunks embedded together, otherwise they are sent whole
+        max_tokens (int, optional): Estimated tokens per chunk, defaults to the input limit of the model
+        overlap_tokens (int): Tokens of a chunk repeated at the start of the next one when a paragraph is split
+        pooling (str): Vector of a chunked text, ``mean`` of its chunks, ``weighted`` by their tokens,
+            or ``chunks`` which also stores every chunk as a child result
+    """
+    enabled: bool = True
+    max_tokens: int | None = pydantic.Field(default=None, ge=1)
+    overlap_tokens: int = pydantic.Field(default=32, ge=0)
+    pooling: Literal["mean", "weighted", "chunks"] = "mean"
+
+
+def chunking_settings() -> ChunkingSettings:
+    return ChunkingSettings(**_section("chunking"))
+
+
+class StorageSettings(pydantic.BaseModel):
+    """
+    Embedding storage settings
+
+    Args:
+        vector_codec (str): Binary encoding of stored vectors, ``float32`` is lossless,
+            ``float16`` and ``int8`` trade precision for 2x and 4x smaller rows
+        write_mode (str): ``sync`` commits each request before responding, ``group`` buffers rows
+            and responds once their bulk insert committed, ``behind`` responds before the rows are
+            written and may lose buffered rows on a crash
+        flush_interval_ms (float): Longest time a row stays buffered in ``group`` and ``behind`` modes
+        flush_rows (int): Number of buffered rows that triggers a bulk insert
+        max_pending_rows (int): Buffered rows above which ``behind`` requests wait for a flush
+    """
+    vector_codec: Literal["float32", "float16", "int8"] = "float32"
+    write_mode: Literal["sync", "group", "behind"] = "sync"
+    flush_interval_ms: float = pydantic.Field(default=50.0, ge=0)
+    flush_rows: int = pydantic.Field(default=500, ge=1)
+    max_pending_rows: int = pydantic.Field(default=10000, ge=1)
+
+
+def storage_settings() -> StorageSettings:
+    return StorageSettings(**_section("storage"))
+
+
+class SearchSettings(pydantic.BaseModel):
+    """
+    Similarity search settings
+
+    Args:
+        max_top_k (int): Largest number of hits a search may ask for
+        nlist (int, optional): Number of IVF lists of approximate indexes, defaults to sqrt of the index size
+        nprobe (int): Number of IVF lists scored per approximate query
+        min_train_size (int): Indexes smaller than this always use exact search
+        load_batch_size (int): Rows read per batch when an index is loaded from storage
+        refresh_interval_ms (float): Time after which a search reads the results other processes stored or
+            deleted since its index was loaded or last refreshed
+    """
+    max_top_k: int = pydantic.Field(default=1000, ge=1)
+    nlist: int | None = pydantic.Field(default=None, ge=1)
+    nprobe: int = pydantic.Field(default=8, ge=1)
+    min_train_size: int = pydantic.Field(default=10000, ge=1)
+    load_batch_size: int = pydantic.Field(default=10000, ge=1)
+    refresh_interval_ms: float = pydantic.Field(default=5000.0, ge=0)
+
+
+def search_settings() -> SearchSettings:
+    return SearchSettings(**_section("search"))
+
+
+class WarmupSettings(pydantic.BaseModel):
+    """
+    Provider warm-up at startup
+
+    Args:
+        models (dict[str, list[str]]): Models loaded at startup, per provider name
+        fail_on_error (bool): Abort startup when a model fails to load, otherwise the app starts and
+            reports not ready until the model loads
+    """
+    models: dict[str, list[str]] = pydantic.Field(default_factory=dict)
+    fail_on_error: bool = False
+
+
+def warmup_settings() -> WarmupSettings:
+    return WarmupSettings(**_section("warmup"))
+
+
+class RateLimitSettings(pydantic.BaseModel):
+    """
+    Client-side quota of one (provider, model), enforced with token buckets
+
+    Args:
+        requests_per_minute (float, optional): Provider calls per minute, unlimited when not set
+        tokens_per_minute (float, optional): Estimated input tokens per minute, unlimited when not set
+        burst_seconds (float): Seconds of quota that can be spent at once after an idle period
+    """
+    requests_per_minute: float | None = pydantic.Field(default=None, gt=0)
+    tokens_per_minute: float | None = pydantic.Field(default=None, gt=0)
+    burst_seconds: float = pydantic.Field(default=1.0, gt=0)
+
+
+def rate_limit_settings(provider_name: str, model: str) -> RateLimitSettings:
+    """Limits of ``embedding.rate_limits.<provider>.<model>``, falling back to ``<provider>.default``."""
+    provider_limits = _section("rate_limits").get(provider_name) or {}
+    return RateLimitSettings(**(provider_limits.get(model) or provider_limits.get("default") or {}))
+
+
+class RetrySettings(pydantic.BaseModel):
+    """
+    Retries of rate-limited and transient provider errors, with full-jitter exponential backoff
+
+    Args:
+        max_attempts (int): Attempts per provider call, 1 disables retries
+        base_delay_ms (float): Backoff ceiling of the first retry, doubled on each retry
+        max_delay_ms (float): Largest backoff ceiling
+    """
+    max_attempts: int = pydantic.Field(default=4, ge=1)
+    base_delay_ms: float = pydantic.Field(default=100.0, ge=0)
+    max_delay_ms: float = pydantic.Field(default=10000.0, ge=0)
+
+
+def retry_settings() -> RetrySettings:
+    return RetrySettings(**_section("retry"))
+
+
+class HedgingSettings(pydantic.BaseModel):
+    """
+    Hedged provider calls, a duplicate is sent when a call is slower than a latency quantile
+
+    Args:
+        enabled (bool): Send hedged calls, async calls only
+        quantile (float): Latency quantile of recent calls after which a call is hedged
+        min_samples (int): Recent calls needed before hedging starts
+        min_delay_ms (float): Shortest delay before a hedged call
+    """
+    enabled: bool = False
+    quantile: float = pydantic.Field(default=0.95, gt=0, lt=1)
+    min_samples: int = pydantic.Field(default=50, ge=1)
+    min_delay_ms: float = pydantic.Field(default=20.0, ge=0)
+
+
+def hedging_settings() -> HedgingSettings:
+    return HedgingSettings(**_section("hedging"))
+
+
+class LaneSettings(pydantic.BaseModel):
+    """
+    One priority lane of the provider call scheduler
+
+    Args:
+        weight (float): Share of the provider calls given to the lane when several lanes wait
+        timeout_ms (float, optional): Deadline of the requests that do not send one, none by default
+        max_queue (int): Calls waiting in the lane, per (provider, model), above which new calls are rejected
+    """
+    weight: float = pydantic.Field(default=1.0, gt=0)
+    timeout_ms: float | None = pydantic.Field(default=None, gt=0)
+    max_queue: int = pydantic.Field(default=10000, ge=0)
+
+
+def _default_lanes() -> dict[str, LaneSettings]:
+    return {
+        "interactive": LaneSettings(weight=8, timeout_ms=10000, max_queue=1000),
+        "bulk": LaneSettings(weight=1, max_queue=100000),
+    }
+
+
+class SchedulingSettings(pydantic.BaseModel):
+    """
+    Priority lanes of the async provider calls, with weighted fair queuing and deadline-aware admission
+
+    Args:
+        enabled (bool): Queue provider calls by lane, otherwise they are all sent right away
+        max_concurrency (int): Provider calls in flight per (provider, model)
+        lanes (dict[str, LaneSettings]): Lanes by name
+        default_lane (str): Lane of the requests that do not choose one
+        bulk_lane (str): Lane of background jobs and of ``/embeddings/stream`` uploads that do not choose one
+        tenant_max_concurrency (int, optional): Provider calls in flight per tenant and (provider, model)
+        tenant_max_queue (int, optional): Calls a tenant may have waiting per (provider, model), above
+            which its new calls are rejected with ``429``
+    """
+    enabled: bool = True
+    max_concurrency: int = pydantic.Field(default=32, ge=1)
+    lanes: dict[str, LaneSettings] = pydantic.Field(default_factory=_default_lanes)
+    default_lane: str = "interactive"
+    bulk_lane: str = "bulk"
+    tenant_max_concurrency: int | None = pydantic.Field(default=None, ge=1)
+    tenant_max_queue: int | None = pydantic.Field(default=None, ge=0)
+
+    @pydantic.model_validator(mode="after")
+    def _check_lanes(self) -> "SchedulingSettings":
+        for lane in (self.default_lane, self.bulk_lane):
+            if lane not in self.lanes:
+                raise ValueError(f"Lane {lane} is not configured, configured lanes are: {list(self.lanes)}")
+        return self
+
+
+def scheduling_settings() -> SchedulingSettings:
+    return SchedulingSettings(**_section("scheduling"))
+
+
+class BackendSettings(pydantic.BaseModel):
+    """
+    One backend of a route
+
+    Args:
+        provider (str): Provider class of the backend, a built-in provider or ``llm_portal.providers`` plugin name
+        name (str, optional): Name of the backend in metrics and rate limits, defaults to ``provider``
+        options (dict): Keyword arguments of the provider, like ``location`` or ``project_id`` for Vertex AI
+    """
+    provider: str
+    name: str | None = None
+    options: dict[str, Any] = pydantic.Field(default_factory=dict)
+
+
+class RouteSettings(pydantic.BaseModel):
+    """
+    Backends serving one logical provider
+
+    Args:
+        backends (list[BackendSettings]): Backends of the route
+    """
+    backends: list[BackendSettings] = pydantic.Field(min_length=1)
+
+
+class RoutingSettings(pydantic.BaseModel):
+    """
+    Latency-aware routing of logical providers to several backends
+
+    Args:
+        routes (dict[str, RouteSettings]): Backends per logical provider name
+        ewma_alpha (float): Weight of the newest call in the latency and error-rate averages
+        failure_threshold (int): Consecutive failures that eject a backend
+        error_rate_threshold (float): Average error rate that ejects a backend
+        latency_outlier_factor (float): A backend slower than this many times the fastest other backend is ejected
+        min_samples (int): Calls before a backend can be ejected for its error rate or latency
+        base_ejection_ms (float): Ejection time of a first ejection, doubled on each consecutive ejection
+        max_ejection_ms (float): Longest ejection time
+    """
+    routes: dict[str, RouteSettings] = pydantic.Field(default_factory=dict)
+    ewma_alpha: float = pydantic.Field(default=0.3, gt=0, le=1)
+    failure_threshold: int = pydantic.Field(default=3, ge=1)
+    error_rate_threshold: float = pydantic.Field(default=0.5, gt=0, le=1)
+    latency_outlier_factor: float = pydantic.Field(default=3.0, gt=1)
+    min_samples: int = pydantic.Field(default=10, ge=1)
+    base_ejection_ms: float = pydantic.Field(default=30000.0, ge=0)
+    max_ejection_ms: float = pydantic.Field(default=300000.0, ge=0)
+
+
+def routing_settings() -> RoutingSettings:
+    return RoutingSettings(**_section("routing"))
+
+
+class LocalModelSettings(pydantic.BaseModel):
+    """
+    One model of the offline ``local`` provider
+
+    Args:
+        method (str): ``hashing`` hashes words and character n-grams into ``dimensions`` signed buckets,
+            ``random_projection`` hashes into ``hashed_features`` buckets then projects them with a seeded
+            Gaussian matrix, ``onnx`` runs a sentence-embedding model with onnxruntime
+        dimensions (int): Dimensions of the vectors
+        supported_dimensions (list[int]): Reduced dimensions served by truncating and renormalizing the vectors
+        ngram_size (int): Length of the character n-grams hashed with the words, 0 hashes words only
+        hashed_features (int): Buckets hashed into before a random projection
+        seed (int): Seed of the hashes and of the projection matrix
+        path (str, optional): Path of the ``.onnx`` model file
+        tokenizer_path (str, optional): Path of the ``tokenizer.json`` of an ONNX model
+        max_length (int): Tokens per text kept by the ONNX tokenizer
+        max_batch_size (int): Texts per call
+    """
+    method: Literal["hashing", "random_projection", "onnx"] = "hashing"
+    dimensions: int = pydantic.Field(default=768, ge=1)
+    supported_dimensions: list[pydantic.PositiveInt] = []
+    ngram_size: int = pydantic.Field(default=3, ge=0)
+    hashed_features: int = pydantic.Field(default=4096, ge=1)
+    seed: int = 0
+    path: str | None = None
+    tokenizer_path: str | None = None
+    max_length: int = pydantic.Field(default=512, ge=1)
+    max_batch_size: int = pydantic.Field(default=256, ge=1)
+
+
+def _default_local_models() -> dict[str, LocalModelSettings]:
+    return {
+        "hashing-768": LocalModelSettings(method="hashing"),
+        "random-projection-768": LocalModelSettings(method="random_projection"),
+    }
+
+
+class LocalProviderSettings(pydantic.BaseModel):
+    """
+    Offline ``local`` provider settings
+
+    Args:
+        models (dict[str, LocalModelSettings]): Models by name
+    """
+    models: dict[str, LocalModelSettings] = pydantic.Field(default_factory=_default_local_models)
+
+
+def local_provider_settings() -> LocalProviderSettings:
+    return LocalProviderSettings(**_section("local"))
+
+
+class IngestionSettings(pydantic.BaseModel):
+    """
+    Streaming bulk ingestion settings
+
+    Args:
+        batch_size (int): Records embedded and persisted together
+        queue_batches (int): Batches buffered between two pipeline stages, bounds the memory of an upload
+        workers (int): Batches embedded and persisted concurrently per upload
+        max_line_bytes (int): Longest accepted input line
+    """
+    batch_size: int = pydantic.Field(default=256, ge=1)
+    queue_batches: int = pydantic.Field(default=4, ge=1)
+    workers: int = pydantic.Field(default=4, ge=1)
+    max_line_bytes: int = pydantic.Field(default=1_000_000, ge=1)
+
+
+def ingestion_settings() -> IngestionSettings:
+    return IngestionSettings(**_section("ingestion"))
+
+
+class JobSettings(pydantic.BaseModel):
+    """
+    Asynchronous embedding job settings
+
+    Args:
+        topic (str): Broker topic job chunks are published to
+        group (str): Consumer group shared by the workers
+        chunk_size (int): Texts per published chunk, chunks of a job are processed by any worker
+        max_texts (int): Largest job accepted
+        in_process_workers (int): Workers started inside the API process, ``0`` when dedicated worker
+            processes consume the broker
+        worker_concurrency (int): Chunks processed concurrently by each worker
+        visibility_timeout_ms (int): Time after which a chunk not acknowledged by its worker is delivered again
+        poll_interval_ms (int): Status polling interval of the job event stream
+    """
+    topic: str = "llm-portal.embedding-jobs"
+    group: str = "llm-portal-workers"
+    chunk_size: int = pydantic.Field(default=256, ge=1)
+    max_texts: int = pydantic.Field(default=100_000, ge=1)
+    in_process_workers: int = pydantic.Field(default=1, ge=0)
+    worker_concurrency: int = pydantic.Field(default=4, ge=1)
+    visibility_timeout_ms: int = pydantic.Field(default=300_000, ge=1)
+    poll_interval_ms: int = pydantic.Field(default=500, ge=1)
+
+
+def job_settings() -> JobSettings:
+    return JobSettings(**_section("jobs"))
+
+
+class EventSettings(pydantic.BaseModel):
+    """
+    Domain event publishing settings, events go through the outbox table to the message broker
+
+    Args:
+        enabled (bool): Raise ``EmbeddingCreated`` for every stored result
+        topic (str): Broker topic event batches are published to
+        flush_interval_ms (int): Longest time an event waits in the outbox
+        batch_size (int): Events published together, in one broker message
+        lease_ms (int): Time after which events claimed by a relay that did not publish them are claimed again
+    """
+    enabled: bool = True
+    topic: str = "llm-portal.events"
+    flush_interval_ms: int = pydantic.Field(default=200, ge=1)
+    batch_size: int = pydantic.Field(default=500, ge=1)
+    lease_ms: int = pydantic.Field(default=30_000, ge=1)
+
+
+def event_settings() -> EventSettings:
+    return EventSettings(**_section("events"))
+
+
+class AnalysisSettings(pydantic.BaseModel):
+    """
+    Clustering and near-duplicate analysis settings, analyses run as jobs on the job workers
+
+    Args:
+        block_size (int): Vectors read from storage and multiplied at a time, bounds the memory of an analysis
+        threads (int): Analyses run concurrently by each process
+        max_clusters (int): Largest number of k-means clusters
+        max_iterations (int): Largest number of k-means passes over the vectors
+        max_pairs (int): Most near-duplicate pairs kept by an analysis, the most similar ones
+    """
+    block_size: int = pydantic.Field(default=4096, ge=1)
+    threads: int = pydantic.Field(default=1, ge=1)
+    max_clusters: int = pydantic.Field(default=1024, ge=2)
+    max_iterations: int = pydantic.Field(default=100, ge=1)
+    max_pairs: int = pydantic.Field(default=100_000, ge=1)
+
+
+def analysis_settings() -> AnalysisSettings:
+    return AnalysisSettings(**_section("analysis"))
+
+
+class RetentionSettings(pydantic.BaseModel):
+    """
+    Lifecycle of the stored results: expiry, deduplicating compaction and space reclaim, in small batches
+
+    Args:
+        ttl_days (dict[str, dict[str, float]]): Days results are kept, per provider and model, ``default`` applies
+            to the models of a provider that are not listed. Results of other providers are kept forever
+        compaction (bool): Remove duplicate results of a text, the oldest one is kept
+        min_age_days (float): Results younger than this are never removed as duplicates
+        reclaim_space (bool): Return the space of removed rows to the database after a pass that removed rows
+        interval_s (int): Time between two passes in the API process, ``0`` runs no background pass
+        batch_size (int): Rows read or removed per transaction
+        batch_pause_ms (int): Pause between two batches, so other writers get the table in between
+    """
+    ttl_days: dict[str, dict[str, float]] = pydantic.Field(default_factory=dict)
+    compaction: bool = False
+    min_age_days: float = pydantic.Field(default=7.0, ge=0)
+    reclaim_space: bool = True
+    interval_s: int = pydantic.Field(default=3600, ge=0)
+    batch_size: int = pydantic.Field(default=1000, ge=1)
+    batch_pause_ms: int = pydantic.Field(default=50, ge=0)
+
+    def ttl(self, provider_name: str, model: str) -> timedelta | None:
+        """Age after which results of (provider, model) expire, None when they are kept forever."""
+        provider_ttls = self.ttl_days.get(provider_name) or {}
+        days = provider_ttls.get(model, provider_ttls.get("default"))
+        return None if days is None else timedelta(days=days)
+
+
+def retention_settings() -> RetentionSettings:
+    return RetentionSettings(**_section("retention"))
+
+
+class DatabaseSettings(pydantic.BaseModel):
+    """
+    Database engine settings, per process
+
+    Args:
+        pool_size (int): Connections kept open in the pool
+        max_overflow (int): Connections opened beyond ``pool_size`` under load, closed once returned
+        pool_timeout_s (float): Wait for a free connection before failing
+        pool_recycle_s (int): Age after which a connection is replaced, ``-1`` never replaces them
+        pool_pre_ping (bool): Check connections when they are taken from the pool, dropped ones are replaced
+        sqlite_journal_mode (str): SQLite journal mode, ``wal`` lets readers run while a writer commits
+        sqlite_synchronous (str): SQLite ``synchronous`` pragma, ``normal`` is durable in WAL mode
+        sqlite_busy_timeout_ms (int): Time a SQLite connection waits for a lock before failing
+        async_engine (bool): Read job status and results through an asyncpg engine on PostgreSQL,
+            instead of the database thread
+    """
+    pool_size: int = pydantic.Field(default=10, ge=1)
+    max_overflow: int = pydantic.Field(default=20, ge=0)
+    pool_timeout_s: float = pydantic.Field(default=30.0, gt=0)
+    pool_recycle_s: int = pydantic.Field(default=1800, ge=-1)
+    pool_pre_ping: bool = True
+    sqlite_journal_mode: Literal["wal", "delete", "truncate", "persist", "memory"] = "wal"
+    sqlite_synchronous: Literal["off", "normal", "full"] = "normal"
+    sqlite_busy_timeout_ms: int = pydantic.Field(default=5000, ge=0)
+    async_engine: bool = False
+
+
+def database_settings() -> DatabaseSettings:
+    return DatabaseSettings(**_section("database"))
+
+
+class ServerSettings(pydantic.BaseModel):
+    """
+    REST server settings
+
+    Args:
+        host (str): Interface the server listens on
+        port (int): Port the server listens on, the ``PORT`` environment variable wins
+        workers (int): Server processes sharing the socket, the ``WEB_CONCURRENCY`` environment variable wins
+        backlog (int): Connections queued by the kernel before they are accepted
+        graceful_shutdown_s (float): Time given to the requests in flight on shutdown
+    """
+    host: str = "0.0.0.0"
+    port: int = pydantic.Field(default=8000, ge=0)
+    workers: int = pydantic.Field(default=1, ge=1)
+    backlog: int = pydantic.Field(default=2048, ge=1)
+    graceful_shutdown_s: float = pydantic.Field(default=30.0, ge=0)
+
+
+def server_settings() -> ServerSettings:
+    return ServerSettings(**_section("server"))
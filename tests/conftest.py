@@ -45,7 +45,9 @@ def rest_client(
 ) -> Generator[testclient.TestClient, Any, None]:
     if cleanup["before"]:
         logger.info("Cleaning up before starting the test")
-    yield testclient.TestClient(app.create_app())
+    # Entered so the lifespan bootstraps the app, warms the providers up and starts the job workers
+    with testclient.TestClient(app.create_app()) as client:
+        yield client
 
     if cleanup["after"]:
         logger.info("Cleaning up after the test")
\ No newline at end of file
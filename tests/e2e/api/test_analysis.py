@@ -0,0 +1,49 @@
+import json
+import time
+
+from fastapi import testclient
+
+
+def wait_for(rest_client: testclient.TestClient, job_id: str) -> dict:
+    for _ in range(100):
+        analysis = rest_client.get(f"/analysis/{job_id}").json()
+        if analysis.get("status") in ("succeeded", "failed"):
+            return analysis
+        time.sleep(0.1)
+    raise TimeoutError(f"Analysis {job_id} did not finish")
+
+
+def test_clustering(rest_client: testclient.TestClient):
+    texts = ["Hello world", "Bonjour le monde", "Hallo Welt", "Hello world"]
+    rest_client.post(
+        "/embeddings/batch",
+        json={"texts": texts, "embedding_model": "text-embedding-005", "provider_name": "vertexai"},
+    )
+    response = rest_client.post(
+        "/analysis/clusters",
+        json={"provider_name": "vertexai", "embedding_model": "text-embedding-005", "clusters": 2},
+    )
+    assert response.status_code == 202
+
+    analysis = wait_for(rest_client, response.json().get("id"))
+    assert analysis.get("status") == "succeeded"
+    assert len(analysis["result"]["centroids"]) == 2
+
+    lines = rest_client.get(f"/analysis/{analysis['id']}/assignments").text.splitlines()
+    assert {json.loads(line).get("cluster") for line in lines} <= {0, 1}
+
+
+def test_near_duplicates(rest_client: testclient.TestClient):
+    response = rest_client.post(
+        "/analysis/duplicates",
+        json={"provider_name": "vertexai", "embedding_model": "text-embedding-005", "threshold": 0.99},
+    )
+    assert response.status_code == 202
+
+    analysis = wait_for(rest_client, response.json().get("id"))
+    assert analysis.get("status") == "succeeded"
+    assert all(pair.get("similarity") >= 0.99 for pair in analysis["result"]["pairs"])
+
+
+def test_unknown_analysis(rest_client: testclient.TestClient):
+    assert rest_client.get("/analysis/unknown").status_code == 404
@@ -1,6 +1,12 @@
+import base64
+import json
+
+import numpy as np
+import pytest
 from fastapi import testclient
 from icecream import ic
 
+
 def test_embeddings(rest_client: testclient.TestClient):
     response = rest_client.post(
         "/embeddings",
@@ -23,3 +29,83 @@ def test_empty_text_embedding(rest_client: testclient.TestClient):
     assert response.status_code == 400
 
     ic(response.json())
+
+
+def test_batch_embeddings(rest_client: testclient.TestClient):
+    texts = ["Hello world", "Bonjour le monde", "Hallo Welt"]
+    response = rest_client.post(
+        "/embeddings/batch",
+        json={"texts": texts, "embedding_model": "text-embedding-005", "provider_name": "vertexai"},
+    )
+    assert response.status_code == 200
+
+    results = response.json().get("results")
+    assert [result.get("text") for result in results] == texts
+    assert all(len(result.get("vector")) == 768 for result in results)
+
+
+def test_long_text_embedding_is_pooled_from_chunks(rest_client: testclient.TestClient):
+    text = "\n\n".join(f"Paragraph {index}. " + "Some words of a long document. " * 100 for index in range(8))
+    response = rest_client.post(
+        "/embeddings",
+        json={
+            "text": text,
+            "embedding_model": "text-embedding-005",
+            "provider_name": "vertexai",
+            "pooling": "weighted",
+        },
+    )
+    assert response.status_code == 200
+
+    vector = np.array(response.json().get("result").get("vector"))
+    assert vector.shape == (768,)
+    assert np.linalg.norm(vector) == pytest.approx(1.0, rel=1e-3)
+
+
+def test_priority_lanes(rest_client: testclient.TestClient):
+    request = {"text": "Hello world", "embedding_model": "text-embedding-005", "provider_name": "vertexai"}
+
+    assert rest_client.post("/embeddings", json=request, headers={"X-Priority": "bulk"}).status_code == 200
+    assert rest_client.post("/embeddings", json={**request, "priority": "bulk"}).status_code == 200
+    assert rest_client.post("/embeddings", json=request, headers={"X-Priority": "urgent"}).status_code == 400
+    assert rest_client.post("/embeddings", json={**request, "priority": "urgent"}).status_code == 400
+
+
+def test_base64_embedding(rest_client: testclient.TestClient):
+    response = rest_client.post(
+        "/embeddings?encoding_format=base64",
+        json={"text": "Hello world", "embedding_model": "text-embedding-005", "provider_name": "vertexai"},
+    )
+    assert response.status_code == 200
+
+    vector = np.frombuffer(base64.b64decode(response.json()["result"]["vector"]), dtype="<f4")
+    assert vector.shape == (768,)
+
+
+def test_binary_batch_embeddings(rest_client: testclient.TestClient):
+    texts = ["Hello world", "Bonjour le monde"]
+    response = rest_client.post(
+        "/embeddings/batch?encoding_format=binary",
+        json={"texts": texts, "embedding_model": "text-embedding-005", "provider_name": "vertexai"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["x-embedding-count"] == "2"
+
+    matrix = np.frombuffer(response.content, dtype="<f4").reshape(2, int(response.headers["x-embedding-dimensions"]))
+    assert matrix.shape == (2, 768)
+
+
+def test_stream_embeddings(rest_client: testclient.TestClient):
+    body = "\n".join(f'{{"id": "stream-{index}", "text": "Hello {index}"}}' for index in range(10))
+    response = rest_client.post(
+        "/embeddings/stream?provider_name=vertexai&embedding_model=text-embedding-005&include_vectors=true",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line.get("record_id") for line in lines[:-1]) == sorted(f"stream-{index}" for index in range(10))
+    assert all(len(line.get("vector")) == 768 for line in lines[:-1])
+    assert lines[-1]["summary"]["embedded"] == 10
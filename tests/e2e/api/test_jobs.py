@@ -0,0 +1,25 @@
+import json
+
+from fastapi import testclient
+
+
+def test_job(rest_client: testclient.TestClient):
+    texts = ["Hello world", "Bonjour le monde", "Hallo Welt"]
+    response = rest_client.post(
+        "/jobs",
+        json={"texts": texts, "embedding_model": "text-embedding-005", "provider_name": "vertexai"},
+    )
+    assert response.status_code == 202
+    job_id = response.json().get("id")
+
+    events = rest_client.get(f"/jobs/{job_id}/events").text
+    last = json.loads(events.strip().split("data: ")[-1])
+    assert last.get("status") == "succeeded"
+
+    results = rest_client.get(f"/jobs/{job_id}/results").json().get("results")
+    assert [result.get("text") for result in results] == texts
+    assert all(len(result.get("vector")) == 768 for result in results)
+
+
+def test_unknown_job(rest_client: testclient.TestClient):
+    assert rest_client.get("/jobs/unknown").status_code == 404
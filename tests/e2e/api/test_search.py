@@ -0,0 +1,54 @@
+from fastapi import testclient
+
+
+def test_search_by_text(rest_client: testclient.TestClient):
+    rest_client.post(
+        "/embeddings",
+        json={"text": "The cat sat on the mat", "embedding_model": "text-embedding-005", "provider_name": "vertexai"},
+    )
+
+    response = rest_client.post(
+        "/search",
+        json={
+            "text": "The cat sat on the mat",
+            "embedding_model": "text-embedding-005",
+            "provider_name": "vertexai",
+            "top_k": 3,
+        },
+    )
+    assert response.status_code == 200
+
+    results = response.json().get("results")
+    assert 0 < len(results) <= 3
+    assert results[0].get("text") == "The cat sat on the mat"
+
+
+def test_search_requires_text_or_vector(rest_client: testclient.TestClient):
+    response = rest_client.post(
+        "/search",
+        json={"embedding_model": "text-embedding-005", "provider_name": "vertexai"},
+    )
+    assert response.status_code == 422
+
+
+def test_search_reduced_dimensions(rest_client: testclient.TestClient):
+    request = {"embedding_model": "text-embedding-005", "provider_name": "vertexai", "dimensions": 256}
+    embedded = rest_client.post("/embeddings", json={"text": "A dog in the park", **request})
+    assert embedded.status_code == 200
+
+    response = rest_client.post("/search", json={"text": "A dog in the park", "top_k": 3, **request})
+    assert response.status_code == 200
+    assert response.json().get("results")[0].get("text") == "A dog in the park"
+
+
+def test_search_rejects_unsupported_dimensions(rest_client: testclient.TestClient):
+    response = rest_client.post(
+        "/search",
+        json={
+            "text": "A dog",
+            "embedding_model": "text-embedding-005",
+            "provider_name": "vertexai",
+            "dimensions": 300,
+        },
+    )
+    assert response.status_code == 400
@@ -3,8 +3,11 @@ from unittest.mock import patch
 
 import core
 import pytest
+import sqlalchemy
 import utils
 
+from llm_portal import executors
+from llm_portal.adapters import orm
 from llm_portal.adapters.llm_providers import LLMProvider
 from llm_portal import bootstrap
 
@@ -77,19 +80,21 @@ class InMemoryUnitOfWork(core.UnitOfWork):
 class FakeLLMProvider(LLMProvider):
     def __init__(self, provider_name: str):
         super().__init__("fake-provider")
+        self._embedding_models = {
+            "fake-model-1": {"dimensions": 10},
+            "fake-model-2": {"dimensions": 10},
+        }
 
     @property
     def available_models(self) -> List[str]:
-        return ["fake-model-1", "fake-model-2"]
-    def generate_embeddings(self, text: str, model: Optional[str] = None) -> List[float]:
+        return list(self._embedding_models.keys())
+
+    def generate_embeddings(self, list_texts: list[str], model: Optional[str] = None) -> List[List[float]]:
         """
-        Generate embeddings using a fake model.
+        Generate one fake embedding per text, based on the text length.
         """
-        if not text:
-            return []
+        return [[0.1 * len(text) for _ in range(10)] for text in list_texts]
 
-        # Generate a fake embedding based on the text length
-        return [0.1 * len(text) for _ in range(10)]
 
 @pytest.fixture
 def mock_llm_provider_factory():
@@ -123,3 +128,18 @@ def fake_message_bus():
         # Now bootstrap will use our test_dependencies
         return bootstrap
 
+
+@pytest.fixture
+def database():
+    """
+    Point the query functions at a fresh in-memory SQLite database.
+    """
+    engine = sqlalchemy.create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=sqlalchemy.pool.StaticPool
+    )
+    orm.metadata.create_all(engine)
+    # The database thread is sized from the engine, the memory database gets a single one
+    executors.shutdown()
+    with patch.object(orm, "_engine", engine):
+        yield engine
+        executors.shutdown()
@@ -0,0 +1,119 @@
+import asyncio
+import itertools
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from llm_portal import settings
+from llm_portal.adapters import queries
+from llm_portal.adapters.broker import InMemoryBroker
+from llm_portal.adapters.llm_providers import FakeProvider
+from llm_portal.domains import commands, models, vectors
+from llm_portal.service import analysis, jobs
+
+MODEL = "fake-model-1"
+
+
+def in_memory_blocks(ids: list[str], matrix: np.ndarray, block_size: int) -> analysis.VectorBlocks:
+    def blocks(after: str | None):
+        start = 0 if after is None else ids.index(after) + 1
+        for offset in range(start, len(ids), block_size):
+            yield ids[offset:offset + block_size], matrix[offset:offset + block_size]
+
+    return blocks
+
+
+def blobs(centers: int, per_center: int, dimensions: int = 16, seed: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    means = vectors.normalize(rng.normal(size=(centers, dimensions)))
+    labels = np.repeat(np.arange(centers), per_center)
+    rng.shuffle(labels)
+    matrix = means[labels] + rng.normal(scale=0.02, size=(len(labels), dimensions))
+    return matrix.astype(np.float32), labels
+
+
+def test_kmeans_finds_separated_clusters_block_by_block():
+    matrix, labels = blobs(centers=4, per_center=50)
+    blocks = in_memory_blocks([f"{index:03}" for index in range(len(matrix))], matrix, block_size=16)
+    processed = []
+
+    clusters = analysis.kmeans(blocks, 4, max_iterations=20, progress=processed.append)
+    found = np.concatenate([found for _, found, _ in analysis.assign(blocks, clusters.centroids)])
+
+    # Every true cluster maps to its own found cluster
+    assert len(set(zip(labels.tolist(), found.tolist(), strict=True))) == len(set(found.tolist())) == 4
+    assert sorted(clusters.sizes.tolist()) == [50] * 4
+    assert processed[-1] == len(matrix) * (clusters.iterations + 1)
+    np.testing.assert_array_equal(analysis.kmeans(blocks, 4, max_iterations=20).centroids, clusters.centroids)
+
+
+def test_kmeans_needs_as_many_vectors_as_clusters():
+    matrix, _ = blobs(centers=1, per_center=3)
+
+    with pytest.raises(ValueError):
+        analysis.kmeans(in_memory_blocks(["a", "b", "c"], matrix, 2), 4)
+
+
+def test_near_duplicates_match_a_brute_force_search():
+    rng = np.random.default_rng(2)
+    matrix = rng.normal(size=(40, 8)).astype(np.float32)
+    matrix[30] = matrix[3] * 2
+    matrix[31] = matrix[12] + 0.01
+    ids = [f"{index:02}" for index in range(len(matrix))]
+    similarities = vectors.normalize(matrix) @ vectors.normalize(matrix).T
+    expected = sorted(
+        ((similarities[i, j], ids[i], ids[j]) for i, j in itertools.combinations(range(len(ids)), 2)
+         if similarities[i, j] >= 0.6),
+        reverse=True,
+    )
+
+    duplicates = analysis.near_duplicates(in_memory_blocks(ids, matrix, 7), 0.6, max_pairs=3)
+
+    assert duplicates.found == len(expected) > 3
+    assert [(pair.id, pair.other_id) for pair in duplicates.pairs] == [(i, j) for _, i, j in expected[:3]]
+    assert duplicates.pairs[0][:2] == ("03", "30") and duplicates.pairs[0].similarity == pytest.approx(1)
+
+
+def test_analyses_run_on_the_job_workers(database):
+    provider = FakeProvider(dimensions=16)
+    matrix, _ = blobs(centers=2, per_center=10)
+    queries.insert_results([
+        models.EmbeddedResult(id=f"r{index:02}", text=str(index), provider="fake-provider", model=MODEL,
+                              dimensions=16, vector=vector)
+        for index, vector in enumerate(matrix)
+    ] + [
+        # Chunks of a text are not documents, they are neither clustered nor duplicates of their text
+        models.EmbeddedResult(id=f"r00#{index}", text="0", parent_id="r00", provider="fake-provider", model=MODEL,
+                              dimensions=16, vector=matrix[0])
+        for index in range(2)
+    ])
+
+    async def scenario():
+        broker = InMemoryBroker()
+        worker = jobs.Worker(broker)
+        worker.start()
+        clustering = await analysis.submit(
+            commands.SubmitClusteringCommand(provider_name="fake-provider", embedding_model=MODEL, clusters=2), broker
+        )
+        duplicates = await analysis.submit(
+            commands.SubmitDuplicatesCommand(provider_name="fake-provider", embedding_model=MODEL, threshold=0.9),
+            broker,
+        )
+        for _ in range(200):
+            finished = [queries.get_analysis(job.id) for job in (clustering, duplicates)]
+            if all(job.done for job in finished):
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        return finished
+
+    with patch.object(analysis, "llm_provider_factory", lambda provider_name: provider):
+        clustering, duplicates = asyncio.run(scenario())
+
+    assert (clustering.status, clustering.progress, sorted(clustering.result["sizes"])) == (
+        models.JobStatus.SUCCEEDED, 1.0, [10, 10]
+    )
+    assert duplicates.status == models.JobStatus.SUCCEEDED
+    assert duplicates.result["found"] == 2 * 45 == len(duplicates.result["pairs"])
+    assert duplicates.parameters == {"threshold": 0.9, "max_pairs": settings.AnalysisSettings().max_pairs}
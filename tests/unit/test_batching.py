@@ -0,0 +1,84 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from llm_portal.adapters.llm_providers import LLMProvider, request_context
+from llm_portal.service import batching
+from llm_portal.service.batching import RequestCoalescer, coalescer_for
+
+
+class RecordingProvider(LLMProvider):
+    def __init__(self, fail: bool = False):
+        super().__init__("recording")
+        self._embedding_models = {"model": {"dimensions": 1, "max_batch_size": 250}}
+        self.fail = fail
+        self.calls = []
+
+    @property
+    def available_models(self) -> List[str]:
+        return list(self._embedding_models.keys())
+
+    def generate_embeddings(self, list_texts: list[str], model: str = None) -> List[List[float]]:
+        self.calls.append(list_texts)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [[float(len(text))] for text in list_texts]
+
+
+async def embed_all(coalescer: RequestCoalescer, texts: list[str]):
+    return await asyncio.gather(*(coalescer.embed(text) for text in texts), return_exceptions=True)
+
+
+def test_concurrent_requests_share_one_provider_call():
+    provider = RecordingProvider()
+    coalescer = RequestCoalescer(provider, "model", window_ms=20, max_wait_ms=100, max_batch_size=100)
+    texts = ["x" * i for i in range(1, 11)]
+
+    vectors = asyncio.run(embed_all(coalescer, texts))
+
+    assert provider.calls == [texts]
+    assert vectors == [[float(i)] for i in range(1, 11)]
+    assert coalescer.stats()["mean_batch_size"] == 10
+
+
+def test_max_batch_size_closes_a_batch():
+    provider = RecordingProvider()
+    coalescer = RequestCoalescer(provider, "model", window_ms=20, max_wait_ms=100, max_batch_size=4)
+
+    asyncio.run(embed_all(coalescer, ["text"] * 10))
+
+    assert [len(call) for call in provider.calls] == [4, 4, 2]
+
+
+def test_provider_errors_reach_every_waiting_request():
+    provider = RecordingProvider(fail=True)
+    coalescer = RequestCoalescer(provider, "model", window_ms=1, max_wait_ms=5, max_batch_size=100)
+
+    results = asyncio.run(embed_all(coalescer, ["a", "b"]))
+
+    assert len(provider.calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(RuntimeError):
+        raise results[0]
+
+
+def test_lanes_and_tenants_are_never_coalesced_together():
+    provider = RecordingProvider()
+
+    async def embed(text: str, lane: str, tenant: str):
+        with request_context(lane, tenant):
+            return await coalescer_for(provider, "model").embed(text)
+
+    async def scenario():
+        return await asyncio.gather(
+            embed("a", "interactive", "one"), embed("bb", "interactive", "one"),
+            embed("ccc", "bulk", "one"), embed("dddd", "interactive", "two"),
+        )
+
+    vectors = asyncio.run(scenario())
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0]]
+    assert sorted(provider.calls) == [["a", "bb"], ["ccc"], ["dddd"]]
+    # Removed once their batches are answered, a tenant that stops calling keeps nothing
+    assert batching._coalescers == {}
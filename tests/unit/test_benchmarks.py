@@ -0,0 +1,17 @@
+from benchmarks import report
+
+
+def test_compare_reports_regressions_in_both_directions():
+    baseline = {"benchmarks": {"handler.single": {"operations": 10, "ops_per_sec": 100.0, "p99_ms": 10.0}}}
+    current = {"benchmarks": {"handler.single": {"operations": 5, "ops_per_sec": 80.0, "p99_ms": 10.5}}}
+
+    regressions = report.compare(baseline, current, threshold=0.1)
+
+    assert regressions == ["handler.single.ops_per_sec: 100 -> 80 (-20.0%)"]
+
+
+def test_summarize_percentiles():
+    summary = report.summarize([0.001 * i for i in range(1, 101)], elapsed=2.0, operations=100)
+
+    assert summary["ops_per_sec"] == 50.0
+    assert round(summary["p50_ms"], 1) == 50.5
@@ -0,0 +1,109 @@
+import asyncio
+from unittest.mock import patch
+
+import numpy as np
+
+from llm_portal import settings
+from llm_portal.adapters.embedding_cache import EmbeddingCache, text_hash
+from llm_portal.adapters.llm_providers import FakeProvider
+from llm_portal.domains import vectors
+from llm_portal.service import chunking, embedding
+
+MODEL = "fake-model-1"
+CHUNKING_SETTINGS = settings.ChunkingSettings(max_tokens=8, overlap_tokens=2)
+
+
+def count_words(text: str) -> int:
+    return 1
+
+
+def paragraph(name: str, words: int) -> str:
+    return " ".join(f"{name}{index}" for index in range(words))
+
+
+def test_texts_that_fit_are_their_own_chunk():
+    text = "  a short text \n"
+
+    assert chunking.split_text(text, 8, 2, count_words) == [chunking.Chunk(text, 0, 3)]
+
+
+def test_long_paragraphs_are_split_with_overlap():
+    text = paragraph("w", 20)
+
+    chunks = chunking.split_text(text, 8, 2, count_words)
+
+    assert [chunk.text.split() for chunk in chunks] == [
+        [f"w{index}" for index in range(0, 8)],
+        [f"w{index}" for index in range(6, 14)],
+        [f"w{index}" for index in range(12, 20)],
+    ]
+    assert all(text[chunk.start:].startswith(chunk.text) for chunk in chunks)
+
+
+def test_chunks_end_at_paragraph_breaks():
+    text = "\n\n".join([paragraph("a", 5), paragraph("b", 5), paragraph("c", 5)])
+
+    chunks = chunking.split_text(text, 8, 2, count_words)
+
+    assert [chunk.text for chunk in chunks] == [paragraph("a", 5), paragraph("b", 5), paragraph("c", 5)]
+
+
+def test_words_longer_than_a_chunk_are_cut():
+    chunks = chunking.split_text("x" * 100, 10)
+
+    assert "".join(chunk.text for chunk in chunks) == "x" * 100
+    assert all(chunk.tokens <= 10 for chunk in chunks)
+
+
+def test_editing_a_paragraph_only_re_embeds_its_chunk():
+    provider = FakeProvider(dimensions=8)
+    cache = EmbeddingCache(max_entries=100)
+    paragraphs = [paragraph("a", 5), paragraph("b", 5), paragraph("c", 5)]
+    edited = [paragraphs[0], paragraph("edited", 5), paragraphs[2]]
+
+    with patch.object(embedding.settings, "chunking_settings", lambda: CHUNKING_SETTINGS), \
+            patch.object(FakeProvider, "estimate_tokens", staticmethod(count_words)), \
+            patch.object(FakeProvider, "_vectors", side_effect=FakeProvider._vectors, autospec=True) as generated:
+        first = embedding.embed_texts(provider, cache, ["\n\n".join(paragraphs)], MODEL)
+        second = embedding.embed_texts(provider, cache, ["\n\n".join(edited)], MODEL)
+
+    assert [call.args[1] for call in generated.call_args_list] == [paragraphs, [edited[1]]]
+    assert first.keys[0] == text_hash("fake-provider", MODEL, "\n\n".join(paragraphs), pooling="mean")
+    np.testing.assert_allclose(first.vectors[0], vectors.pool(provider._vectors(paragraphs, MODEL)), rtol=1e-5)
+    assert first.chunks == second.chunks == [[]]
+
+
+def test_weighted_pooling_weighs_chunks_by_tokens():
+    provider = FakeProvider(dimensions=8)
+    text = paragraph("a", 8) + "\n\n" + paragraph("b", 2)
+
+    with patch.object(embedding.settings, "chunking_settings", lambda: CHUNKING_SETTINGS), \
+            patch.object(FakeProvider, "estimate_tokens", staticmethod(count_words)):
+        embedded = embedding.embed_texts(provider, EmbeddingCache(max_entries=0), [text], MODEL, pooling="weighted")
+
+    chunk_vectors = provider._vectors([paragraph("a", 8), paragraph("b", 2)], MODEL)
+    np.testing.assert_allclose(embedded.vectors[0], vectors.pool(chunk_vectors, [8, 2]), rtol=1e-5)
+    assert embedded.keys[0] == text_hash("fake-provider", MODEL, text, pooling="weighted")
+
+
+def test_chunks_pooling_builds_child_results():
+    provider = FakeProvider(dimensions=8)
+    texts = ["short", paragraph("w", 12)]
+
+    async def scenario():
+        return await embedding.aembed_texts(provider, EmbeddingCache(max_entries=0), texts, MODEL, pooling="chunks")
+
+    with patch.object(embedding.settings, "chunking_settings", lambda: CHUNKING_SETTINGS), \
+            patch.object(FakeProvider, "estimate_tokens", staticmethod(count_words)):
+        embedded = asyncio.run(scenario())
+
+    results = embedding.build_results(provider, ["s", "l"], texts, embedded.keys, embedded.vectors, MODEL)
+    children = embedding.build_chunk_results(provider, ["s", "l"], embedded.chunks, MODEL)
+
+    assert embedded.keys[0] == text_hash("fake-provider", MODEL, "short")
+    assert [child.id for child in children] == ["l#0", "l#1"]
+    assert {child.parent_id for child in children} == {"l"}
+    assert [child.text for child in children] == [paragraph("w", 8), " ".join(f"w{i}" for i in range(6, 12))]
+    np.testing.assert_allclose(
+        results[1].vector, vectors.pool([child.vector for child in children]), rtol=1e-5
+    )
@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from llm_portal import settings
+from llm_portal.adapters import orm, queries
+from llm_portal.adapters.unit_of_work import SqlAlchemyUnitOfWork
+from llm_portal.domains import models
+
+DATABASE_SETTINGS = settings.DatabaseSettings(pool_size=3, max_overflow=2, sqlite_busy_timeout_ms=1234)
+
+
+def test_sqlite_engines_are_pooled_in_wal_mode(tmp_path):
+    with patch.object(orm.settings, "database_settings", lambda: DATABASE_SETTINGS):
+        engine = orm.create_engine({"connection": {"url": f"sqlite:///{tmp_path / 'test.sqlite'}"}})
+
+    with engine.connect() as connection:
+        pragmas = [connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in ("journal_mode", "busy_timeout")]
+
+    assert pragmas == ["wal", 1234]
+    assert engine.pool.size() == 3
+    engine.dispose()
+
+
+def test_memory_sqlite_keeps_the_default_pool():
+    engine = orm.create_engine({"connection": {"url": "sqlite://"}})
+
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "memory"
+
+
+def test_async_engine_is_only_created_for_postgresql(database):
+    assert orm.get_async_engine() is None
+
+    enabled = settings.DatabaseSettings(async_engine=True)
+    with patch.object(orm.settings, "database_settings", lambda: enabled), pytest.raises(RuntimeError):
+        orm.get_async_engine()
+
+
+def test_async_reads_fall_back_to_the_database_thread(database):
+    queries.insert_job(models.EmbeddingJob(id="job", provider="fake-provider", model="fake-model-1", total=2))
+
+    async def scenario():
+        return await queries.aget_job("job"), await queries.aget_job("missing"), await queries.aget_results([])
+
+    job, missing, results = asyncio.run(scenario())
+
+    assert (job.id, job.status, missing, results) == ("job", models.JobStatus.QUEUED, None, [])
+
+
+def test_unit_of_work_commits_through_the_tuned_engine(tmp_path):
+    with patch.object(orm.settings, "database_settings", lambda: DATABASE_SETTINGS):
+        engine = orm.create_engine({"connection": {"url": f"sqlite:///{tmp_path / 'test.sqlite'}"}})
+    orm.metadata.create_all(engine)
+    uow = SqlAlchemyUnitOfWork()
+    orm.start_mapper()
+
+    def store(index: int):
+        with uow:
+            uow.repo.add(models.EmbeddedResult(
+                id=f"r{index}", text="text", provider="fake-provider", model="fake-model-1", dimensions=2,
+                vector=[0.5, 0.5],
+            ))
+            uow.commit()
+
+    with patch.object(orm, "_engine", engine), ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(store, range(6)))
+        stored = queries.get_results([f"r{index}" for index in range(6)])
+
+    assert [result.id for result in stored] == [f"r{index}" for index in range(6)]
+    # Sessions of every thread were taken from the pool of the engine
+    assert 0 < engine.pool.checkedin() <= DATABASE_SETTINGS.pool_size
+    engine.dispose()
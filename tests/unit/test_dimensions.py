@@ -0,0 +1,115 @@
+import asyncio
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from llm_portal import settings
+from llm_portal.adapters.embedding_cache import EmbeddingCache, text_hash
+from llm_portal.adapters.llm_providers import FakeProvider, LocalProvider, RoutedProvider
+from llm_portal.domains import models, vectors
+from llm_portal.service import embedding
+from llm_portal.service.search import IndexRegistry
+
+MODEL = "fake-model-1"
+
+
+def test_truncate_keeps_the_prefix_at_unit_length():
+    matrix = np.array([[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]])
+
+    truncated = vectors.truncate(matrix, 2)
+
+    assert truncated.shape == (2, 2)
+    np.testing.assert_allclose(truncated[0], [0.6, 0.8])
+    # A zero prefix stays zero rather than becoming NaN
+    np.testing.assert_array_equal(truncated[1], [0.0, 0.0])
+
+
+@pytest.mark.parametrize("native", [False, True])
+def test_reduced_vectors_are_the_renormalized_prefix_of_full_vectors(native):
+    provider = FakeProvider(dimensions=16, supported_dimensions=(4, 8), native_dimensions=native)
+
+    full = np.array(provider.generate_embeddings_batched(["a", "b"], MODEL))
+    reduced = np.array(provider.generate_embeddings_batched(["a", "b"], MODEL, 4))
+    areduced = np.array(asyncio.run(provider.agenerate_embeddings_batched(["a", "b"], MODEL, 4)))
+
+    assert reduced.shape == (2, 4)
+    np.testing.assert_allclose(reduced, vectors.truncate(full, 4), rtol=1e-5)
+    np.testing.assert_allclose(areduced, reduced)
+    np.testing.assert_allclose(np.linalg.norm(reduced, axis=1), 1.0, rtol=1e-5)
+
+
+def test_only_native_models_get_the_dimensions_keyword():
+    native = FakeProvider(dimensions=16, supported_dimensions=(4,), native_dimensions=True)
+    truncated = FakeProvider(dimensions=16, supported_dimensions=(4,))
+
+    with patch.object(FakeProvider, "_vectors", side_effect=FakeProvider._vectors, autospec=True) as generated:
+        native.generate_embeddings_batched(["a"], MODEL, 4)
+        truncated.generate_embeddings_batched(["a"], MODEL, 4)
+
+    assert [call.args[3] for call in generated.call_args_list] == [4, None]
+
+
+def test_unsupported_dimensions_are_rejected():
+    provider = FakeProvider(dimensions=16, supported_dimensions=(4, 8))
+
+    assert provider.supported_dimensions(MODEL) == [4, 8, 16]
+    assert provider.reduced_dimensions(MODEL, None) is None
+    assert provider.reduced_dimensions(MODEL, 16) is None
+    with pytest.raises(ValueError):
+        provider.generate_embeddings_batched(["a"], MODEL, 5)
+
+
+def test_local_models_declare_their_reduced_dimensions():
+    model = settings.LocalModelSettings(dimensions=64, supported_dimensions=[16, 32])
+    provider = LocalProvider(models={"hashing": model})
+
+    assert provider.supported_dimensions("hashing") == [16, 32, 64]
+    assert not provider.native_dimensions("hashing")
+    assert np.array(provider.generate_embeddings_batched(["some text"], "hashing", 16)).shape == (1, 16)
+
+
+def test_routes_serve_the_dimensions_of_every_backend():
+    routed = RoutedProvider(
+        "route",
+        [
+            FakeProvider("a", dimensions=16, supported_dimensions=(4, 8), native_dimensions=True),
+            FakeProvider("b", dimensions=16, supported_dimensions=(8,)),
+        ],
+    )
+
+    assert routed.supported_dimensions(MODEL) == [8, 16]
+    assert not routed.native_dimensions(MODEL)
+    assert np.array(routed.generate_embeddings_batched(["a"], MODEL, 8)).shape == (1, 8)
+
+
+def test_reduced_vectors_are_cached_and_stored_apart():
+    provider = FakeProvider(dimensions=16, supported_dimensions=(4,))
+    cache = EmbeddingCache(max_entries=100)
+
+    full_keys, full = embedding.embed_with_cache(provider, cache, ["a"], MODEL)
+    keys, reduced = embedding.embed_with_cache(provider, cache, ["a"], MODEL, 4)
+    results = embedding.build_results(provider, ["id"], ["a"], keys, reduced, MODEL, 4)
+
+    assert full_keys == [text_hash("fake-provider", MODEL, "a")]
+    assert keys == [text_hash("fake-provider", MODEL, "a", 4)] != full_keys
+    assert (len(full[0]), len(reduced[0])) == (16, 4)
+    assert results[0].dimensions == 4
+
+
+def test_search_indexes_are_kept_per_dimensions():
+    loaded = []
+
+    def loader(provider, model, dimensions, since):
+        loaded.append(dimensions)
+        return iter(())
+
+    registry = IndexRegistry(loader)
+    full = registry.get("p", MODEL, 16)
+    reduced = registry.get("p", MODEL, 4)
+    registry.add_results(
+        [models.EmbeddedResult("id", "a", "p", MODEL, 4, vectors.truncate([[1.0] * 16], 4)[0], text_hash="h")]
+    )
+
+    assert loaded == [16, 4]
+    assert (len(full), len(reduced)) == (0, 1)
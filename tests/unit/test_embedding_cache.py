@@ -0,0 +1,57 @@
+import threading
+import time
+
+from llm_portal.adapters.embedding_cache import EmbeddingCache, text_hash
+
+
+def test_text_hash_is_content_addressed():
+    assert text_hash("vertexai", "model", "Hello") == text_hash("vertexai", "model", "  Hello\n")
+    assert text_hash("vertexai", "model", "Hello") != text_hash("vertexai", "other-model", "Hello")
+    assert text_hash("vertexai", "model", "Hello") != text_hash("other", "model", "Hello")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]
+
+    cache.put("c", [3.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_falls_back_to_store_lookup():
+    stored = {"a": [1.0]}
+    cache = EmbeddingCache(max_entries=10, store_lookup=stored.get)
+
+    assert cache.get_or_compute("a", lambda: [0.0]) == [1.0]
+    assert cache.get("a") == [1.0]
+
+    stats = cache.stats()
+    assert stats["store_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 0
+
+
+def test_concurrent_identical_requests_share_one_computation():
+    cache = EmbeddingCache(max_entries=10)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return [1.0]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("a", compute))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [[1.0]] * 5
+    assert cache.stats()["shared"] + cache.stats()["memory_hits"] == 4
@@ -0,0 +1,127 @@
+import asyncio
+import io
+from datetime import datetime
+from unittest.mock import patch
+
+import fastapi
+import numpy as np
+import pytest
+
+from llm_portal.adapters import export, queries
+from llm_portal.domains import models
+from llm_portal.entrypoints.rest.routers import export as export_router
+
+
+def _store(count: int, dimensions: int = 3, created_time: datetime = datetime(2024, 1, 1)):
+    results = []
+    for index in range(count):
+        result = models.EmbeddedResult(
+            id=f"id-{index:03d}",
+            text=f"text {index}",
+            provider="fake-provider",
+            model="fake-model-1",
+            dimensions=dimensions,
+            vector=np.full(dimensions, index, dtype=np.float32),
+        )
+        result.created_time = created_time
+        results.append(result)
+    queries.insert_results(results)
+
+
+def test_npy_export_is_memory_mappable(database, tmp_path):
+    _store(25)
+
+    count, paths = export.export_files(tmp_path / "vectors", "npy", "fake-provider", "fake-model-1", batch_size=7)
+    matrix, ids = export.load_npy(tmp_path / "vectors")
+
+    assert count == 25
+    assert [path.name for path in paths] == ["vectors.npy", "vectors.ids.txt"]
+    assert matrix.shape == (25, 3) and matrix.dtype == np.float32
+    assert ids == [f"id-{index:03d}" for index in range(25)]
+    assert matrix[:, 0].tolist() == list(range(25))
+
+
+def test_streamed_npy_matches_the_ids_sidecar(database):
+    _store(10)
+
+    data = b"".join(export.iter_export("npy", "fake-provider", "fake-model-1", batch_size=3))
+    ids = b"".join(export.iter_export("ids", "fake-provider", "fake-model-1", batch_size=3)).decode().splitlines()
+
+    matrix = np.lib.format.read_array(io.BytesIO(data))
+    assert matrix.shape == (10, 3)
+    assert ids == [f"id-{index:03d}" for index in range(10)]
+
+
+def test_time_range_filter(database):
+    _store(3, created_time=datetime(2024, 1, 1))
+    queries.insert_results([
+        models.EmbeddedResult(
+            id="late", text="late", provider="fake-provider", model="fake-model-1", dimensions=3, vector=[1, 2, 3]
+        )
+    ])
+
+    ids = b"".join(
+        export.iter_export("ids", "fake-provider", "fake-model-1", since=datetime(2025, 1, 1))
+    ).decode().splitlines()
+
+    assert ids == ["late"]
+
+
+def test_models_stored_at_several_sizes_are_exported_one_size_at_a_time(database):
+    _store(3)
+    queries.insert_results([
+        models.EmbeddedResult(
+            id="reduced", text="reduced", provider="fake-provider", model="fake-model-1", dimensions=2, vector=[1, 2]
+        )
+    ])
+
+    with pytest.raises(ValueError, match=r"stored at dimensions \[2, 3\]"):
+        b"".join(export.iter_export("npy", "fake-provider", "fake-model-1"))
+    data = b"".join(export.iter_export("npy", "fake-provider", "fake-model-1", dimensions=2))
+
+    assert np.lib.format.read_array(io.BytesIO(data)).tolist() == [[1, 2]]
+    assert queries.stored_dimensions("fake-provider", "fake-model-1", since=datetime(2025, 1, 1)) == 2
+
+
+def test_empty_npy_export(database):
+    data = b"".join(export.iter_export("npy", "fake-provider", "fake-model-1"))
+
+    assert np.lib.format.read_array(io.BytesIO(data)).shape == (0, 0)
+
+
+@pytest.mark.parametrize("export_format", ["arrow", "parquet"])
+def test_arrow_and_parquet_exports(database, tmp_path, export_format):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    ipc = pytest.importorskip("pyarrow.ipc")
+
+    _store(12)
+
+    export.export_files(
+        tmp_path / "vectors", export_format, "fake-provider", "fake-model-1", include_text=True, batch_size=5
+    )
+    path = tmp_path / f"vectors.{export_format}"
+    if export_format == "arrow":
+        table = ipc.open_stream(path.read_bytes()).read_all()
+    else:
+        table = parquet.read_table(path)
+
+    assert table.num_rows == 12
+    assert table.column_names == ["id", "text", "created_time", "vector"]
+    assert table.schema.metadata[b"model"] == b"fake-model-1"
+    vectors = np.asarray(table.column("vector").combine_chunks().flatten()).reshape(12, 3)
+    assert vectors[:, 0].tolist() == list(range(12))
+
+
+def test_arrow_exports_without_pyarrow_fail_before_writing(database, tmp_path):
+    _store(2)
+
+    with patch.dict("sys.modules", {"pyarrow": None, "pyarrow.parquet": None}):
+        with pytest.raises(RuntimeError, match=r"llm-portal\[export\]"):
+            export.export_files(tmp_path / "vectors", "parquet", "fake-provider", "fake-model-1")
+        with pytest.raises(fastapi.HTTPException) as raised:
+            asyncio.run(export_router.export_embeddings(
+                "fake-provider", "fake-model-1", "arrow", batch_size=10, dimensions=3
+            ))
+
+    assert raised.value.status_code == 501
+    assert list(tmp_path.iterdir()) == []
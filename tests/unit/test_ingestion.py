@@ -0,0 +1,123 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+from llm_portal.adapters.embedding_cache import EmbeddingCache
+from llm_portal.adapters.llm_providers import FakeProvider
+from llm_portal.service import ingestion
+
+MODEL = "fake-model-1"
+
+
+async def _chunks(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+def _ingest(data: bytes, input_format: str = "ndjson", batch_size: int = 2, workers: int = 2):
+    stored = []
+
+    async def persist(uow, results):
+        stored.extend(results)
+
+    pipeline = ingestion.IngestionPipeline(
+        FakeProvider(dimensions=4),
+        MODEL,
+        uow=None,
+        cache=EmbeddingCache(max_entries=100),
+        id_prefix="upload",
+        result_line=lambda result, record: {"id": result.id, "index": record.index},
+        batch_size=batch_size,
+        queue_batches=1,
+        workers=workers,
+    )
+    records = ingestion.parse_records(_chunks(data), input_format, max_line_bytes=100)
+    with patch.object(ingestion.persistence, "persist", persist):
+        lines = asyncio.run(_collect(pipeline.run(records)))
+    return lines, stored
+
+
+def test_lines_are_split_across_chunks():
+    lines = asyncio.run(_collect(ingestion.iter_lines(_chunks(b"first line\r\nsecond\n\nlast", 3), 100)))
+
+    assert lines == ["first line", "second", "", "last"]
+
+
+def test_long_lines_are_reported_and_skipped():
+    data = b"short\n" + b"x" * 50 + b"\nafter\n"
+    lines = asyncio.run(_collect(ingestion.iter_lines(_chunks(data, 4), 10)))
+
+    assert lines[0] == "short"
+    assert isinstance(lines[1], ingestion.IngestFailure) and lines[1].line == 2
+    assert lines[2] == "after"
+
+
+def test_ndjson_upload_is_embedded_and_persisted():
+    data = "\n".join(json.dumps(item) for item in [
+        {"id": "a", "text": "hello"},
+        {"text": "world"},
+        {"id": "c", "text": "hello"},
+        {"text": "again"},
+        {"text": "bye"},
+    ]).encode()
+
+    lines, stored = _ingest(data)
+
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1, 2, 3, 4]
+    assert {result.id for result in stored} == {"upload:a", "upload-1", "upload:c", "upload-3", "upload-4"}
+    assert lines[-1]["summary"]["embedded"] == 5
+    assert lines[-1]["summary"]["received"] == 5
+
+
+def test_invalid_records_become_error_lines():
+    data = b'{"text": "ok"}\nnot json\n{"id": "x"}\n'
+
+    lines, stored = _ingest(data)
+
+    errors = [line for line in lines if "error" in line]
+    assert [error["line"] for error in errors] == [2, 3]
+    assert len(stored) == 1
+    assert lines[-1]["summary"]["invalid"] == 2
+
+
+def test_duplicate_and_long_ids_are_rejected():
+    data = "\n".join(json.dumps(item) for item in [
+        {"id": "a", "text": "first"},
+        {"id": "a", "text": "again"},
+        {"id": "x" * (ingestion.MAX_ID_LENGTH + 1), "text": "long"},
+        {"id": 1, "text": "numeric"},
+    ]).encode()
+
+    lines, stored = _ingest(data)
+
+    errors = [line for line in lines if "error" in line]
+    assert errors == [
+        {"index": 1, "error": "Duplicate id a"},
+        {"line": 3, "error": f"Id longer than {ingestion.MAX_ID_LENGTH} characters"},
+    ]
+    assert sorted(result.id for result in stored) == ["upload:1", "upload:a"]
+    assert lines[-1]["summary"]["invalid"] == 2
+
+
+def test_csv_upload_with_multiline_fields():
+    data = b'id,text\n1,plain\n2,"two\nlines, quoted"\n'
+
+    lines, stored = _ingest(data, input_format="csv")
+
+    assert {result.id: result.text for result in stored} == {"upload:1": "plain", "upload:2": "two\nlines, quoted"}
+
+
+def test_failed_batches_are_reported_and_the_upload_continues():
+    data = "\n".join(json.dumps({"text": f"text {i}"}) for i in range(4)).encode()
+
+    with patch.object(FakeProvider, "agenerate_embeddings", side_effect=[RuntimeError("down"), [[0.0] * 4] * 2]):
+        lines, stored = _ingest(data, workers=1)
+
+    assert lines[0]["error"] == "down"
+    assert lines[-1]["summary"]["failed"] == 2
+    assert lines[-1]["summary"]["embedded"] == 2
+    assert len(stored) == 2
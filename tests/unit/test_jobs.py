@@ -0,0 +1,185 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from llm_portal import settings
+from llm_portal.adapters import queries
+from llm_portal.adapters.broker import InMemoryBroker
+from llm_portal.adapters.embedding_cache import EmbeddingCache
+from llm_portal.adapters.llm_providers import FakeProvider
+from llm_portal.domains import commands, models
+from llm_portal.service import jobs
+
+MODEL = "fake-model-1"
+JOB_SETTINGS = settings.JobSettings(chunk_size=2, worker_concurrency=2)
+
+
+@pytest.fixture
+def provider():
+    fake_provider = FakeProvider(dimensions=4)
+    cache = EmbeddingCache(max_entries=100)
+    with patch.object(jobs, "llm_provider_factory", lambda provider_name: fake_provider), \
+            patch.object(jobs, "get_embedding_cache", lambda: cache), \
+            patch.object(jobs.settings, "job_settings", lambda: JOB_SETTINGS):
+        yield fake_provider
+
+
+def test_in_memory_broker_delivers_each_message_once_per_group():
+    broker = InMemoryBroker()
+
+    async def scenario():
+        await broker.publish("topic", {"n": 1})
+        await broker.publish("topic", {"n": 2})
+        first = await broker.consume("topic", "group", "a", count=1, block_ms=0)
+        second = await broker.consume("topic", "group", "b", count=5, block_ms=0)
+        empty = await broker.consume("topic", "group", "a", count=5, block_ms=10)
+        return first, second, empty
+
+    first, second, empty = asyncio.run(scenario())
+
+    assert [message.body for message in first + second] == [{"n": 1}, {"n": 2}]
+    assert empty == []
+
+
+def test_in_memory_broker_redelivers_unacknowledged_messages():
+    broker = InMemoryBroker(visibility_timeout_ms=20)
+
+    async def scenario():
+        await broker.publish("topic", {"n": 1})
+        first = await broker.consume("topic", "group", "a", count=1, block_ms=0)
+        await asyncio.sleep(0.03)
+        again = await broker.consume("topic", "group", "b", count=1, block_ms=0)
+        await broker.ack("topic", "group", again[0].id)
+        await asyncio.sleep(0.03)
+        after_ack = await broker.consume("topic", "group", "b", count=1, block_ms=0)
+        return first, again, after_ack
+
+    first, again, after_ack = asyncio.run(scenario())
+
+    assert again[0].id == first[0].id
+    assert again[0].deliveries == 2
+    assert after_ack == []
+
+
+def test_in_memory_broker_caps_topics_nothing_reads():
+    broker = InMemoryBroker(max_backlog=3)
+
+    async def scenario():
+        for n in range(5):
+            await broker.publish("topic", {"n": n})
+        first = await broker.consume("topic", "group", "a", count=10, block_ms=0)
+        for n in range(5, 10):
+            await broker.publish("topic", {"n": n})
+        return first, await broker.consume("topic", "group", "a", count=10, block_ms=0)
+
+    first, rest = asyncio.run(scenario())
+
+    assert [message.body["n"] for message in first] == [2, 3, 4]
+    # Once a group reads the topic nothing is dropped
+    assert [message.body["n"] for message in rest] == [5, 6, 7, 8, 9]
+
+
+def test_consume_waits_for_a_publish():
+    broker = InMemoryBroker()
+
+    async def scenario():
+        consumer = asyncio.create_task(broker.consume("topic", "group", "a", count=1, block_ms=1000))
+        await asyncio.sleep(0.01)
+        await broker.publish("topic", {"n": 1})
+        return await asyncio.wait_for(consumer, 0.5)
+
+    assert asyncio.run(scenario())[0].body == {"n": 1}
+
+
+def test_job_is_processed_by_a_worker(database, provider):
+    broker = InMemoryBroker()
+    command = commands.SubmitEmbeddingJobCommand(
+        texts=["a", "b", "c", "a", "e"], provider_name="fake-provider", embedding_model=MODEL
+    )
+
+    async def scenario():
+        job = await jobs.submit(command, broker)
+        queued = queries.get_job(job.id)
+        worker = jobs.Worker(broker, concurrency=2)
+        worker.start()
+        for _ in range(200):
+            # Polled on the database thread, the memory database has a single connection
+            if (await queries.aget_job(job.id)).done:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        return queued, queries.get_job(job.id)
+
+    queued, job = asyncio.run(scenario())
+
+    assert queued.status == models.JobStatus.QUEUED
+    assert job.status == models.JobStatus.SUCCEEDED
+    assert (job.completed, job.failed) == (5, 0)
+    results = queries.get_results(job.result_ids())
+    assert [result.text for result in results] == command.texts
+    assert results[0].vector.tolist() == results[3].vector.tolist()
+
+
+def test_redelivered_chunks_are_not_counted_twice(database, provider):
+    job = models.EmbeddingJob(id="job", provider="fake-provider", model=MODEL, total=2)
+    queries.insert_job(job)
+    chunk = {
+        "job_id": "job", "provider_name": "fake-provider", "embedding_model": MODEL, "start": 0, "texts": ["a", "b"]
+    }
+
+    async def scenario():
+        await jobs.process_chunk(chunk)
+        await jobs.process_chunk(chunk)
+
+    asyncio.run(scenario())
+
+    assert queries.get_job(job.id).completed == 2
+
+
+def test_concurrent_deliveries_of_a_chunk_are_counted_once(database, provider):
+    job = models.EmbeddingJob(id="job", provider="fake-provider", model=MODEL, total=2)
+    queries.insert_job(job)
+    chunk = {
+        "job_id": "job", "provider_name": "fake-provider", "embedding_model": MODEL, "start": 0, "texts": ["a", "b"]
+    }
+
+    async def scenario():
+        await jobs.process_chunk(chunk)
+        # The second delivery checked for stored results before the first one stored them
+        with patch.object(queries, "existing_result_ids", return_value=set()):
+            await jobs.process_chunk(chunk)
+
+    asyncio.run(scenario())
+
+    job = queries.get_job(job.id)
+    assert job.status == models.JobStatus.SUCCEEDED
+    assert (job.completed, job.failed) == (2, 0)
+
+
+def test_failed_chunks_fail_the_job(database, provider):
+    job = models.EmbeddingJob(id="job", provider="fake-provider", model=MODEL, total=3)
+    queries.insert_job(job)
+
+    async def scenario():
+        await jobs.process_chunk(
+            {"job_id": "job", "provider_name": "fake-provider", "embedding_model": MODEL, "start": 0, "texts": ["a"]}
+        )
+        with patch.object(FakeProvider, "agenerate_embeddings", side_effect=RuntimeError("down")):
+            await jobs.process_chunk(
+                {"job_id": "job", "provider_name": "fake-provider", "embedding_model": MODEL, "start": 1,
+                 "texts": ["b", "c"]}
+            )
+
+    asyncio.run(scenario())
+
+    job = queries.get_job("job")
+    assert job.status == models.JobStatus.FAILED
+    assert (job.completed, job.failed, job.error) == (1, 2, "down")
+
+
+def test_submit_rejects_unknown_models(provider):
+    command = commands.SubmitEmbeddingJobCommand(texts=["a"], provider_name="fake-provider", embedding_model="nope")
+
+    with pytest.raises(ValueError):
+        asyncio.run(jobs.submit(command, InMemoryBroker()))
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import sqlalchemy
+
+from llm_portal import settings
+from llm_portal.adapters import orm, queries
+from llm_portal.adapters.embedding_cache import text_hash
+from llm_portal.domains import models
+from llm_portal.service import lifecycle, search
+
+NOW = datetime.now()
+
+
+def result(result_id: str, text: str, age_days: float, provider: str = "fake-provider", model: str = "fake-model-1",
+           key: str | None = "hash", parent_id: str | None = None) -> models.EmbeddedResult:
+    stored = models.EmbeddedResult(
+        id=result_id,
+        text=text,
+        text_hash=text_hash(provider, model, text) if key == "hash" else key,
+        parent_id=parent_id,
+        provider=provider,
+        model=model,
+        dimensions=4,
+        vector=[0.1, 0.2, 0.3, 0.4],
+    )
+    stored.created_time = NOW - timedelta(days=age_days)
+    return stored
+
+
+def stored_ids(engine) -> list[str]:
+    with engine.connect() as connection:
+        return sorted(connection.execute(sqlalchemy.select(orm.embedded_results.c.id)).scalars())
+
+
+def test_ttl_of_a_model_falls_back_to_the_provider_default():
+    retention = settings.RetentionSettings(ttl_days={"vertexai": {"text-embedding-005": 30, "default": 7}})
+
+    assert retention.ttl("vertexai", "text-embedding-005") == timedelta(days=30)
+    assert retention.ttl("vertexai", "other-model") == timedelta(days=7)
+    assert retention.ttl("local", "hashing-768") is None
+
+
+def test_results_expire_with_their_chunks(database):
+    queries.insert_results([
+        result("old", "old text", 40),
+        result("old-0", "old", 40, parent_id="old"),
+        result("new", "new text", 1),
+        result("kept", "other provider", 400, provider="local"),
+    ])
+    retention = settings.RetentionSettings(ttl_days={"fake-provider": {"default": 30}}, batch_size=1, batch_pause_ms=0)
+
+    report = asyncio.run(lifecycle.run_lifecycle(retention))
+
+    assert report == lifecycle.LifecycleReport(expired=1)
+    assert stored_ids(database) == ["kept", "new"]
+
+
+def test_compaction_keeps_the_oldest_result_of_each_text(database):
+    queries.insert_results([
+        result("first", "hello", 30),
+        result("second", "hello", 20),
+        result("second-0", "hel", 20, parent_id="second"),
+        result("recent", "hello", 1),
+        result("legacy", "world", 50, key=None),
+        result("copy", "world", 10),
+        result("unique", "unique", 10),
+    ])
+    retention = settings.RetentionSettings(compaction=True, min_age_days=7, batch_size=2, batch_pause_ms=0)
+
+    with patch.object(lifecycle.search.get_index_registry(), "evict") as evict:
+        report = asyncio.run(lifecycle.run_lifecycle(retention))
+
+    assert report == lifecycle.LifecycleReport(hashed=1, compacted=2)
+    # Duplicates younger than min_age_days are kept, chunks go with their text
+    assert stored_ids(database) == ["first", "legacy", "recent", "unique"]
+    assert queries.get_results(["legacy"])[0].text_hash == text_hash("fake-provider", "fake-model-1", "world")
+    evict.assert_called_once_with({("fake-provider", "fake-model-1", 4)})
+    assert asyncio.run(lifecycle.run_lifecycle(retention)) == lifecycle.LifecycleReport()
+
+
+def test_indexes_follow_the_results_stored_and_deleted_by_other_processes(database):
+    def created_now(result_id: str) -> models.EmbeddedResult:
+        stored = result(result_id, result_id, 0)
+        stored.created_time = datetime.now()
+        return stored
+
+    # Only sees what other processes do through storage
+    registry = search.IndexRegistry(
+        lambda provider, model, dimensions, since: queries.iter_vectors(provider, model, 10, dimensions, since=since),
+        version=queries.index_version,
+        refresh_interval_ms=0,
+    )
+    key = ("fake-provider", "fake-model-1", 4)
+    queries.insert_results([created_now("first")])
+    index = registry.get(*key)
+    assert len(index) == 1
+
+    queries.insert_results([created_now("second")])
+    assert registry.get(*key) is index and len(index) == 2
+
+    queries.delete_results(["first"])
+    reloaded = registry.get(*key)
+    assert reloaded is not index
+    assert [hit.id for hit in reloaded.search([0.1, 0.2, 0.3, 0.4], top_k=10)] == ["second"]
+    assert queries.index_version(*key) == 1
+
+
+def test_space_of_deleted_results_is_reclaimed(tmp_path):
+    engine = orm.create_engine({"connection": {"url": f"sqlite:///{tmp_path / 'results.sqlite'}"}})
+    orm.metadata.create_all(engine)
+    with patch.object(orm, "_engine", engine):
+        queries.insert_results([result(f"r{index}", "x" * 2000, 30) for index in range(500)])
+        queries.delete_results([f"r{index}" for index in range(500)])
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql("PRAGMA freelist_count").scalar() > 100
+
+        while queries.reclaim_space(100):
+            pass
+
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql("PRAGMA freelist_count").scalar() == 0
+    engine.dispose()
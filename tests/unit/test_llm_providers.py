@@ -0,0 +1,98 @@
+import asyncio
+import random
+from typing import List
+
+import numpy as np
+import pytest
+
+from llm_portal.adapters.llm_providers import FakeProvider, Latency, LLMProvider, RateLimitError
+
+
+class CountingProvider(LLMProvider):
+    def __init__(self):
+        super().__init__("counting")
+        self._embedding_models = {
+            "small-batch": {"dimensions": 2, "max_batch_size": 3, "max_batch_tokens": 1000},
+            "small-tokens": {"dimensions": 2, "max_batch_size": 250, "max_batch_tokens": 10},
+        }
+        self.calls = []
+
+    @property
+    def available_models(self) -> List[str]:
+        return list(self._embedding_models.keys())
+
+    def generate_embeddings(self, list_texts: list[str], model: str = None) -> List[List[float]]:
+        self.calls.append(list_texts)
+        return [[float(len(text)), 1.0] for text in list_texts]
+
+
+@pytest.fixture
+def provider() -> CountingProvider:
+    return CountingProvider()
+
+
+def test_split_batches_respects_text_count(provider: CountingProvider):
+    texts = [f"text {i}" for i in range(7)]
+
+    batches = list(provider.split_batches(texts, "small-batch"))
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [text for batch in batches for text in batch] == texts
+
+
+def test_split_batches_respects_token_limit(provider: CountingProvider):
+    texts = ["a" * 16, "b" * 16, "c" * 40, "d"]
+
+    batches = list(provider.split_batches(texts, "small-tokens"))
+
+    assert batches == [["a" * 16, "b" * 16], ["c" * 40], ["d"]]
+
+
+def test_generate_embeddings_batched_keeps_input_order(provider: CountingProvider):
+    texts = ["x" * i for i in range(1, 8)]
+
+    vectors = provider.generate_embeddings_batched(texts, "small-batch")
+
+    assert len(provider.calls) == 3
+    assert [vector[0] for vector in vectors] == [float(i) for i in range(1, 8)]
+
+
+def test_generate_embeddings_batched_rejects_unknown_model(provider: CountingProvider):
+    with pytest.raises(ValueError):
+        provider.generate_embeddings_batched(["text"], "unknown")
+
+
+def test_agenerate_embeddings_batched_offloads_sync_provider(provider: CountingProvider):
+    texts = ["x" * i for i in range(1, 8)]
+
+    vectors = asyncio.run(provider.agenerate_embeddings_batched(texts, "small-batch"))
+
+    assert len(provider.calls) == 3
+    assert [vector[0] for vector in vectors] == [float(i) for i in range(1, 8)]
+
+
+def test_fake_provider_is_deterministic():
+    provider = FakeProvider(dimensions=8)
+
+    first, second, other = provider.generate_embeddings(["hello", "hello", "world"], "fake-model-1")
+
+    assert first == second
+    assert first != other
+    assert np.isclose(np.linalg.norm(first), 1.0)
+
+
+def test_fake_provider_injects_rate_limit_errors():
+    provider = FakeProvider(dimensions=8, rate_limit_probability=1.0)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(provider.agenerate_embeddings(["hello"], "fake-model-1"))
+
+
+def test_fake_provider_latency_is_reproducible():
+    latency = Latency("lognormal", mean_ms=10, per_text_ms=1)
+
+    first = [latency.sample(random.Random(1), 4) for _ in range(3)]
+    second = [latency.sample(random.Random(1), 4) for _ in range(3)]
+
+    assert first == second
+    assert all(sample > 0.004 for sample in first)
@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from llm_portal import settings
+from llm_portal.adapters.llm_providers import LocalProvider
+from llm_portal.adapters.provider_factory import create_llm_provider
+
+
+@pytest.fixture
+def provider() -> LocalProvider:
+    return LocalProvider(
+        models={
+            "hashing-64": settings.LocalModelSettings(method="hashing", dimensions=64),
+            "projection-32": settings.LocalModelSettings(
+                method="random_projection", dimensions=32, hashed_features=256
+            ),
+        }
+    )
+
+
+@pytest.mark.parametrize("model, dimensions", [("hashing-64", 64), ("projection-32", 32)])
+def test_vectors_are_deterministic_unit_vectors(provider: LocalProvider, model: str, dimensions: int):
+    texts = ["The quick brown fox", "jumps over the lazy dog", ""]
+
+    vectors = np.asarray(provider.generate_embeddings(texts, model))
+
+    assert vectors.shape == (3, dimensions)
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert not vectors[2].any()
+    assert np.array_equal(vectors, LocalProvider(models=provider._model_settings).generate_embeddings(texts, model))
+
+
+def test_batches_match_single_texts(provider: LocalProvider):
+    texts = [f"document number {i}" for i in range(10)]
+
+    batched = asyncio.run(provider.agenerate_embeddings(texts, "projection-32"))
+    single = [provider.generate_embeddings([text], "projection-32")[0] for text in texts]
+
+    assert np.allclose(batched, single)
+
+
+def test_similar_texts_are_closer(provider: LocalProvider):
+    base, near, far = np.asarray(
+        provider.generate_embeddings(
+            ["embedding service for search", "an embedding service for searching", "weather in Paris tomorrow"],
+            "hashing-64",
+        )
+    )
+
+    assert base @ near > base @ far
+
+
+def test_local_provider_is_registered():
+    provider = create_llm_provider("local")
+
+    assert isinstance(provider, LocalProvider)
+    assert "hashing-768" in provider.available_models
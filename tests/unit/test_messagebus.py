@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+import pytest
+
+from llm_portal.domains import commands
+from llm_portal.service.messagebus import AsyncMessageBus
+
+
+@pytest.fixture
+def command() -> commands.InputTextCommand:
+    return commands.InputTextCommand(text="Hello", provider_name="fake-provider", embedding_model="fake-model-1")
+
+
+def test_async_handler_is_awaited_with_injected_dependencies(command: commands.InputTextCommand):
+    async def handler(command, uow):
+        return command.text, uow
+
+    bus = AsyncMessageBus({commands.InputTextCommand: handler}, {"uow": "uow", "publisher": "publisher"})
+
+    assert asyncio.run(bus.handle(command)) == ("Hello", "uow")
+
+
+def test_sync_handler_runs_off_the_event_loop(command: commands.InputTextCommand):
+    def handler(command, uow):
+        return threading.current_thread().name
+
+    bus = AsyncMessageBus({commands.InputTextCommand: handler}, {"uow": "uow"})
+
+    assert asyncio.run(bus.handle(command)) != threading.current_thread().name
+
+
+def test_unknown_command_is_rejected(command: commands.InputTextCommand):
+    bus = AsyncMessageBus({}, {})
+
+    with pytest.raises(ValueError):
+        asyncio.run(bus.handle(command))
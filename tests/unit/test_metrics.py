@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from llm_portal import metrics
+from llm_portal.domains import commands
+from llm_portal.service.messagebus import AsyncMessageBus
+from tests.unit.test_llm_providers import CountingProvider
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.register(metrics.Histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0)))
+
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(5.0, stage="a")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="a"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    registry = metrics.Registry()
+    counter = registry.register(metrics.Counter("errors_total", "Errors", ("type",)))
+
+    counter.inc(type='say "hi"\n')
+
+    assert 'errors_total{type="say \\"hi\\"\\n"} 1.0' in registry.render()
+
+
+def test_provider_calls_are_instrumented():
+    provider = CountingProvider()
+    labels = {"provider": "counting", "model": "small-batch"}
+    calls = metrics.PROVIDER_CALLS.value(**labels)
+    texts = metrics.TEXTS_EMBEDDED.value(**labels)
+
+    provider.generate_embeddings_batched([f"text {i}" for i in range(7)], "small-batch")
+    asyncio.run(provider.agenerate_embeddings(["text"], "small-batch"))
+
+    assert metrics.PROVIDER_CALLS.value(**labels) == calls + 4
+    assert metrics.TEXTS_EMBEDDED.value(**labels) == texts + 8
+
+
+def test_message_bus_counts_errors_and_in_flight():
+    command = commands.InputTextCommand(text="Hello", provider_name="fake-provider", embedding_model="fake-model-1")
+    labels = {"stage": "handler", "provider": "fake-provider", "model": "fake-model-1", "type": "RuntimeError"}
+    errors = metrics.ERRORS.value(**labels)
+
+    async def handler(command):
+        assert metrics.IN_FLIGHT.value(command="InputTextCommand") >= 1
+        raise RuntimeError("boom")
+
+    bus = AsyncMessageBus({commands.InputTextCommand: handler}, {})
+    with pytest.raises(RuntimeError):
+        asyncio.run(bus.handle(command))
+
+    assert metrics.ERRORS.value(**labels) == errors + 1
+    assert metrics.IN_FLIGHT.value(command="InputTextCommand") == 0
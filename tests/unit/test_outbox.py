@@ -0,0 +1,136 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+import sqlalchemy
+import utils
+
+from llm_portal import settings
+from llm_portal.adapters import broker as broker_module
+from llm_portal.adapters import orm, queries
+from llm_portal.adapters.broker import InMemoryBroker, LazyBroker
+from llm_portal.adapters.llm_providers import FakeProvider
+from llm_portal.service import embedding, outbox
+
+MODEL = "fake-model-1"
+
+
+def created_results(count: int, start: int = 0):
+    provider = FakeProvider(dimensions=4)
+    return embedding.build_results(
+        provider,
+        [f"r{index}" for index in range(start, start + count)],
+        [f"text {index}" for index in range(start, start + count)],
+        [f"hash {index}" for index in range(start, start + count)],
+        [[0.1 * index] * 4 for index in range(start, start + count)],
+        MODEL,
+        dimensions=4,
+    )
+
+
+def outbox_size(engine) -> int:
+    with engine.connect() as connection:
+        return connection.execute(sqlalchemy.select(sqlalchemy.func.count()).select_from(orm.event_outbox)).scalar()
+
+
+async def published(broker: InMemoryBroker) -> list[dict]:
+    messages = await broker.consume(settings.EventSettings().topic, "test", "test", count=100, block_ms=0)
+    return [message.body for message in messages]
+
+
+def test_results_and_their_events_are_stored_together(database):
+    queries.insert_results(created_results(3))
+
+    messages = queries.claim_outbox("relay", 10, timedelta(seconds=30))
+
+    assert [message.name for message in messages] == ["EmbeddingCreated"] * 3
+    assert [message.body["result_id"] for message in messages] == ["r0", "r1", "r2"]
+    assert messages[0].body["provider"] == "fake-provider" and messages[0].body["text_hash"] == "hash 0"
+    # Claimed events are skipped by other relays until the lease expires
+    assert queries.claim_outbox("other", 10, timedelta(seconds=30)) == []
+
+
+def test_relay_publishes_events_in_batches(database):
+    queries.insert_results(created_results(5))
+
+    async def scenario():
+        broker = InMemoryBroker()
+        relay = outbox.OutboxRelay(broker, batch_size=2)
+        count = await relay.relay()
+        return count, await published(broker)
+
+    count, bodies = asyncio.run(scenario())
+
+    assert count == 5
+    assert [len(body["events"]) for body in bodies] == [2, 2, 1]
+    assert [event["body"]["result_id"] for body in bodies for event in body["events"]] == [f"r{i}" for i in range(5)]
+    assert len({event["id"] for body in bodies for event in body["events"]}) == 5
+    assert outbox_size(database) == 0
+
+
+def test_unpublished_events_are_published_again_after_the_lease(database):
+    queries.insert_results(created_results(2))
+
+    class FailingBroker(InMemoryBroker):
+        async def publish(self, topic, body):
+            raise ConnectionError("broker down")
+
+    async def scenario():
+        failing = outbox.OutboxRelay(FailingBroker(), lease_ms=0)
+        try:
+            await failing.relay()
+        except ConnectionError:
+            pass
+        broker = InMemoryBroker()
+        return await outbox.OutboxRelay(broker).relay(), await published(broker)
+
+    count, bodies = asyncio.run(scenario())
+
+    assert count == 2 and len(bodies[0]["events"]) == 2
+    assert outbox_size(database) == 0
+
+
+def test_running_relay_publishes_notified_events(database):
+    async def scenario():
+        broker = InMemoryBroker()
+        event_settings = settings.EventSettings(batch_size=3, flush_interval_ms=60_000)
+        with patch.object(settings, "event_settings", lambda: event_settings):
+            relay = outbox.start_relay(broker)
+        queries.insert_results(created_results(3))
+        outbox.notify(3)
+        # A full batch is published without waiting for the flush interval
+        for _ in range(100):
+            if bodies := await published(broker):
+                break
+            await asyncio.sleep(0.005)
+        queries.insert_results(created_results(1, start=3))
+        await outbox.stop_relay()
+        return relay, bodies, await published(broker)
+
+    relay, first, rest = asyncio.run(scenario())
+
+    assert relay is not None
+    assert [len(body["events"]) for body in first + rest] == [3, 1]
+    assert outbox_size(database) == 0
+
+
+def test_disabled_events_are_not_raised(database):
+    with patch.object(settings, "event_settings", lambda: settings.EventSettings(enabled=False)):
+        results = created_results(2)
+        assert outbox.start_relay(InMemoryBroker()) is None
+    queries.insert_results(results)
+
+    assert all(result.events == [] for result in results)
+    assert outbox_size(database) == 0
+
+
+def test_broker_is_created_on_first_publish():
+    config = {"message_broker": {"framework": "redis", "connection": {"host": "localhost"}}}
+    with patch.object(broker_module, "_broker", None), patch.object(utils, "get_config", lambda: config), \
+            patch.dict("sys.modules", {"redis": None}):
+        publisher = LazyBroker()
+        # Nothing connects until an event is published, an application without Redis still starts
+        with pytest.raises(RuntimeError, match="redis package"):
+            asyncio.run(publisher.publish("topic", {}))
+        assert broker_module._broker is None
@@ -0,0 +1,96 @@
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+from unittest.mock import patch
+
+import pytest
+
+from llm_portal.adapters import provider_factory
+from llm_portal.adapters.llm_providers import FakeProvider
+from llm_portal.adapters.provider_factory import ProviderRegistry
+
+
+class LoadCountingProvider(FakeProvider):
+    def __init__(self):
+        super().__init__(dimensions=4)
+        self.loads = []
+
+    def _load_model(self, model: str):
+        self.loads.append(model)
+        return object()
+
+
+def test_registry_creates_one_shared_instance():
+    created = []
+
+    def factory(provider_name: str) -> FakeProvider:
+        created.append(provider_name)
+        return FakeProvider(provider_name, dimensions=4)
+
+    registry = ProviderRegistry(factory)
+    with ThreadPoolExecutor(8) as executor:
+        providers = list(executor.map(lambda _: registry.get("fake-provider"), range(32)))
+
+    assert created == ["fake-provider"]
+    assert all(provider is providers[0] for provider in providers)
+
+
+def test_model_handles_are_loaded_once():
+    provider = LoadCountingProvider()
+
+    with ThreadPoolExecutor(8) as executor:
+        handles = list(executor.map(lambda _: provider.model_handle("fake-model-1"), range(32)))
+
+    assert provider.loads == ["fake-model-1"]
+    assert all(handle is handles[0] for handle in handles)
+
+
+def test_warm_up_records_readiness():
+    registry = ProviderRegistry(lambda provider_name: LoadCountingProvider())
+
+    assert not registry.ready
+    assert not registry.warm_up({"fake-provider": ["fake-model-1", "unknown-model"]})
+    assert registry.failed_models() == {"fake-provider": ["unknown-model"]}
+    assert registry.get("fake-provider").loads == ["fake-model-1"]
+
+    assert registry.status()["providers"]["fake-provider"]["fake-model-1"] == "ready"
+
+
+def test_warm_up_of_every_model_is_ready():
+    registry = ProviderRegistry(lambda provider_name: LoadCountingProvider())
+
+    assert registry.warm_up({"fake-provider": ["fake-model-1", "fake-model-2"]})
+    assert registry.status() == {
+        "ready": True,
+        "providers": {"fake-provider": {"fake-model-1": "ready", "fake-model-2": "ready"}},
+    }
+
+
+def test_importing_the_app_does_not_import_provider_sdks():
+    code = (
+        "import sys, llm_portal.entrypoints.rest.app, llm_portal.dependencies as d; "
+        "print('vertexai' in sys.modules, 'DEPENDENCIES' in vars(d))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+    assert output.split() == ["False", "False"]
+
+
+def test_providers_are_imported_on_first_use():
+    with patch.dict(provider_factory.PROVIDERS, {"fake": "llm_portal.adapters.llm_providers.fake:FakeProvider"}):
+        assert provider_factory.provider_class("fake") is FakeProvider
+        assert provider_factory.PROVIDERS["fake"] is FakeProvider
+
+
+def test_plugins_are_discovered_through_entry_points():
+    entry_point = metadata.EntryPoint("plugin", "llm_portal.adapters.llm_providers.fake:FakeProvider", "group")
+
+    with patch.dict(provider_factory.PROVIDERS), \
+            patch.object(provider_factory, "_entry_points_loaded", False), \
+            patch.object(provider_factory.metadata, "entry_points", return_value=[entry_point]) as entry_points:
+        assert isinstance(provider_factory.create_llm_provider("plugin", dimensions=4), FakeProvider)
+        with pytest.raises(ValueError):
+            provider_factory.provider_class("unknown")
+
+    assert entry_points.call_count == 1
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from llm_portal import settings
+from llm_portal.adapters.llm_providers import FakeProvider, RateLimitError, classify_error
+from llm_portal.adapters.llm_providers.resilience import CallPolicy, RateLimiter, TokenBucket
+
+NO_BACKOFF = settings.RetrySettings(max_attempts=3, base_delay_ms=0, max_delay_ms=0)
+
+
+class ServiceUnavailable(Exception):
+    """Stands for the SDK error of the same name, errors are classified by class name."""
+
+
+def test_errors_are_classified():
+    assert classify_error(RateLimitError("quota")) == "rate_limit"
+    assert classify_error(ServiceUnavailable()) == "transient"
+    assert classify_error(TimeoutError()) == "transient"
+    assert classify_error(ValueError("bad model")) == "permanent"
+
+
+def test_token_bucket_reservations_queue_up():
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    assert bucket.reserve(2) == 0
+    assert bucket.reserve(1) == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve(1) == pytest.approx(0.2, abs=0.01)
+    assert not bucket.try_reserve(1)
+
+
+def test_rate_limiter_counts_requests_and_tokens():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+
+    assert limiter.reserve(100) == 0
+    assert limiter.reserve(50) == pytest.approx(0.5, abs=0.05)
+
+
+def test_transient_errors_are_retried():
+    policy = CallPolicy("fake-provider", "fake-model-1", retry=NO_BACKOFF)
+    errors = [ServiceUnavailable(), RateLimitError("quota")]
+
+    def attempt():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert policy.call(attempt, tokens=1) == "ok"
+
+
+def test_permanent_errors_and_exhausted_retries_are_raised():
+    policy = CallPolicy("fake-provider", "fake-model-1", retry=NO_BACKOFF)
+    calls = []
+
+    def failing(error):
+        def attempt():
+            calls.append(error)
+            raise error
+
+        return attempt
+
+    with pytest.raises(ValueError):
+        policy.call(failing(ValueError()), tokens=1)
+    assert len(calls) == 1
+
+    with pytest.raises(RateLimitError):
+        policy.call(failing(RateLimitError()), tokens=1)
+    assert len(calls) == 4
+
+
+def test_slow_calls_are_hedged():
+    hedging = settings.HedgingSettings(enabled=True, quantile=0.5, min_samples=1, min_delay_ms=0)
+    policy = CallPolicy("fake-provider", "fake-model-1", retry=NO_BACKOFF, hedging=hedging)
+    policy.latencies.observe(0.01)
+    delays = [1.0, 0.0]
+
+    async def attempt():
+        delay = delays.pop(0)
+        await asyncio.sleep(delay)
+        return delay
+
+    assert asyncio.run(asyncio.wait_for(policy.acall(attempt, tokens=1), timeout=0.5)) == 0.0
+
+
+def test_provider_calls_go_through_the_call_policy():
+    provider = FakeProvider(dimensions=4, rate_limit_probability=0.5, seed=3)
+
+    vectors = asyncio.run(provider.agenerate_embeddings_batched([f"text {i}" for i in range(20)], "fake-model-1"))
+
+    assert len(vectors) == 20
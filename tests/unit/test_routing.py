@@ -0,0 +1,129 @@
+import pytest
+
+from llm_portal import settings
+from llm_portal.adapters.llm_providers import (
+    BackendSelector,
+    FakeProvider,
+    OverloadedError,
+    ProviderError,
+    RoutedProvider,
+    TransientProviderError,
+)
+
+ROUTING = settings.RoutingSettings(
+    failure_threshold=2, min_samples=3, latency_outlier_factor=3.0, base_ejection_ms=10000, max_ejection_ms=40000
+)
+NO_RETRY = settings.RetrySettings(max_attempts=1)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FailingProvider(FakeProvider):
+    def __init__(self, provider_name: str, error: type[ProviderError] = TransientProviderError):
+        super().__init__(provider_name, dimensions=4)
+        self.failing = True
+        self.error = error
+        self.calls = 0
+
+    def generate_embeddings(self, list_texts: list[str], model: str = None):
+        self.calls += 1
+        if self.failing:
+            raise self.error(f"{self.provider_name} failed")
+        return super().generate_embeddings(list_texts, model)
+
+
+def test_selector_ejects_after_consecutive_failures_and_probes_again():
+    clock = Clock()
+    selector = BackendSelector("route", "model", ["a", "b"], ROUTING, clock=clock)
+
+    selector.record_failure("a")
+    selector.record_failure("a")
+
+    assert selector.order() == ["b", "a"]
+    clock.now += 11
+    assert set(selector.order()) == {"a", "b"}
+    assert selector.stats["a"].samples == 0
+
+    # On probation, a single failure ejects for twice as long
+    selector.record_failure("a")
+    assert selector.stats["a"].ejected_until == pytest.approx(clock.now + 20)
+
+
+def test_selector_ejects_latency_outliers():
+    selector = BackendSelector("route", "model", ["fast", "slow"], ROUTING, clock=Clock())
+
+    for _ in range(3):
+        selector.record_success("fast", 0.01)
+        selector.record_success("slow", 0.1)
+
+    assert selector.stats["slow"].ejected_until > 0
+    assert selector.order() == ["fast", "slow"]
+
+
+def test_selector_prefers_lower_latency():
+    selector = BackendSelector("route", "model", ["a", "b"], ROUTING, clock=Clock())
+    selector.record_success("a", 0.05)
+    selector.record_success("b", 0.02)
+
+    assert all(selector.order()[0] == "b" for _ in range(20))
+
+
+def test_routed_provider_fails_over():
+    down = FailingProvider("down")
+    up = FakeProvider("up", dimensions=4)
+    for backend in (down, up):
+        backend.call_policy("fake-model-1").retry = NO_RETRY
+    provider = RoutedProvider("routed", [down, up], ROUTING)
+
+    for _ in range(20):
+        vectors = provider.generate_embeddings(["hello"], "fake-model-1")
+        assert vectors == up.generate_embeddings(["hello"], "fake-model-1")
+
+    # Ejected after two failures, no longer tried first
+    assert down.calls == 2
+
+
+def test_routed_provider_raises_when_every_backend_fails():
+    backends = [FailingProvider("a"), FailingProvider("b")]
+    for backend in backends:
+        backend.call_policy("fake-model-1").retry = NO_RETRY
+    provider = RoutedProvider("routed", backends, ROUTING)
+
+    with pytest.raises(ProviderError):
+        provider.generate_embeddings(["hello"], "fake-model-1")
+    assert [backend.calls for backend in backends] == [1, 1]
+
+
+def test_routed_provider_does_not_fail_over_bad_requests():
+    backends = [FailingProvider("a", ProviderError), FailingProvider("b", ProviderError)]
+    for backend in backends:
+        backend.call_policy("fake-model-1").retry = NO_RETRY
+    provider = RoutedProvider("routed", backends, ROUTING)
+
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            provider.generate_embeddings(["hello"], "fake-model-1")
+
+    # Only the first backend tried each time, and neither is ejected
+    assert sum(backend.calls for backend in backends) == 2
+    assert not any(stats.ejected_until for stats in provider.selector("fake-model-1").stats.values())
+
+
+def test_admission_rejections_fail_over_without_ejecting():
+    busy = FailingProvider("busy", OverloadedError)
+    up = FakeProvider("up", dimensions=4)
+    for backend in (busy, up):
+        backend.call_policy("fake-model-1").retry = NO_RETRY
+    provider = RoutedProvider("routed", [busy, up], ROUTING)
+
+    for _ in range(5):
+        provider.generate_embeddings(["hello"], "fake-model-1")
+
+    stats = provider.selector("fake-model-1").stats["busy"]
+    assert (stats.samples, stats.ejected_until) == (0, 0.0)
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from llm_portal import settings
+from llm_portal.adapters.llm_providers import (
+    FakeProvider,
+    LLMProvider,
+    OverloadedError,
+    Scheduler,
+    TenantLimitError,
+    request_context,
+)
+
+SCHEDULING_SETTINGS = settings.SchedulingSettings(max_concurrency=1)
+
+
+def scheduler(**kwargs) -> Scheduler:
+    return Scheduler("fake-provider", "fake-model-1", SCHEDULING_SETTINGS.model_copy(update=kwargs))
+
+
+async def call(scheduler: Scheduler, served: list, name: str, lane: str, tenant: str | None = None):
+    with request_context(lane, tenant):
+        async with scheduler.slot():
+            served.append(name)
+            await asyncio.sleep(0.01)
+
+
+def test_interactive_calls_skip_the_bulk_backlog():
+    lanes = scheduler()
+    served = []
+
+    async def scenario():
+        bulk = [asyncio.create_task(call(lanes, served, f"bulk{index}", "bulk")) for index in range(10)]
+        await asyncio.sleep(0)
+        interactive = [
+            asyncio.create_task(call(lanes, served, f"interactive{index}", "interactive")) for index in range(2)
+        ]
+        await asyncio.gather(*bulk, *interactive)
+
+    asyncio.run(scenario())
+
+    # The first bulk call was already running, the interactive calls go before the rest of the backlog
+    assert served[:4] == ["bulk0", "interactive0", "interactive1", "bulk1"]
+
+
+def test_tenants_at_their_cap_let_other_tenants_through():
+    lanes = scheduler(max_concurrency=2, tenant_max_concurrency=1, tenant_max_queue=2)
+    served = []
+
+    async def scenario():
+        busy = [asyncio.create_task(call(lanes, served, f"busy{index}", "bulk", "busy")) for index in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(TenantLimitError):
+            await call(lanes, served, "busy3", "bulk", "busy")
+        await asyncio.gather(*busy, call(lanes, served, "other", "bulk", "other"))
+
+    asyncio.run(scenario())
+
+    assert served[:2] == ["busy0", "other"]
+
+
+def test_calls_that_would_miss_their_deadline_are_rejected():
+    lanes = scheduler()
+    lanes._observe(1.0)
+
+    async def scenario():
+        running = asyncio.create_task(call(lanes, [], "running", "bulk"))
+        await asyncio.sleep(0)
+        with request_context("interactive", timeout_ms=500), pytest.raises(OverloadedError) as rejected:
+            async with lanes.slot():
+                pass
+        await running
+        return rejected.value
+
+    start = time.monotonic()
+    rejected = asyncio.run(scenario())
+
+    assert rejected.retry_after == pytest.approx(1.0)
+    assert time.monotonic() - start < 0.5
+    assert lanes.waiting() == lanes.running == 0
+
+
+def test_unknown_lanes_are_rejected():
+    with pytest.raises(ValueError):
+        with request_context("urgent"):
+            pass
+
+
+def test_provider_calls_are_scheduled():
+    provider = FakeProvider(dimensions=8)
+
+    async def scenario():
+        with request_context("bulk"):
+            await provider.agenerate_embeddings(["hello"], "fake-model-1")
+        return provider.scheduler("fake-model-1")
+
+    with patch.object(settings, "scheduling_settings", lambda: SCHEDULING_SETTINGS):
+        used = asyncio.run(scenario())
+
+    assert used._lane_finish["bulk"] > 0 and used.running == 0
+
+
+class SyncOnlyProvider(LLMProvider):
+    def __init__(self):
+        super().__init__("sync-provider")
+        self._embedding_models = {"sync-model": {"dimensions": 2}}
+
+    @property
+    def available_models(self) -> list[str]:
+        return list(self._embedding_models)
+
+    def generate_embeddings(self, list_texts: list[str], model: str = None):
+        return [[1.0, 0.0] for _ in list_texts]
+
+
+def test_sync_only_provider_calls_are_scheduled():
+    provider = SyncOnlyProvider()
+
+    async def scenario():
+        with request_context("bulk"):
+            vectors = await provider.agenerate_embeddings(["hello"], "sync-model")
+        return vectors, provider.scheduler("sync-model")
+
+    with patch.object(settings, "scheduling_settings", lambda: SCHEDULING_SETTINGS):
+        vectors, used = asyncio.run(scenario())
+
+    assert vectors == [[1.0, 0.0]]
+    assert used._lane_finish["bulk"] > 0 and used.running == 0
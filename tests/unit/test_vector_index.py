@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from llm_portal.adapters.vector_index import VectorIndex
+
+
+@pytest.fixture
+def matrix() -> np.ndarray:
+    # Clustered like real embeddings, 20 topics with some spread
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((20, 32))
+    return (centers[rng.integers(0, 20, 2000)] + 0.3 * rng.standard_normal((2000, 32))).astype(np.float32)
+
+
+@pytest.fixture
+def index(matrix: np.ndarray) -> VectorIndex:
+    index = VectorIndex(32, nprobe=8, min_train_size=1000)
+    index.add([str(i) for i in range(len(matrix))], [f"text {i}" for i in range(len(matrix))], matrix)
+    return index
+
+
+def brute_force(matrix: np.ndarray, query: np.ndarray, top_k: int) -> list[str]:
+    scores = (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)) @ (query / np.linalg.norm(query))
+    return [str(i) for i in np.argsort(-scores)[:top_k]]
+
+
+def test_exact_search_matches_brute_force(index: VectorIndex, matrix: np.ndarray):
+    query = matrix[42] + 0.1
+
+    hits = index.search(query, top_k=5)
+
+    assert [hit.id for hit in hits] == brute_force(matrix, query, 5)
+    assert hits[0].text == "text 42"
+    assert hits[0].score >= hits[-1].score
+
+
+def test_approximate_search_has_good_recall(index: VectorIndex, matrix: np.ndarray):
+    recalls = []
+    for query in matrix[:50] + 0.05:
+        hits = index.search(query, top_k=10, approximate=True)
+        recalls.append(len({hit.id for hit in hits} & set(brute_force(matrix, query, 10))) / 10)
+    recall = np.mean(recalls)
+
+    assert index.trained
+    assert recall >= 0.8
+
+
+def test_filters_restrict_candidates(index: VectorIndex, matrix: np.ndarray):
+    hits = index.search(matrix[0], top_k=5, ids=["7", "8", "unknown"])
+    assert {hit.id for hit in hits} == {"7", "8"}
+
+    hits = index.search(matrix[0], top_k=5, text_contains="text 19")
+    assert all("text 19" in hit.text for hit in hits)
+
+
+def test_incremental_add_skips_known_ids(index: VectorIndex):
+    index.search(np.ones(32), top_k=1, approximate=True)
+    vector = np.full(32, 3.0, dtype=np.float32)
+
+    index.add(["new", "0"], ["new text", "duplicate"], np.stack([vector, vector]))
+
+    assert len(index) == 2001
+    assert index.search(vector, top_k=1)[0].id == "new"
+    assert index.search(vector, top_k=1, approximate=True)[0].id == "new"
+
+
+def test_dimension_mismatch_is_rejected(index: VectorIndex):
+    with pytest.raises(ValueError):
+        index.search(np.ones(8))
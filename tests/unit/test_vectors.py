@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+import pytest
+
+from llm_portal.domains import vectors
+
+
+@pytest.fixture
+def vector() -> np.ndarray:
+    return np.random.default_rng(0).standard_normal(768).astype(np.float32)
+
+
+def test_float32_roundtrip_is_lossless(vector: np.ndarray):
+    data = vectors.encode(vector, "float32")
+
+    assert len(data) == 1 + 4 * 768
+    np.testing.assert_array_equal(vectors.decode(data), vector)
+
+
+@pytest.mark.parametrize("codec, size, tolerance", [("float16", 1 + 2 * 768, 1e-2), ("int8", 1 + 4 + 768, 3e-2)])
+def test_quantized_codecs_keep_vectors_close(vector: np.ndarray, codec: str, size: int, tolerance: float):
+    data = vectors.encode(vector, codec)
+    decoded = vectors.decode(data)
+
+    assert len(data) == size
+    assert decoded.dtype == np.float32
+    assert np.max(np.abs(decoded - vector)) < tolerance * np.max(np.abs(vector))
+
+
+def test_legacy_json_vectors_still_decode():
+    legacy = json.dumps([0.5, 1.0, -2.0])
+
+    assert vectors.is_legacy(legacy)
+    assert not vectors.is_legacy(vectors.encode([0.5, 1.0, -2.0]))
+    np.testing.assert_array_equal(vectors.decode(legacy), np.array([0.5, 1.0, -2.0], dtype=np.float32))
+
+
+def test_int8_handles_zero_vector():
+    np.testing.assert_array_equal(vectors.decode(vectors.encode(np.zeros(4), "int8")), np.zeros(4))
+
+
+def test_unknown_default_codec_is_rejected():
+    with pytest.raises(ValueError):
+        vectors.set_default_codec("float64")
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from llm_portal import executors, settings
+from llm_portal.adapters.writer import BufferedWriter
+from llm_portal.service import persistence
+
+
+class Sink:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.batches = []
+
+    def __call__(self, rows: list):
+        if self.fail:
+            raise RuntimeError("database down")
+        self.batches.append(rows)
+
+
+def test_concurrent_writes_are_flushed_in_one_batch():
+    sink = Sink()
+    writer = BufferedWriter(sink, flush_interval_ms=20, flush_rows=100)
+
+    async def write_all():
+        await asyncio.gather(*(writer.write([i]) for i in range(10)))
+
+    asyncio.run(write_all())
+
+    assert sink.batches == [list(range(10))]
+    assert writer.stats()["flushed_rows"] == 10
+
+
+def test_flush_rows_triggers_a_flush():
+    sink = Sink()
+    writer = BufferedWriter(sink, flush_interval_ms=10000, flush_rows=3)
+
+    async def write_all():
+        await asyncio.gather(*(writer.write([i]) for i in range(6)))
+
+    asyncio.run(write_all())
+
+    assert [len(batch) for batch in sink.batches] == [3, 3]
+
+
+def test_flushes_never_overlap():
+    running, overlaps = [], []
+
+    def flush(rows: list):
+        running.append(rows)
+        overlaps.append(len(running))
+        time.sleep(0.01)
+        running.remove(rows)
+
+    writer = BufferedWriter(flush, flush_interval_ms=10000, flush_rows=1)
+
+    async def write_all():
+        await asyncio.gather(*(writer.write([i]) for i in range(5)))
+
+    with ThreadPoolExecutor(4) as pool, patch.object(executors, "_db_executor", pool):
+        asyncio.run(write_all())
+
+    assert overlaps == [1] * 5
+
+
+def test_write_behind_returns_before_flush_and_drain_persists():
+    sink = Sink()
+    writer = BufferedWriter(sink, flush_interval_ms=10000, flush_rows=100)
+
+    async def write_behind():
+        await writer.write([1, 2], wait=False)
+        assert sink.batches == []
+        await writer.drain()
+
+    asyncio.run(write_behind())
+
+    assert sink.batches == [[1, 2]]
+
+
+def test_flush_errors_reach_waiting_writers():
+    writer = BufferedWriter(Sink(fail=True), flush_interval_ms=1)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(writer.write([1]))
+    assert writer.stats()["failed_rows"] == 1
+
+
+def test_rows_buffered_on_a_closed_loop_are_flushed_by_the_next_writer():
+    sink = Sink()
+    storage = settings.StorageSettings(write_mode="behind", flush_interval_ms=60_000)
+
+    async def write(rows: list):
+        await persistence.get_result_writer().write(rows, wait=False)
+
+    with patch.object(persistence, "insert_results", sink), \
+            patch.object(persistence.settings, "storage_settings", lambda: storage), \
+            patch.object(persistence, "_writers", {}):
+        asyncio.run(write([1, 2]))
+
+        async def write_and_flush():
+            await write([3])
+            await persistence.flush()
+
+        asyncio.run(write_and_flush())
+
+    assert sink.batches == [[1, 2, 3]]